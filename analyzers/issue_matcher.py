@@ -0,0 +1,116 @@
+import os
+import re
+import json
+import threading
+import pandas as pd
+from pipeline.fingerprint import hash_file
+
+ISSUE_TAXONOMY_PATH = os.getenv('ISSUE_TAXONOMY_PATH', os.path.join('config', 'issue_taxonomy.json'))
+
+def _trie_pattern(words):
+    """
+    Compiles keywords into one prefix-shared alternation. At any position
+    it matches the longest keyword starting there.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+class IssueMatcher:
+    """
+    Tags texts with issue categories in a single regex pass per text.
+
+    Keywords match as substrings of the lowercased text, like `keyword in
+    text`. Matches are looked for at every position (lookahead), and a
+    match also implies every keyword that is a prefix of it, so
+    overlapping keywords from different categories are all found.
+    """
+
+    def __init__(self, taxonomy):
+        keyword_categories = {}
+        for category, keywords in taxonomy.items():
+            for keyword in keywords:
+                keyword = str(keyword).strip().lower()
+                if keyword:
+                    keyword_categories.setdefault(keyword, set()).add(category)
+
+        self.categories = list(taxonomy)
+        self._pattern = re.compile('(?=(' + _trie_pattern(keyword_categories) + '))') if keyword_categories else None
+        self._match_categories = {
+            keyword: frozenset().union(*(cats for k, cats in keyword_categories.items() if keyword.startswith(k)))
+            for keyword in keyword_categories
+        }
+
+    def tag(self, text):
+        """Categories mentioned in one text."""
+        if self._pattern is None:
+            return frozenset()
+        found = set()
+        for match in set(self._pattern.findall(text.lower())):
+            found |= self._match_categories[match]
+        return frozenset(found)
+
+    def count_rows(self, texts):
+        """
+        Number of rows mentioning each category.
+
+        Args:
+            texts (pd.Series): Text values; missing values are skipped.
+
+        Returns:
+            dict: {category: row count} for categories with at least one hit.
+        """
+        texts = texts[texts.notna()].astype(str)
+        if texts.empty or self._pattern is None:
+            return {}
+        # Tag each distinct text once
+        codes, uniques = pd.factorize(texts)
+        tags = pd.Series([self.tag(t) for t in uniques], dtype=object)
+        per_row = tags.iloc[codes].explode().dropna()
+        counts = per_row.value_counts()
+        return {category: int(counts[category]) for category in self.categories if category in counts.index}
+
+_matcher = None
+_matcher_key = None
+_matcher_lock = threading.Lock()
+
+def load_issue_taxonomy(path=ISSUE_TAXONOMY_PATH):
+    """Reads {category: [keywords]} from a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if not isinstance(taxonomy, dict):
+        raise ValueError("Issue taxonomy must map categories to keyword lists")
+    return {str(category): list(keywords) for category, keywords in taxonomy.items()}
+
+def taxonomy_version(path=ISSUE_TAXONOMY_PATH):
+    """Content hash of the taxonomy file, or None if it can't be read."""
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+def get_issue_matcher(path=ISSUE_TAXONOMY_PATH):
+    """
+    Returns the matcher for the taxonomy file, rebuilt when its contents
+    change. Keyed on the same hash that stamps dashboard bundles, so a
+    bundle is never rebuilt with the matcher of an older taxonomy.
+    """
+    global _matcher, _matcher_key
+    key = (path, taxonomy_version(path))
+    with _matcher_lock:
+        if _matcher is None or _matcher_key != key:
+            _matcher = IssueMatcher(load_issue_taxonomy(path))
+            _matcher_key = key
+        return _matcher
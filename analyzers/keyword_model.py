@@ -1,52 +1,30 @@
-import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from collections import Counter
-import re
-
-# Download NLTK data if not present
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from analyzers.tokenizer import explode_keywords
+from pipeline.metrics import timed
 
+@timed('keywords.extract')
 def extract_keywords_analysis(df):
     """
     Finds the most common keywords in a text column.
-    
+
     Accepts:
         df (pd.DataFrame): The input DataFrame.
     Returns:
         dict: A dictionary of keywords and their counts, or empty dict.
     """
-    
+
     # Try to find a text column
     text_col = next((col for col in df.columns if col.lower() in ['feedback', 'review', 'comment', 'content', 'text']), None)
-    
+
     if not text_col:
         return {}
 
     print(f"--- Running keyword extraction on column: {text_col} ---")
-    
-    # Combine all text into one giant string
-    all_text = " ".join(df[text_col].dropna().astype(str))
-    
-    # Tokenize and clean
-    tokens = word_tokenize(all_text.lower())
-    stop_words = set(stopwords.words('english'))
-    
-    # Basic cleaning: remove punctuation, short words, and stopwords
-    keywords = [
-        word for word in tokens 
-        if re.match(r'^[a-z]+$', word) and len(word) > 2 and word not in stop_words
-    ]
-    
+
+    # Tokenize and clean: alphabetic words longer than 2 chars, no stopwords
+    keywords = explode_keywords(df[text_col], min_len=2)
+
     # Get top 20 most common keywords
     keyword_counts = Counter(keywords).most_common(20)
-    
-    return dict(keyword_counts)
\ No newline at end of file
+
+    return dict(keyword_counts)
@@ -1,9 +1,10 @@
 import pandas as pd
-import numpy as np
-from collections import Counter
-import re
-from datetime import datetime, timedelta
+from analyzers.tokenizer import explode_keywords, get_stop_words
+from analyzers.issue_matcher import get_issue_matcher
+from analyzers.sentiment_model import find_date_column, parse_dates
+from pipeline.metrics import timed
 
+@timed('market.insights')
 def analyze_market_sentiment(df):
     """
     Analyzes overall market sentiment and provides insights.
@@ -95,11 +96,11 @@ def analyze_market_sentiment(df):
         insights['recommendations'].append('🎯 Focus on creating more engaging content')
     
     # Time-based insights
-    date_col = next((col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()), None)
+    date_col = find_date_column(df)
     if date_col:
         try:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df_clean = df.dropna(subset=[date_col])
+            # Convert a copy: the caller's frame is reused for the other dashboard panels
+            df_clean = df.assign(**{date_col: parse_dates(df[date_col])}).dropna(subset=[date_col])
             
             if not df_clean.empty:
                 # Check if sentiment is improving or declining
@@ -123,9 +124,33 @@ def analyze_market_sentiment(df):
     
     return insights
 
-def get_trending_topics(df, top_n=10):
+def _keyword_sentiment_counts(df, text_col):
+    """Scans the text column: occurrences per keyword, overall and by sentiment."""
+    # Tokenize the whole column at once: one row per keyword occurrence
+    tokens = explode_keywords(df[text_col], min_len=3)
+    if tokens.empty:
+        return pd.DataFrame(columns=['count', 'positive', 'negative', 'neutral'])
+
+    if 'sentiment' in df.columns:
+        sentiments = df['sentiment'].reset_index(drop=True).reindex(tokens.index)
+    else:
+        sentiments = pd.Series('Neutral', index=tokens.index)
+    mentions = pd.DataFrame({'keyword': tokens.values,
+                             'sentiment': sentiments.astype(str).str.lower().values})
+
+    # groupby(sort=False) keeps first-appearance order for tie-breaking
+    counts = mentions.groupby('keyword', sort=False).size().rename('count')
+    breakdown = pd.crosstab(mentions['keyword'], mentions['sentiment'])
+    breakdown = breakdown.reindex(index=counts.index, columns=['positive', 'negative', 'neutral'], fill_value=0)
+    return pd.concat([counts, breakdown], axis=1)
+
+@timed('market.trending')
+def get_trending_topics(df, top_n=10, index=None):
     """
     Extracts trending topics and keywords from the data.
+
+    If a TokenIndex built from this frame is passed, counts come from the
+    index instead of re-tokenizing the text column.
     
     Returns:
         dict: Trending topics with sentiment breakdown
@@ -136,66 +161,16 @@ def get_trending_topics(df, top_n=10):
     if not text_col:
         return {}
     
-    from nltk.corpus import stopwords
-    from nltk.tokenize import word_tokenize
-    import nltk
-    import os
-    
-    # Add local nltk_data directory to path
-    nltk_data_dir = os.path.join(os.getcwd(), 'nltk_data')
-    if os.path.exists(nltk_data_dir):
-        nltk.data.path.append(nltk_data_dir)
-    
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords', download_dir=nltk_data_dir)
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt', download_dir=nltk_data_dir)
-    try:
-        nltk.data.find('tokenizers/punkt_tab')
-    except LookupError:
-        nltk.download('punkt_tab', download_dir=nltk_data_dir)
-    
-    stop_words = set(stopwords.words('english'))
-    
-    # Extract keywords with sentiment
-    trending_topics = {}
-    
-    for idx, row in df.iterrows():
-        val = row[text_col]
-        if pd.isna(val) or val is pd.NaT:
-            continue
-            
-        text = str(val).lower()
-        sentiment = row.get('sentiment', 'Neutral')
-        
-        # Tokenize and clean
-        try:
-            tokens = word_tokenize(text)
-            keywords = [
-                word for word in tokens 
-                if re.match(r'^[a-z]+$', word) and len(word) > 3 and word not in stop_words
-            ]
-            
-            for keyword in keywords:
-                if keyword not in trending_topics:
-                    trending_topics[keyword] = {
-                        'count': 0,
-                        'positive': 0,
-                        'negative': 0,
-                        'neutral': 0
-                    }
-                
-                trending_topics[keyword]['count'] += 1
-                trending_topics[keyword][sentiment.lower()] += 1
-        except:
-            continue
-    
-    # Sort by count and get top N
-    sorted_topics = sorted(trending_topics.items(), key=lambda x: x[1]['count'], reverse=True)[:top_n]
+    if index is not None and index.text_col == text_col and index.n_rows == len(df):
+        stats = index.term_counts(min_len=3, exclude=get_stop_words())
+    else:
+        stats = _keyword_sentiment_counts(df, text_col)
+    if stats.empty:
+        return {}
+
+    # Sort by count and get top N (ties keep first-appearance order)
+    top = stats.sort_values('count', ascending=False, kind='stable').head(top_n)
+    sorted_topics = [(topic, {k: int(v) for k, v in row.items()}) for topic, row in top.iterrows()]
     
     # Calculate sentiment ratios
     result = {}
@@ -218,9 +193,14 @@ def get_trending_topics(df, top_n=10):
     
     return result
 
-def detect_emerging_issues(df):
+@timed('market.issues')
+def detect_emerging_issues(df, top_n=5, matcher=None):
     """
     Detects emerging issues or concerns from negative sentiment.
+
+    Issue categories and their keywords come from the taxonomy file
+    (config/issue_taxonomy.json, or ISSUE_TAXONOMY_PATH); every negative
+    text is tagged with all categories in one pass.
     
     Returns:
         list: List of potential issues with severity scores
@@ -235,43 +215,30 @@ def detect_emerging_issues(df):
         return []
     
     # Filter negative comments
-    negative_df = df[df['sentiment'] == 'Negative']
+    negative_texts = df.loc[df['sentiment'] == 'Negative', text_col]
+    total_negative = len(negative_texts)
     
-    if len(negative_df) == 0:
+    if total_negative == 0:
         return []
     
-    # Common issue keywords
-    issue_patterns = {
-        'quality': ['quality', 'broken', 'defect', 'faulty', 'poor'],
-        'service': ['service', 'support', 'customer service', 'help', 'response'],
-        'price': ['price', 'expensive', 'cost', 'overpriced', 'refund'],
-        'delivery': ['delivery', 'shipping', 'late', 'delayed', 'never arrived'],
-        'performance': ['slow', 'lag', 'crash', 'bug', 'error', 'not working']
-    }
-    
+    if matcher is None:
+        try:
+            matcher = get_issue_matcher()
+        except (OSError, ValueError) as e:
+            print(f"Error loading issue taxonomy: {e}")
+            return []
+
     issues = []
-    
-    for issue_type, keywords in issue_patterns.items():
-        count = 0
-        for idx, row in negative_df.iterrows():
-            val = row[text_col]
-            if pd.isna(val) or val is pd.NaT:
-                continue
-                
-            text = str(val).lower()
-            if any(keyword in text for keyword in keywords):
-                count += 1
-        
-        if count > 0:
-            severity = 'High' if count > len(negative_df) * 0.3 else 'Medium' if count > len(negative_df) * 0.1 else 'Low'
-            issues.append({
-                'issue': issue_type.title(),
-                'mentions': count,
-                'severity': severity,
-                'percentage': round((count / len(negative_df)) * 100, 1)
-            })
+    for issue_type, count in matcher.count_rows(negative_texts).items():
+        severity = 'High' if count > total_negative * 0.3 else 'Medium' if count > total_negative * 0.1 else 'Low'
+        issues.append({
+            'issue': issue_type.title(),
+            'mentions': count,
+            'severity': severity,
+            'percentage': round((count / total_negative) * 100, 1)
+        })
     
     # Sort by mentions
     issues.sort(key=lambda x: x['mentions'], reverse=True)
     
-    return issues[:5]  # Return top 5 issues
\ No newline at end of file
+    return issues[:top_n]  # Return top issues
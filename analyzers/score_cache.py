@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+
+# --- Configuration ---
+SCORE_CACHE_PATH = os.getenv('SENTIMENT_CACHE_PATH', os.path.join('data', 'processed', 'sentiment_cache.db'))
+SCORE_CACHE_MAX_ENTRIES = int(os.getenv('SENTIMENT_CACHE_MAX_ENTRIES', 2000000))
+SCORE_CACHE_ENABLED = os.getenv('SENTIMENT_CACHE', '1') != '0'
+
+# SQLite limits the number of bound parameters per statement
+_BATCH = 500
+# Pending last-used updates written in one go once this many pile up
+_TOUCH_FLUSH = 10000
+
+def normalize_text(text):
+    """Collapses whitespace. VADER splits on whitespace, so scores are unchanged."""
+    return " ".join(text.split())
+
+def text_key(normalized):
+    """Content hash used as the cache key."""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+class ScoreCache:
+    """
+    Disk-backed map of text hash -> VADER compound score.
+
+    Entries carry a last-used timestamp; when the table grows past
+    `max_entries` the least recently used tenth is evicted. Reads don't
+    write: hits are remembered in memory and their timestamps written in
+    one batch with the next put, before an eviction, or once _TOUCH_FLUSH
+    are pending. The entry count is kept in memory too, and only
+    recounted when it says the table is full (other processes may share
+    the file).
+    """
+
+    def __init__(self, path=SCORE_CACHE_PATH, max_entries=SCORE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> last-used time not yet written
+        self._touched = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL, used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_used ON scores (used)")
+        self._conn.commit()
+        self._count = self._row_count()
+
+    def get_many(self, keys):
+        """Returns {key: score} for the keys present in the cache."""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, score FROM scores WHERE key IN ({marks})", batch)
+                found.update(rows.fetchall())
+            if found:
+                now = time.time()
+                self._touched.update(dict.fromkeys(found, now))
+                if len(self._touched) >= _TOUCH_FLUSH:
+                    self._flush_touched()
+                    self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Stores an iterable of (key, score) pairs."""
+        now = time.time()
+        items = [(k, float(s), now) for k, s in items]
+        with self._lock:
+            # Keys are content hashes, so a key already stored has the same
+            # score; it only needs its last-used time refreshed
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO scores (key, score, used) VALUES (?, ?, ?)", items).rowcount
+            if inserted < len(items):
+                self._touched.update((k, now) for k, _, _ in items)
+            self._count += inserted
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _row_count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def _flush_touched(self):
+        """Writes pending last-used times (the caller commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE scores SET used = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        if self._count <= self.max_entries:
+            return
+        self._count = self._row_count()
+        if self._count <= self.max_entries:
+            return
+        # Evict down to 90% so we don't pay for eviction on every insert
+        excess = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY used ASC LIMIT ?)", (excess,))
+        self._count -= excess
+        self.evictions += excess
+
+    def stats(self):
+        """Returns hit/miss counters and the current entry count."""
+        entries = self._count
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM scores")
+            self._conn.commit()
+            self._touched.clear()
+            self._count = 0
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_score_cache():
+    """Returns the process-wide cache, or None if disabled or unavailable."""
+    global _cache
+    if not SCORE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ScoreCache()
+            except Exception as e:
+                print(f"Sentiment cache unavailable: {e}")
+                return None
+        return _cache
@@ -1,10 +1,111 @@
+import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from analyzers.score_cache import get_score_cache, normalize_text, text_key
+from pipeline.metrics import timed
 
-def analyze_sentiment(df):
+# --- Batch Scoring Configuration ---
+# Frames with fewer rows than the threshold are scored in-process; larger
+# frames are split into chunks and fanned out across a process pool.
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', os.cpu_count() or 1))
+SENTIMENT_CHUNK_SIZE = int(os.getenv('SENTIMENT_CHUNK_SIZE', 20000))
+SENTIMENT_PARALLEL_THRESHOLD = int(os.getenv('SENTIMENT_PARALLEL_THRESHOLD', 50000))
+
+# One analyzer per process (the lexicon load is the expensive part)
+_analyzer = None
+
+def _get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def _init_worker():
+    """Pool initializer: loads the VADER lexicon once per worker process."""
+    _get_analyzer()
+
+def _score_chunk(texts):
+    """Returns the VADER compound score for each text (0 for non-strings)."""
+    analyzer = _get_analyzer()
+    return [analyzer.polarity_scores(t)['compound'] if isinstance(t, str) else 0 for t in texts]
+
+def label_scores(scores):
+    """Maps compound scores to Positive / Neutral / Negative labels."""
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= 0.05, scores <= -0.05], ['Positive', 'Negative'], default='Neutral')
+
+def score_texts(texts, workers=None, chunk_size=None, threshold=None):
     """
-    Analyzes sentiment for text-based columns in a DataFrame.
+    Scores a list of texts once each, in parallel for large inputs.
+
+    Args:
+        texts (list): Texts to score. Non-string values score 0.
+        workers (int): Process count. Defaults to SENTIMENT_WORKERS.
+        chunk_size (int): Texts per task. Defaults to SENTIMENT_CHUNK_SIZE.
+        threshold (int): Minimum size for the process pool. Defaults to SENTIMENT_PARALLEL_THRESHOLD.
+
+    Returns:
+        list: Compound scores in input order.
     """
+    workers = workers or SENTIMENT_WORKERS
+    chunk_size = chunk_size or SENTIMENT_CHUNK_SIZE
+    threshold = SENTIMENT_PARALLEL_THRESHOLD if threshold is None else threshold
+
+    if workers <= 1 or len(texts) < threshold or len(texts) <= chunk_size:
+        return _score_chunk(texts)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as pool:
+            scores = []
+            for part in pool.map(_score_chunk, chunks):
+                scores.extend(part)
+            return scores
+    except Exception as e:
+        print(f"Parallel scoring failed, falling back to in-process: {e}")
+        return _score_chunk(texts)
+
+def score_texts_cached(texts, workers=None, chunk_size=None, use_cache=True):
+    """
+    Scores texts through the persistent score cache.
+
+    Duplicate texts are scored once, cached scores are fetched in bulk, and
+    only the misses go through score_texts.
+
+    Returns:
+        list: Compound scores in input order.
+    """
+    cache = get_score_cache() if use_cache else None
+
+    # Deduplicate on normalized text
+    keys = [None] * len(texts)
+    unique = {}
+    for i, t in enumerate(texts):
+        if isinstance(t, str):
+            norm = normalize_text(t)
+            key = text_key(norm)
+            keys[i] = key
+            unique.setdefault(key, norm)
+
+    known = cache.get_many(unique.keys()) if cache else {}
+    missing = [k for k in unique if k not in known]
+    if missing:
+        fresh = score_texts([unique[k] for k in missing], workers=workers, chunk_size=chunk_size)
+        fresh = dict(zip(missing, fresh))
+        if cache:
+            try: cache.put_many(fresh.items())
+            except Exception as e: print(f"Error writing sentiment cache: {e}")
+        known.update(fresh)
+
+    if cache:
+        print(f"--- Score cache: {len(unique) - len(missing)} hits, {len(missing)} misses, "
+              f"{len(texts) - len(unique)} duplicate/empty rows ---")
+    return [known[k] if k is not None else 0 for k in keys]
+
+def find_text_column(df):
+    """Picks the column holding free text, or None."""
     # Try to find a text column
     text_col = next((col for col in df.columns if col.lower() in ['feedback', 'review', 'comment', 'content', 'text', 'body']), None)
     
@@ -17,63 +118,77 @@ def analyze_sentiment(df):
         except:
             pass
 
+    return text_col
+
+def find_date_column(df):
+    """Picks the column holding comment dates (not sentiment_* columns), or None."""
+    return next((col for col in df.columns
+                 if any(x in col.lower() for x in ('date', 'time', 'created'))
+                 and not col.lower().startswith('sentiment')), None)
+
+def parse_dates(values):
+    """
+    Parses a date column to naive UTC timestamps, NaT where unparseable.
+    Values are parsed one by one (format='mixed'): inferring a single
+    format from the first value would turn every differently formatted
+    date into NaT.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values, errors='coerce', format='mixed', utc=True)
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    return values
+
+@timed('sentiment.analyze')
+def analyze_sentiment(df, workers=None, chunk_size=None, use_cache=True, text_col=None):
+    """
+    Analyzes sentiment for text-based columns in a DataFrame.
+
+    Each distinct text is scored once; previously seen texts come from the
+    persistent score cache, and large batches of new texts are scored across
+    `workers` processes in chunks of `chunk_size` rows (see score_texts).
+    Pass `text_col` to skip column detection (e.g. to keep it fixed across chunks).
+    """
+    text_col = text_col or find_text_column(df)
+
     if not text_col:
         print("No suitable text column found. Skipping sentiment analysis.")
         return df
 
-    print(f"--- Running sentiment analysis on column: {text_col} ---")
-    analyzer = SentimentIntensityAnalyzer()
-    
-    def get_sentiment(text):
-        if not isinstance(text, str):
-            return 'Neutral'
-        score = analyzer.polarity_scores(text)
-        compound = score['compound']
-        if compound >= 0.05: return 'Positive'
-        elif compound <= -0.05: return 'Negative'
-        else: return 'Neutral'
-        
-    def get_score(text):
-        if not isinstance(text, str): return 0
-        return analyzer.polarity_scores(text)['compound']
+    print(f"--- Running sentiment analysis on column: {text_col} ({len(df)} rows) ---")
+    scores = score_texts_cached(df[text_col].tolist(), workers=workers, chunk_size=chunk_size, use_cache=use_cache)
 
     # Apply sentiment
-    df['sentiment'] = df[text_col].apply(get_sentiment)
-    df['sentiment_score'] = df[text_col].apply(get_score)
+    df['sentiment'] = label_scores(scores)
+    df['sentiment_score'] = scores
     
     return df
 
-def get_sentiment_trends(df):
+@timed('sentiment.trends')
+def get_sentiment_trends(df, rollups=None):
     """
-    Generates time-series data for sentiment.
+    Generates time-series data for sentiment: counts per day, week or month
+    depending on the time span. Read from the dataset's rollups if given,
+    otherwise they are built from df (which is left unchanged).
     """
-    # Find date column
-    date_col = next((col for col in df.columns if 'date' in col.lower() or 'time' in col.lower() or 'created' in col.lower()), None)
-    
-    if not date_col or 'sentiment' not in df.columns:
+    if 'sentiment' not in df.columns:
         return {}
-        
+
     try:
-        # Ensure datetime format
-        df['temp_date'] = pd.to_datetime(df[date_col], errors='coerce', format='mixed')
-        df_clean = df.dropna(subset=['temp_date'])
-        
-        if df_clean.empty:
+        if rollups is None:
+            from pipeline.rollups import SentimentRollups
+            rollups = SentimentRollups.build(df)
+        span = rollups.span()
+        if span is None:
             return {}
 
-        # Group by Date and Sentiment
-        # Determine frequency based on time span
-        time_span = df_clean['temp_date'].max() - df_clean['temp_date'].min()
-        freq = 'D' if time_span.days < 60 else 'W' if time_span.days < 365 else 'M'
-        
-        trend = df_clean.groupby([pd.Grouper(key='temp_date', freq=freq), 'sentiment']).size().reset_index(name='count')
-        trend['date_str'] = trend['temp_date'].dt.strftime('%Y-%m-%d')
-        
-        # Pivot for easy charting: Date | Negative | Neutral | Positive
-        pivot_trend = trend.pivot(index='date_str', columns='sentiment', values='count').fillna(0).reset_index()
-        
-        return pivot_trend.to_dict(orient='list')
-        
+        days = (span[1] - span[0]).days
+        trend = rollups.query('day' if days < 60 else 'week' if days < 365 else 'month')
+
+        # Easy charting: Date | Negative | Neutral | Positive (labels present only)
+        labels = sorted(label for label in ('Positive', 'Neutral', 'Negative') if any(trend[label]))
+        return {'date_str': trend['dates'], **{label: trend[label] for label in labels}}
+
     except Exception as e:
         print(f"Error in sentiment trends: {e}")
         return {}
\ No newline at end of file
@@ -0,0 +1,135 @@
+import re
+import threading
+import pandas as pd
+from pipeline.metrics import stage
+
+# --- Keyword Tokenizer ---
+# A single compiled pattern that yields the purely alphabetic tokens
+# nltk's word_tokenize (punkt sentence splitting, then the Treebank rules
+# per sentence) produces for one lowercased text, without running the
+# rules token by token:
+#   - a word must be bounded by whitespace or by punctuation Treebank
+#     splits off (words glued to digits, '-', '/', '…', emoji... are
+#     single non-alphabetic tokens and are dropped);
+#   - clitics ('s, 're, n't ...) are split off the preceding word;
+#   - contractions Treebank splits (can|not, gon|na ...) yield both halves
+#     as tokens of their own, whatever they are glued to ('gonna-go');
+#   - a period is only split off a word that ends a sentence: before
+#     whitespace or at the end of the text. Mid-word periods ("e.g",
+#     "it.it") never split, and neither do initials or abbreviations
+#     followed by more text ("plan b. then", "mr. smith").
+# Sentence ends follow punkt's token rules but not its context window:
+# punkt also ends a sentence after an abbreviation or initial when the
+# next whitespace-separated chunk holds a '?', '!' or another sentence
+# end ("dr. b.) ok" keeps "dr"); that isn't reproduced. punkt's English
+# model isn't always installed, so _ABBREVIATIONS stands in for its
+# abbreviation list; words missing from it end a sentence.
+_BREAK_CHARS = r"""\s;@#$%&?!*()\[\]{}<>"«»“”‘’„`\u2012-\u2015"""
+# Where a token can start: after a break, a comma or colon, an ellipsis,
+# '--' or '', or after a leading quote unless what follows reads as a clitic
+_QUOTE = r"(?<=(?<!\w)')(?!(?:re|ve|ll|m|t|s|d|n)\b)"
+_LEFT = rf"(?:^|(?<=[{_BREAK_CHARS},:])|(?<=\.\.)|(?<=--)|(?<='')|{_QUOTE})"
+# Where a token can end: a break, a comma or colon not inside a number,
+# a period not followed by a word character, '--' or ''
+_RIGHT = rf"(?=$|[{_BREAK_CHARS}]|[,:](?!\d)|\.(?!\w)|--|'')"
+# 's, 'm, 'd and a bare quote are split off first, so they can follow 're, 've, 'll and n't
+_SHORT_CLITIC = r"'(?:s|m|d)?"
+_CLITIC = rf"(?:{_SHORT_CLITIC}|'(?:ll|re|ve)(?:{_SHORT_CLITIC})?){_RIGHT}"
+_WORD_END = r"(?!\w)"
+
+# --- Sentence ends ---
+_ABBREVIATIONS = ('mr', 'mrs', 'ms', 'dr', 'jr', 'sr', 'st', 'vs', 'inc', 'ltd', 'co', 'corp')
+# punkt only reads a word as an abbreviation or initial if it starts one
+# of its own tokens: after whitespace, '--', '..', a character that ends
+# a punkt token, or a character that can't start one standing alone.
+# After ' ! ? the word joins the token they start ("'mr.", "?b.")
+_PUNKT_START = r"""(?:^|(?<=[\s)";}\]*:@({\[])|(?<=--)|(?<=\.\.)|(?<=(?<!\S)[&#,`-]))"""
+# Neither ends a sentence, so its "word." stays one non-alphabetic token:
+#   - an abbreviation, unless the period ends the text ("ask dr.");
+_ABBREVIATION = rf"(?:{'|'.join(_ABBREVIATIONS)})\.(?!\.|[\]\)}}>\"']*\s*$)"
+#   - an initial, when a lowercase word follows ("plan b. then")
+_INITIAL = r"[a-z]\.\s+[a-z]"
+# Only short words followed by a period are checked, since this is tried at every word
+_SHORT_WORD = rf"(?=[a-z]{{1,{max(map(len, _ABBREVIATIONS))}}}\.)"
+_NOT_ABBREVIATION = rf"(?!{_SHORT_WORD}{_PUNKT_START}(?:{_ABBREVIATION}|{_INITIAL}))"
+
+# --- Contractions ---
+# first half, second half, what must follow ('wanna' is only split before a token break)
+_CONTRACTIONS = [('can', 'not', _WORD_END), ('gon', 'na', _WORD_END), ('got', 'ta', _WORD_END),
+                 ('gim', 'me', _WORD_END), ('lem', 'me', _WORD_END),
+                 ('wan', 'na', rf"(?:{_CLITIC}|{_RIGHT})"),
+                 # "more'n" and "d'ye": only the first half is alphabetic
+                 ('more', "'n", _WORD_END), ('d', "'ye", _WORD_END)]
+# Each group is behind one cheap check, since it is tried at every position
+_FIRST_HALF = r"(?<!\w)(?:" + '|'.join(rf"{a}(?={b}{end})" for a, b, end in _CONTRACTIONS) + ")"
+_SECOND_HALF = (r"(?<=[ntm])(?:" + '|'.join(rf"(?<=(?<!\w){a}){b}(?={end})"
+                                            for a, b, end in _CONTRACTIONS if b.isalpha()) + ")")
+# The split leaves a following 'tis/'twas after a space, so Treebank splits it as well
+_TIS_AFTER_HALVES = (r"(?<='t)(?:" + '|'.join(rf"(?<=(?<!\w){a}{b}'t)"
+                                              for a, b, end in _CONTRACTIONS if a != 'wan') + r")(?:is|was)(?!\w)")
+_HALVES = f"{_FIRST_HALF}|{_SECOND_HALF}|{_TIS_AFTER_HALVES}"
+
+# --- Words ---
+# The word before n't, shortest first: "don't" -> "do"
+_WORD_BEFORE_NT = rf"[a-z]+?(?=n't(?:{_SHORT_CLITIC})?{_RIGHT})"
+# Any other word, with its clitics left behind
+_WORD = rf"[a-z]+(?={_CLITIC}|{_RIGHT})"
+TOKEN_RE = re.compile(rf"{_HALVES}|{_LEFT}{_NOT_ABBREVIATION}(?:{_WORD_BEFORE_NT}|{_WORD})")
+
+_stop_words = None
+_stop_words_lock = threading.Lock()
+
+def get_stop_words():
+    """
+    Returns the English stopword set, loaded once per process. Falls back
+    to scikit-learn's list when the NLTK corpus is missing or fails
+    verification (run `python nltk_setup.py`); that list differs, so
+    keyword and trending output change, and the fallback is logged.
+    """
+    global _stop_words
+    with _stop_words_lock:
+        if _stop_words is None:
+            from nltk_setup import load_stopwords
+
+            words = load_stopwords('english')
+            if words is None:
+                from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+                print("!!! NLTK stopwords unavailable: using scikit-learn's English list instead. "
+                      "Keyword and trending results will differ; run `python nltk_setup.py` to install them. !!!")
+                words = ENGLISH_STOP_WORDS
+            _stop_words = frozenset(words)
+        return _stop_words
+
+def tokenize(text):
+    """Alphabetic tokens of one (already lowercased) text."""
+    return TOKEN_RE.findall(text)
+
+def explode_tokens(texts):
+    """
+    Tokenizes a column of texts in bulk.
+
+    Args:
+        texts (pd.Series): Text values; missing values are skipped.
+
+    Returns:
+        pd.Series: One row per alphabetic token occurrence, indexed by the
+        position of the source row in `texts`.
+    """
+    with stage('tokenize', rows=len(texts)):
+        texts = texts.reset_index(drop=True)
+        texts = texts[texts.notna()].astype(str).str.lower()
+        # Tokenize each distinct text once (comment dumps are full of duplicates)
+        codes, uniques = pd.factorize(texts)
+        per_text = pd.Series(uniques, dtype=object).str.findall(TOKEN_RE).to_numpy()
+        return pd.Series(per_text[codes], index=texts.index, dtype=object).explode().dropna()
+
+def explode_keywords(texts, min_len=3):
+    """
+    Like explode_tokens, keeping only keywords: tokens longer than
+    `min_len` that are not stopwords.
+    """
+    tokens = explode_tokens(texts)
+    if tokens.empty:
+        return tokens
+    keep = (tokens.str.len() > min_len) & ~tokens.isin(get_stop_words())
+    return tokens[keep]
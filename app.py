@@ -1,29 +1,38 @@
 import os
-import sys
+import re
 import pandas as pd
 import json
-import plotly
-import plotly.express as px
-import plotly.graph_objects as go
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g
 from werkzeug.utils import secure_filename
-import subprocess
 import time
-import io
-import threading
 
 # Local Modules
-from analyzers.sentiment_model import analyze_sentiment, get_sentiment_trends
-from analyzers.keyword_model import extract_keywords_analysis
-from analyzers.market_analyzer import analyze_market_sentiment, get_trending_topics
-from chat.retriever import get_summary
-from chat.chatbot import get_ollama_response, get_ai_insights
+from chat.retriever import get_llm_summary, retrieve_comments
+from chat.chatbot import get_ollama_response, stream_ollama_response, get_ai_insights, chat_latency
+from pipeline.ingest import MAX_UPLOAD_MB
+from pipeline.store import load_processed_df, load_processed_rows, save_processed_df as store_processed_df
+from pipeline.jobs import analysis_jobs
+from pipeline.scrape_jobs import scrape_scheduler
+from pipeline.dashboard import get_dashboard_bundle
+from pipeline.frame_cache import frame_cache
+from pipeline.token_index import get_token_index
+from pipeline.rollups import get_rollups
+from pipeline.consolidated import consolidated_store, GRANULARITIES
+from analyzers.score_cache import get_score_cache
+from analyzers.tokenizer import get_stop_words
+from chat.llm_cache import get_response_cache
+from pipeline.metrics import metrics, start_trace, end_trace, format_trace, METRICS_DEBUG
 
 # --- Configuration ---
+# Copy-on-write lets frame cache hits share the cached data until modified
+# instead of being deep copies. Always on from pandas 3.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 UPLOAD_FOLDER = 'data'
 PROCESSED_FOLDER = os.path.join(UPLOAD_FOLDER, 'processed')
 ALLOWED_EXTENSIONS = {'csv', 'json', 'xls', 'xlsx'}
-MAX_CONTENT_LENGTH = 50 * 1024 * 1024
+MAX_CONTENT_LENGTH = MAX_UPLOAD_MB * 1024 * 1024
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -35,111 +44,74 @@ app.secret_key = 'your-secret-key-replace-in-production'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
-# --- Global Scraper State ---
-scraper_process = None
-scraper_log = []
-scraper_thread = None
+# Processing jobs keep the consolidated store current; this catches up on
+# datasets processed before it existed, off the request path
+consolidated_store.start_sync(PROCESSED_FOLDER)
+
+# Resolve stopwords now, so a fallback to scikit-learn's list is logged at
+# startup rather than on the first keyword request
+get_stop_words()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def clean_and_normalize_data(df):
-    """Auto-clean data logic."""
-    df.dropna(how='all', axis=0, inplace=True)
-    df.dropna(how='all', axis=1, inplace=True)
-    df.columns = [str(col).strip().lower() for col in df.columns]
-    for col in df.columns:
-        if any(x in col for x in ['date', 'time', 'created', 'timestamp']):
-            try: df[col] = pd.to_datetime(df[col], errors='coerce')
-            except: pass
-    return df
-
-def load_dataframe(filepath):
-    """Loads dataframe with robust encoding handling."""
-    try:
-        if filepath.endswith('.csv'):
-            try: df = pd.read_csv(filepath, encoding='utf-8')
-            except UnicodeDecodeError: df = pd.read_csv(filepath, encoding='latin1')
-        elif filepath.endswith('.json'): df = pd.read_json(filepath)
-        elif filepath.endswith(('.xls', '.xlsx')): df = pd.read_excel(filepath)
-        else: return None
-        return clean_and_normalize_data(df) if df is not None else None
-    except Exception as e:
-        print(f"Error loading file: {e}")
-        return None
-
-def generate_advanced_charts(df):
-    charts = {}
-    if 'sentiment' in df.columns:
-        counts = df['sentiment'].value_counts()
-        colors = {'Positive': '#10b981', 'Neutral': '#6b7280', 'Negative': '#ef4444'}
-        fig = go.Figure(data=[go.Pie(labels=counts.index, values=counts.values, marker=dict(colors=[colors.get(s, '#888') for s in counts.index]), hole=0.4)])
-        fig.update_layout(title="Sentiment Distribution", template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-        charts['sentiment_pie'] = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-    trend_data = get_sentiment_trends(df)
-    if trend_data:
-        try:
-            trend_df = pd.DataFrame(trend_data)
-            fig = px.line(trend_df, x='date_str', y=list(set(trend_df.columns) - {'date_str'}),
-                          title="Sentiment Trends Over Time",
-                          color_discrete_map={'Positive': '#10b981', 'Neutral': '#6b7280', 'Negative': '#ef4444'})
-            fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)')
-            charts['sentiment_trend'] = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-        except: pass
-
-    # Sentiment Histogram
-    if 'sentiment_score' in df.columns:
-        fig = px.histogram(df, x='sentiment_score', nbins=20, title="Sentiment Score Distribution",
-                           color_discrete_sequence=['#6366f1'])
-        fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
-                          xaxis_title="Sentiment Score (-1 to 1)", yaxis_title="Count")
-        charts['sentiment_histogram'] = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-    # Keywords Bar Chart
-    trending_topics = get_trending_topics(df, top_n=10)
-    if trending_topics:
-        keywords = list(trending_topics.keys())
-        counts = [data['mentions'] for data in trending_topics.values()]
-        
-        fig = px.bar(x=keywords, y=counts, title="Top Trending Keywords",
-                     color_discrete_sequence=['#10b981'])
-        fig.update_layout(template='plotly_dark', paper_bgcolor='rgba(0,0,0,0)',
-                          xaxis_title="Keyword", yaxis_title="Mentions")
-        charts['keywords'] = json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-    return charts
-
-# --- Background Log Reader ---
-def monitor_scraper(process):
-    global scraper_log
-    for line in iter(process.stdout.readline, ''):
-        scraper_log.append(line)
-    process.stdout.close()
-
 # --- Helper Functions ---
 def save_processed_df(df, filename):
     """Saves the processed dataframe to the processed folder."""
-    filepath = os.path.join(app.config['PROCESSED_FOLDER'], f"{filename}.json")
-    df.to_json(filepath, orient='split', date_format='iso')
+    store_processed_df(df, filename, app.config['PROCESSED_FOLDER'])
 
-def get_current_df():
-    """Retrieves the current dataframe based on session filename."""
+def get_current_df(columns=None):
+    """Retrieves the current dataframe (optionally only some columns) based on session filename."""
     if 'current_filename' not in session:
         return None
     
     filename = session['current_filename']
-    filepath = os.path.join(app.config['PROCESSED_FOLDER'], f"{filename}.json")
-    
-    if not os.path.exists(filepath):
-        return None
-        
     try:
-        return pd.read_json(filepath, orient='split')
+        return load_processed_df(filename, app.config['PROCESSED_FOLDER'], columns=columns)
     except Exception as e:
         print(f"Error loading processed DF: {e}")
         return None
 
+# --- Request Metrics ---
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if METRICS_DEBUG:
+        start_trace()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    # The rule ('/jobs/<job_id>'), not the path, keeps label values bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.observe('http_request_duration_seconds', elapsed,
+                    method=request.method, route=route, status=response.status_code)
+    if METRICS_DEBUG:
+        print(format_trace(f"{request.method} {request.path} {response.status_code}", elapsed, end_trace()))
+    return response
+
+def cache_samples():
+    """Cache counters for /metrics, read from the caches when scraped."""
+    score_cache = get_score_cache()
+    response_cache = get_response_cache()
+    caches = {'frames': frame_cache.stats(),
+              'sentiment_scores': score_cache.stats() if score_cache else None,
+              'llm_responses': response_cache.stats() if response_cache else None}
+    for name, stats in caches.items():
+        if not stats:
+            continue
+        # Coalesced LLM calls were answered without a model call of their own
+        hits = stats['hits'] + stats.get('coalesced', 0)
+        yield 'cache_hits_total', {'cache': name}, hits
+        yield 'cache_misses_total', {'cache': name}, stats['misses']
+        yield 'cache_hit_ratio', {'cache': name}, stats['hit_rate']
+        yield 'cache_entries', {'cache': name}, stats['entries']
+
+metrics.add_collector(cache_samples)
+
 # --- Routes ---
 
 @app.route('/')
@@ -159,18 +131,11 @@ def upload_file():
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     file.save(filepath)
     
-    df = load_dataframe(filepath)
-    if df is None or df.empty:
-        flash('Error reading file.', 'error')
-        return redirect(url_for('index'))
-
-    df = analyze_sentiment(df)
-    
-    # Save processed DF to disk instead of session
-    save_processed_df(df, filename)
+    # Cleaning and scoring run in the background; the job page polls for progress
+    job = analysis_jobs.submit(filepath, filename, app.config['PROCESSED_FOLDER'])
     session['current_filename'] = filename
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('job_page', job_id=job.id))
 
 @app.route('/load/<filename>')
 def load_existing_file(filename):
@@ -182,32 +147,47 @@ def load_existing_file(filename):
         flash(f'File not found: {safe_filename}', 'error')
         return redirect(url_for('index'))
 
-    df = load_dataframe(filepath)
-    if df is None:
-        flash('File corrupted or unreadable.', 'error')
-        return redirect(url_for('index'))
-        
-    df = analyze_sentiment(df)
-    
-    # Save processed DF to disk instead of session
-    save_processed_df(df, safe_filename)
+    job = analysis_jobs.submit(filepath, safe_filename, app.config['PROCESSED_FOLDER'])
     session['current_filename'] = safe_filename
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('job_page', job_id=job.id))
+
+@app.route('/jobs/<job_id>')
+def job_page(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        flash('Analysis job not found.', 'error')
+        return redirect(url_for('index'))
+    return render_template('job.html', job=job.to_dict())
 
 @app.route('/dashboard')
 def dashboard():
-    df = get_current_df()
-    if df is None:
+    if 'current_filename' not in session:
         return redirect(url_for('index'))
-        
+
+    filename = session['current_filename']
+    # A file a scrape is still writing to shows its latest partial results
+    live = scrape_scheduler.is_writing(filename)
+    job = analysis_jobs.active_job(filename, app.config['PROCESSED_FOLDER'])
+    if job is not None and not live:
+        # Still being analyzed: show progress instead of a stale or missing dashboard
+        return redirect(url_for('job_page', job_id=job.id))
+
     try:
-        filename = session.get('current_filename', 'Data')
+        # Precomputed when the dataset was processed; rebuilt only if the data changed
+        # (while live, the scrape's analysis passes keep it current)
+        bundle = get_dashboard_bundle(filename, app.config['PROCESSED_FOLDER'], allow_stale=live)
+        if bundle is None:
+            if job is not None:
+                return redirect(url_for('job_page', job_id=job.id))
+            return redirect(url_for('index'))
         return render_template('dashboard.html', 
-                             summary=get_summary(df, filename), 
-                             charts=generate_advanced_charts(df), 
-                             market_insights=analyze_market_sentiment(df), 
-                             trending=get_trending_topics(df))
+                             summary=bundle['summary'], 
+                             charts=bundle['charts'], 
+                             market_insights=bundle['market_insights'], 
+                             trending=bundle['trending'],
+                             issues=bundle.get('issues', []),
+                             live=live)
     except Exception as e:
         print(f"Dashboard error: {e}")
         return redirect(url_for('index'))
@@ -221,50 +201,165 @@ def reset_app():
 @app.route('/scrape')
 def scrape_page(): return render_template('scrape.html')
 
+def parse_scrape_urls(data):
+    """URLs from a run request: `urls` (list or newline-separated) or a single `url`."""
+    urls = data.get('urls') or data.get('url') or []
+    if isinstance(urls, str):
+        urls = urls.splitlines()
+    seen = []
+    for url in (u.strip() for u in urls):
+        if url and url not in seen:
+            seen.append(url)
+    return seen
+
 @app.route('/api/run-scrape', methods=['POST'])
 def run_scrape():
-    global scraper_process, scraper_log, scraper_thread
-    if scraper_process and scraper_process.poll() is None:
-        return jsonify({'status': 'error', 'message': 'Scraper is already running.'}), 400
-
-    data = request.json
-    cmd = [sys.executable, 'scraper.py', data['url'], 
-           '--filter_keywords', data.get('filter_keywords',''), 
-           '--min_length', str(data.get('min_length',10))]
-
+    data = request.get_json(silent=True) or {}
+    urls = parse_scrape_urls(data)
+    if not urls:
+        return jsonify({'status': 'error', 'message': 'No URL given.'}), 400
     try:
-        scraper_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', bufsize=1)
-        scraper_log = ["--- Starting Scraper... ---\n"]
-        scraper_thread = threading.Thread(target=monitor_scraper, args=(scraper_process,))
-        scraper_thread.daemon = True
-        scraper_thread.start()
-        return jsonify({'status': 'success', 'message': 'Scraper started.'})
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        min_length = int(data.get('min_length') or 10)
+        max_comments = max(int(data.get('max_comments') or 0), 0)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Invalid number.'}), 400
+    sort = data.get('sort') or 'new'
+    if sort not in ('new', 'top'):
+        return jsonify({'status': 'error', 'message': 'Sort must be "new" or "top".'}), 400
+
+    # Videos scraped before only fetch comments not seen yet unless `full` is set
+    jobs = scrape_scheduler.submit(urls, data.get('filter_keywords', ''), min_length,
+                                   max_comments, sort, bool(data.get('full')))
+    return jsonify({'status': 'success',
+                    'message': f'Queued {len(jobs)} scrape job(s).',
+                    'jobs': [job.to_dict() for job in jobs]})
 
 @app.route('/api/scrape-status')
 def scrape_status():
-    global scraper_process, scraper_log
-    status = 'idle'
-    if scraper_process:
-        if scraper_process.poll() is None: status = 'running'
-        else: status = 'finished'; scraper_process = None
-    return jsonify({'status': status, 'log': "".join(scraper_log)})
+    jobs = scrape_scheduler.list_jobs()
+    return jsonify({'status': 'running' if scrape_scheduler.is_busy() else 'idle',
+                    'jobs': [job.to_dict() for job in jobs]})
+
+@app.route('/api/scrape-jobs/<job_id>')
+def scrape_job_status(job_id):
+    job = scrape_scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/scrape-jobs/<job_id>/log')
+def scrape_job_log(job_id):
+    """Log lines after offset `after`; pass the returned `next` back to continue."""
+    job = scrape_scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    after = max(request.args.get('after', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+    lines, next_offset, dropped = job.log.read(after, limit)
+    return jsonify({'status': job.status, 'lines': lines, 'next': next_offset,
+                    'dropped': dropped, 'complete': job.log.closed and next_offset == job.log.total})
+
+def sse_data(text):
+    """
+    `data:` fields carrying text. SSE ends a field at \r, \n or \r\n, so a
+    line with embedded breaks (e.g. a \r-redrawn progress bar) becomes one
+    field per line, which the client rejoins with \n.
+    """
+    return "".join(f"data: {part}\n" for part in re.split(r'\r\n|\r|\n', str(text).rstrip('\r\n')))
+
+@app.route('/api/scrape-jobs/<job_id>/stream')
+def scrape_job_stream(job_id):
+    """
+    Server-Sent Events feed of a job's log. Each event id is the offset to
+    resume from, so a reconnecting EventSource (Last-Event-ID) skips lines it
+    already has. Holds a worker thread for as long as the client listens.
+    """
+    job = scrape_scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    after = request.headers.get('Last-Event-ID', type=int)
+    if after is None:
+        after = max(request.args.get('after', 0, type=int), 0)
+
+    def events(after):
+        while True:
+            lines, next_offset, dropped = job.log.read(after, 500)
+            if dropped:
+                yield f"event: dropped\ndata: {dropped}\n\n"
+            for offset, line in enumerate(lines, start=next_offset - len(lines)):
+                yield f"id: {offset + 1}\n{sse_data(line)}\n"
+            after = next_offset
+            if next_offset < job.log.total:
+                continue
+            if job.log.closed:
+                yield f"event: end\ndata: {job.status}\n\n"
+                return
+            if not job.log.wait(after, timeout=15):
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+
+    return Response(stream_with_context(events(after)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/scrape-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_scrape_job(job_id):
+    if not scrape_scheduler.cancel(job_id):
+        return jsonify({'status': 'error', 'message': 'Job not running.'}), 400
+    return jsonify({'status': 'success', 'message': 'Cancelled'})
 
 @app.route('/api/stop-scrape', methods=['POST'])
 def stop_scrape():
-    global scraper_process
-    if scraper_process: scraper_process.kill(); scraper_process = None
-    return jsonify({'status': 'success', 'message': 'Stopped'})
+    cancelled = scrape_scheduler.cancel_all()
+    return jsonify({'status': 'success', 'message': f'Stopped {cancelled} job(s)'})
+
+def chat_context(message):
+    """Returns (summary, comments) grounding an answer for the current dataset, or None."""
+    # Built once per dataset version, so answering doesn't need the frame
+    summary = get_llm_summary(session['current_filename'], app.config['PROCESSED_FOLDER'])
+    if summary is None:
+        return None
+    try:
+        comments = retrieve_comments(session['current_filename'], message, app.config['PROCESSED_FOLDER'])
+    except Exception as e:
+        # Answer from the summary alone rather than fail the message
+        print(f"Comment retrieval error: {e}")
+        comments = ""
+    return summary, comments
 
 @app.route('/api/chat', methods=['POST'])
 def chat_api():
-    df = get_current_df()
-    if df is None:
+    if 'current_filename' not in session:
         return jsonify({'error': 'No data'}), 400
-        
-    summary = get_summary(df, session['current_filename'], for_llm=True)
-    return jsonify({'response': get_ollama_response(request.json['message'], summary)})
+    message = request.json['message']
+    context = chat_context(message)
+    if context is None:
+        return jsonify({'error': 'No data'}), 400
+    return jsonify({'response': get_ollama_response(message, *context)})
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_api():
+    """Same as /api/chat, but streams the answer as Server-Sent Events while it is generated."""
+    if 'current_filename' not in session:
+        return jsonify({'error': 'No data'}), 400
+    message = (request.get_json(silent=True) or {}).get('message', '').strip()
+    if not message:
+        return jsonify({'error': 'Missing message'}), 400
+    context = chat_context(message)
+    if context is None:
+        return jsonify({'error': 'No data'}), 400
+
+    def generate():
+        metrics = {}
+        try:
+            for text in stream_ollama_response(message, *context, metrics=metrics):
+                yield f"data: {json.dumps({'token': text})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': f'AI Error: {e}'})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps(metrics)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/get-insights', methods=['POST'])
 def get_insights_api():
@@ -274,6 +369,145 @@ def get_insights_api():
         
     return jsonify({'insights': get_ai_insights(df, session['current_filename'])})
 
+# --- Analysis Jobs API ---
+@app.route('/api/jobs', methods=['POST'])
+def submit_job_api():
+    data = request.get_json(silent=True) or {}
+    filename = os.path.basename(data.get('filename', ''))
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not filename or not os.path.exists(filepath):
+        return jsonify({'error': 'File not found'}), 404
+    job = analysis_jobs.submit(filepath, filename, app.config['PROCESSED_FOLDER'])
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status_api(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/search')
+def search_api():
+    if 'current_filename' not in session:
+        return jsonify({'error': 'No data'}), 400
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+
+    filename = session['current_filename']
+    index = get_token_index(filename, app.config['PROCESSED_FOLDER'])
+    if index is None:
+        return jsonify({'error': 'No text column to search'}), 400
+
+    rows = index.search(query)
+    shown = rows[:limit]
+    # Only the rows shown are read from the mapped artifact
+    matches = load_processed_rows(filename, app.config['PROCESSED_FOLDER'], shown,
+                                  columns=[index.text_col, 'sentiment', 'sentiment_score'])
+    if matches is None:
+        return jsonify({'error': 'No data'}), 400
+    matches = matches.astype(object)
+    matches = matches.where(matches.notna(), None)
+
+    results = [{'row': int(row),
+                'text': rec.get(index.text_col),
+                'sentiment': rec.get('sentiment'),
+                'sentiment_score': rec.get('sentiment_score')}
+               for row, rec in zip(shown, matches.to_dict(orient='records'))]
+    return jsonify({'query': query,
+                    'total': int(len(rows)),
+                    'sentiment_breakdown': index.sentiment_counts(rows),
+                    'results': results})
+
+@app.route('/api/trends')
+def trends_api():
+    """
+    Sentiment counts and mean score per bucket for the current dataset,
+    from its rollups. Query args: granularity (hour, day, week, month),
+    start, end (exclusive, as in /api/compare), window (buckets for rolling averages), fill (0 skips empty buckets).
+    """
+    if 'current_filename' not in session:
+        return jsonify({'error': 'No data'}), 400
+    try:
+        start = pd.Timestamp(request.args['start']) if request.args.get('start') else None
+        end = pd.Timestamp(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end date'}), 400
+    window = request.args.get('window', type=int)
+
+    rollups = get_rollups(session['current_filename'], app.config['PROCESSED_FOLDER'])
+    if rollups is None:
+        return jsonify({'error': 'No data'}), 400
+    try:
+        trend = rollups.query(request.args.get('granularity', 'day'), start, end, window,
+                              fill=request.args.get('fill', '1') != '0')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(trend)
+
+# --- Cross-Dataset Comparison API ---
+def _csv_arg(name):
+    return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+
+@app.route('/api/compare/sources')
+def compare_sources_api():
+    manifest = consolidated_store.manifest()
+    return jsonify({'sources': [{'source': source,
+                                 'video_id': entry.get('video_id'),
+                                 'rows': entry.get('rows'),
+                                 'date_min': entry.get('date_min'),
+                                 'date_max': entry.get('date_max')}
+                                for source, entry in sorted(manifest.items())]})
+
+@app.route('/api/compare')
+def compare_api():
+    """
+    Sentiment share, trend and top keywords across datasets.
+    Query args: sources, video_ids (comma-separated, default all), include
+    (sentiment,trend,keywords), granularity, start, end (dates in [start, end)), top_n.
+    """
+    include = set(_csv_arg('include') or ['sentiment', 'trend', 'keywords'])
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    try:
+        start = pd.Timestamp(request.args['start']) if request.args.get('start') else None
+        end = pd.Timestamp(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end date'}), 400
+    top_n = min(max(request.args.get('top_n', 10, type=int), 1), 100)
+
+    sources = consolidated_store.select_sources(_csv_arg('sources'), _csv_arg('video_ids'))
+    result = {'sources': sources}
+    try:
+        if 'sentiment' in include:
+            result['sentiment'] = consolidated_store.sentiment_share(sources, start, end)
+        if 'trend' in include:
+            result['trend'] = consolidated_store.sentiment_trend(sources, granularity, start, end)
+    except ValueError as e:
+        # Parsed but unusable bounds (NaT, out of range)
+        return jsonify({'error': str(e)}), 400
+    if 'keywords' in include:
+        result['keywords'] = consolidated_store.top_keywords(sources, top_n)
+    return jsonify(result)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    score_cache = get_score_cache()
+    response_cache = get_response_cache()
+    return jsonify({'frames': frame_cache.stats(),
+                    'sentiment_scores': score_cache.stats() if score_cache else None,
+                    'llm_responses': response_cache.stats() if response_cache else None,
+                    'chat_latency': chat_latency.stats()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.enabled:
+        return Response("Metrics are disabled (METRICS=0)\n", status=404, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     if not os.path.exists(UPLOAD_FOLDER): os.makedirs(UPLOAD_FOLDER)
     app.run(debug=True)
\ No newline at end of file
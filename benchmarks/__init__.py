@@ -0,0 +1 @@
+"""Pipeline benchmarks on synthetic comment data. Not part of the app; see benchmarks/run.py."""
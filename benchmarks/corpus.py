@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# --- Synthetic Comment Corpus ---
+# Comments are stitched together from short fragments so every sentiment
+# class, the issue taxonomy keywords and plenty of filler vocabulary show
+# up, with the skew real comment dumps have: a few very active authors,
+# Zipf-distributed likes, activity fading after the upload, a long tail of
+# rare words and lots of repeated short comments.
+
+OPENERS = ["", "", "", "Honestly, ", "Ngl ", "Update: ", "Lol ", "Wow, ", "Idk but ", "Tbh "]
+
+SUBJECTS = [
+    "the battery", "this phone", "the camera", "the new update", "customer service", "the price",
+    "delivery", "the app", "the screen", "this video", "the sound quality", "the design",
+    "support", "shipping", "the editing", "the host", "the ending", "the refund process",
+]
+
+OPINIONS = {
+    'Positive': [
+        "is amazing", "is absolutely great", "works perfectly", "made my day", "is so good",
+        "is the best I've seen", "was worth every penny", "is really helpful", "is beautiful",
+    ],
+    'Negative': [
+        "is terrible", "is broken again", "keeps crashing", "is way too expensive", "was delayed for weeks",
+        "is slow and full of bugs", "never arrived", "is poor quality", "gives an error every time",
+        "is overpriced", "was faulty out of the box", "has awful lag",
+    ],
+    'Neutral': [
+        "is okay I guess", "arrived on tuesday", "is available in blue", "was mentioned at 3:20",
+        "looks different from last year", "is in the description", "comes in two sizes",
+    ],
+}
+
+TAILS = ["", "", "", "!", "!!", ".", "...", " 😂", " 🔥", " 💔", " #fyp", " lmao", " fr"]
+
+# Short comments that get posted over and over
+STOCK_COMMENTS = [
+    "First!", "Who's watching in 2024?", "❤️❤️❤️", "Great video", "Love this", "This is so bad",
+    "Came here from TikTok", "W", "L", "Underrated", "Thanks for sharing", "Worst take ever",
+]
+
+# Made-up words for the long tail (8000 of them, Zipf-distributed)
+_SYLLABLES = ["ka", "ro", "mi", "ta", "zen", "lu", "vo", "shi", "bel", "dra",
+              "po", "qui", "nex", "sa", "tor", "ul", "fe", "gri", "mo", "yan"]
+FILLER_WORDS = [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES]
+
+def _pick(rng, options, n, p=None):
+    return np.asarray(options, dtype=object)[rng.choice(len(options), size=n, p=p)]
+
+def generate_comments(n, seed=0, duplicate_rate=0.15, start='2024-01-01', days=180):
+    """
+    Builds a deterministic synthetic comment dump.
+
+    Args:
+        n (int): Number of rows.
+        seed (int): Random seed; the same (n, seed) always gives the same frame.
+        duplicate_rate (float): Share of rows that repeat a stock comment or
+            an earlier comment verbatim.
+        start (str): First comment date.
+        days (int): Span of the comment dates.
+
+    Returns:
+        pd.DataFrame: Columns video_title, author, comment, date, likes.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Mix of sentiments roughly like a busy comment section
+    labels = rng.choice(['Positive', 'Negative', 'Neutral'], size=n, p=[0.45, 0.3, 0.25])
+    opinions = np.empty(n, dtype=object)
+    for label, options in OPINIONS.items():
+        mask = labels == label
+        opinions[mask] = _pick(rng, options, int(mask.sum()))
+
+    openers = pd.Series(_pick(rng, OPENERS, n))
+    subjects = pd.Series(_pick(rng, SUBJECTS, n))
+    subjects = subjects.where(openers != "", subjects.str.capitalize())
+    comments = openers + subjects + " " + pd.Series(opinions)
+
+    # Up to three rare words per comment keep most texts distinct
+    n_filler = rng.choice(4, size=n, p=[0.2, 0.4, 0.3, 0.1])
+    for k in range(1, 4):
+        rows = np.flatnonzero(n_filler >= k)
+        words = np.minimum(rng.zipf(1.2, size=len(rows)), len(FILLER_WORDS)) - 1
+        comments.iloc[rows] = comments.iloc[rows] + " " + np.asarray(FILLER_WORDS, dtype=object)[words]
+    comments = comments + pd.Series(_pick(rng, TAILS, n))
+
+    # Duplicates: half stock comments, half copies of earlier rows
+    dup = np.flatnonzero(rng.random(n) < duplicate_rate)
+    stock = dup[rng.random(len(dup)) < 0.5]
+    comments.iloc[stock] = _pick(rng, STOCK_COMMENTS, len(stock))
+    copies = np.setdiff1d(dup, stock)
+    copies = copies[copies > 0]
+    comments.iloc[copies] = comments.to_numpy()[(rng.random(len(copies)) * copies).astype(np.int64)]
+
+    # A few authors write most comments
+    n_authors = max(1, n // 5)
+    authors = np.minimum(rng.zipf(1.3, size=n), n_authors) - 1
+    author = pd.Series(authors).map(lambda i: f"@user{i:06d}")
+
+    # Activity fades after the video is posted
+    offsets = np.minimum(rng.exponential(days / 4, size=n), days - 1e-6)
+    date = pd.Timestamp(start) + pd.to_timedelta(np.sort(offsets) * 86400, unit='s')
+
+    likes = np.minimum(rng.zipf(2.0, size=n) - 1, 100000)
+
+    titles = [f"Benchmark video #{i}" for i in range(1, 6)]
+    return pd.DataFrame({
+        'video_title': _pick(rng, titles, n),
+        'author': author,
+        'comment': comments,
+        'date': date.strftime('%Y-%m-%d %H:%M:%S'),
+        'likes': likes,
+    })
+
+def write_corpus(path, n, seed=0, **kwargs):
+    """Writes generate_comments(n, seed) to a CSV file and returns the path."""
+    generate_comments(n, seed=seed, **kwargs).to_csv(path, index=False)
+    return path
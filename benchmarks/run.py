@@ -0,0 +1,191 @@
+"""
+Times the analysis pipeline on synthetic comment dumps.
+
+    python -m benchmarks.run                          # 10k and 100k rows
+    python -m benchmarks.run --sizes 10k,100k,1M --repeat 3
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+
+Run from the repository root (the issue taxonomy is read from config/).
+Each run writes a JSON results file; --compare prints the ratio against an
+earlier file and exits with status 1 if any benchmark got slower than
+--threshold times its baseline.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import contextlib
+import tempfile
+
+from benchmarks.corpus import write_corpus
+
+# --- Configuration ---
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = '10k,100k'
+# Slower than baseline by more than this factor counts as a regression
+DEFAULT_THRESHOLD = 1.25
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+def _setup(csv_path):
+    """The benchmarked steps, in pipeline order. Each takes the frame built by the steps before."""
+    from pipeline.ingest import load_dataframe
+    from analyzers.sentiment_model import analyze_sentiment, get_sentiment_trends
+    from analyzers.market_analyzer import get_trending_topics, detect_emerging_issues
+    from analyzers.keyword_model import extract_keywords_analysis
+    from pipeline.dashboard import generate_advanced_charts
+
+    return [
+        ('load_dataframe', lambda df: load_dataframe(csv_path)),
+        # Score cache off: measure scoring, not SQLite lookups
+        ('analyze_sentiment', lambda df: analyze_sentiment(df.copy(), use_cache=False)),
+        ('get_sentiment_trends', lambda df: get_sentiment_trends(df)),
+        ('get_trending_topics', lambda df: get_trending_topics(df)),
+        ('detect_emerging_issues', lambda df: detect_emerging_issues(df)),
+        ('extract_keywords_analysis', lambda df: extract_keywords_analysis(df)),
+        ('generate_advanced_charts', lambda df: generate_advanced_charts(df)),
+    ]
+
+def warm_up():
+    """Loads what the app loads once per process (stopwords, issue taxonomy) so it isn't timed."""
+    from analyzers.tokenizer import get_stop_words
+    from analyzers.issue_matcher import get_issue_matcher
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        get_stop_words()
+        try:
+            get_issue_matcher()
+        except (OSError, ValueError) as e:
+            print(f"Issue taxonomy unavailable ({e}); run from the repository root", file=sys.stderr)
+
+def _time(fn, arg, repeat):
+    """Returns (timings, last result), with the steps' own progress output silenced."""
+    timings, result = [], None
+    for _ in range(repeat):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = fn(arg)
+            timings.append(time.perf_counter() - start)
+    return timings, result
+
+def run_size(n, repeat, seed, only=None):
+    """Benchmarks every step on an n-row corpus. Returns a list of result records."""
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_corpus(os.path.join(tmp, f'bench_{n}.csv'), n, seed=seed)
+        df = None
+        for name, step in _setup(csv_path):
+            # Later steps need the loaded and scored frame even if these two aren't reported
+            builds_frame = name in ('load_dataframe', 'analyze_sentiment')
+            if only and name not in only:
+                if builds_frame:
+                    df = _time(step, df, 1)[1]
+                continue
+            timings, result = _time(step, df, repeat)
+            if builds_frame:
+                df = result
+            best = min(timings)
+            record = {
+                'benchmark': name,
+                'rows': n,
+                'repeat': repeat,
+                'min_s': round(best, 6),
+                'median_s': round(statistics.median(timings), 6),
+                'rows_per_s': round(n / best) if best else None,
+            }
+            records.append(record)
+            print(f"{n:>9,} rows  {name:<26} {best * 1000:10.1f} ms  {record['rows_per_s'] or 0:>12,} rows/s")
+    return records
+
+def environment():
+    """What a result depends on besides the code: commit, Python, CPU."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    import numpy
+    import pandas
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Prints current vs baseline min times per (benchmark, rows) and returns
+    the keys that regressed by more than `threshold`.
+    """
+    base = {(r['benchmark'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n--- Compared with {baseline['environment'].get('commit')} "
+          f"({baseline['environment'].get('timestamp')}) ---")
+    for r in current['results']:
+        key = (r['benchmark'], r['rows'])
+        if key not in base or not base[key]['min_s']:
+            continue
+        ratio = r['min_s'] / base[key]['min_s']
+        flag = ''
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{r['rows']:>9,} rows  {r['benchmark']:<26} {base[key]['min_s'] * 1000:10.1f} -> "
+              f"{r['min_s'] * 1000:10.1f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic comments.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Comma-separated row counts, e.g. 10k,100k,1M")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per step; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default='', help="Comma-separated benchmark names to report")
+    parser.add_argument('--out', default=None, help="Results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+
+    env = environment()
+    warm_up()
+    results = []
+    for n in sizes:
+        results.extend(run_size(n, args.repeat, args.seed, only=only))
+    current = {'environment': env, 'seed': args.seed, 'results': results}
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{env['commit'] or 'nogit'}.json")
+    with open(out, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\n--- Results written to {out} ---")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than x{args.threshold} of baseline")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,37 +1,174 @@
 import os
 import json
+import time
+import threading
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+
+from chat.llm_cache import get_response_cache, response_key
+from pipeline.metrics import metrics, stage
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+# 'groq' (default) or 'fake' for offline runs
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
 
-# Initialize the Groq client
-llm = ChatGroq(
-    temperature=0, 
-    groq_api_key=GROQ_API_KEY, 
-    model_name="llama-3.3-70b-versatile"
-)
+_llm = None
+_llm_lock = threading.Lock()
 
-def get_ollama_response(query: str, data_summary: str) -> str:
-    """Chat with the data."""
+def get_llm():
+    """Returns the chat model, creating it on first use."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            if LLM_BACKEND == 'fake':
+                from chat.fake_llm import FakeLLM
+                _llm = FakeLLM()
+            else:
+                from langchain_groq import ChatGroq
+                # Initialize the Groq client
+                _llm = ChatGroq(
+                    temperature=0,
+                    groq_api_key=GROQ_API_KEY,
+                    model_name=LLM_MODEL
+                )
+        return _llm
+
+def set_llm(llm):
+    """Swaps the chat model (e.g. for a FakeLLM in tests)."""
+    global _llm
+    with _llm_lock:
+        _llm = llm
+
+def cached_invoke(messages, context, prompt):
+    """
+    Runs the model on messages, reusing an earlier answer for the same
+    grounding context, prompt and model. Identical requests in flight at the
+    same time share one model call.
+    """
+    llm = get_llm()
+
+    def invoke():
+        with stage('llm.invoke'):
+            return llm.invoke(messages).content
+
+    cache = get_response_cache()
+    if cache is None:
+        return invoke()
+    model = getattr(llm, 'model_name', None) or type(llm).__name__
+    key = response_key(context, prompt, model)
+    return cache.get_or_compute(key, invoke)
+
+class LatencyStats:
+    """Time-to-first-token and total latency of chat answers, in milliseconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.ttft_total = 0.0
+        self.ttft_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, ttft_ms, total_ms):
+        metrics.observe('chat_ttft_seconds', ttft_ms / 1000)
+        metrics.observe('chat_latency_seconds', total_ms / 1000)
+        with self._lock:
+            self.count += 1
+            self.ttft_total += ttft_ms
+            self.ttft_max = max(self.ttft_max, ttft_ms)
+            self.latency_total += total_ms
+            self.latency_max = max(self.latency_max, total_ms)
+
+    def stats(self):
+        with self._lock:
+            n = self.count
+            return {
+                'answers': n,
+                'ttft_avg_ms': round(self.ttft_total / n, 1) if n else 0,
+                'ttft_max_ms': round(self.ttft_max, 1),
+                'total_avg_ms': round(self.latency_total / n, 1) if n else 0,
+                'total_max_ms': round(self.latency_max, 1),
+            }
+
+chat_latency = LatencyStats()
+
+def build_chat_messages(query, data_summary, comments=""):
+    """System + user messages for a chat question. `comments` are retrieved comments relevant to it."""
+    if comments:
+        data_summary = f"{data_summary}\n\n--- COMMENTS RELEVANT TO THE QUESTION ---\n{comments}"
     system_prompt = f"""
     You are a Data Analyst. Answer based ONLY on this summary:
     {data_summary}
     If the answer isn't there, say so. Keep answers concise.
     """
-    
+
     messages = [
         ("system", system_prompt),
         ("human", query),
     ]
-    
+    return messages, data_summary
+
+def get_ollama_response(query: str, data_summary: str, comments: str = "") -> str:
+    """Chat with the data."""
+    messages, context = build_chat_messages(query, data_summary, comments)
+    start = time.perf_counter()
     try:
-        response = llm.invoke(messages)
-        return response.content
+        answer = cached_invoke(messages, context, query)
     except Exception as e:
         return f"AI Error: {str(e)}"
+    # Without streaming the first token arrives with the last
+    elapsed = (time.perf_counter() - start) * 1000
+    chat_latency.record(elapsed, elapsed)
+    return answer
+
+def stream_ollama_response(query, data_summary, comments="", metrics=None):
+    """
+    Chat with the data, yielding the answer in pieces as the model produces
+    them. A cached answer is yielded whole. Streamed answers are cached once
+    complete but, unlike get_ollama_response, concurrent identical questions
+    are not coalesced.
+
+    If given, `metrics` is filled with ttft_ms, total_ms and cached when the
+    stream ends.
+    """
+    metrics = {} if metrics is None else metrics
+    messages, context = build_chat_messages(query, data_summary, comments)
+    llm = get_llm()
+    cache = get_response_cache()
+    key = None
+    start = time.perf_counter()
+
+    if cache is not None:
+        key = response_key(context, query, getattr(llm, 'model_name', None) or type(llm).__name__)
+        cached = cache.get(key)
+        cache.count_lookup(cached is not None)
+        if cached is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.update(ttft_ms=round(elapsed, 1), total_ms=round(elapsed, 1), cached=True)
+            chat_latency.record(elapsed, elapsed)
+            yield cached
+            return
+
+    parts = []
+    ttft = None
+    for chunk in llm.stream(messages):
+        text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+        if not text:
+            continue
+        if ttft is None:
+            ttft = (time.perf_counter() - start) * 1000
+        parts.append(text)
+        yield text
+
+    total = (time.perf_counter() - start) * 1000
+    ttft = total if ttft is None else ttft
+    metrics.update(ttft_ms=round(ttft, 1), total_ms=round(total, 1), cached=False)
+    chat_latency.record(ttft, total)
+    print(f"--- Chat answer streamed: first token {ttft:.0f} ms, total {total:.0f} ms ---")
+    if cache is not None and parts:
+        cache.put(key, "".join(parts))
 
 def get_ai_insights(df, filename):
     """
@@ -43,16 +180,16 @@ def get_ai_insights(df, filename):
         "cols": list(df.columns),
         "sentiment_counts": df['sentiment'].value_counts().to_dict() if 'sentiment' in df.columns else "No sentiment data",
     }
-    
+
     prompt = f"""
     Analyze this dataset metadata for '{filename}': {json.dumps(stats)}
-    
-    Provide 3 brief, high-level business insights or observations in a numbered list. 
+
+    Provide 3 brief, high-level business insights or observations in a numbered list.
     Focus on sentiment balance and data volume.
     """
-    
+
     try:
-        response = llm.invoke(prompt)
-        return response.content
+        # The prompt embeds the dataset stats, so it is its own context
+        return cached_invoke(prompt, prompt, 'insights')
     except Exception as e:
-        return f"Could not generate insights. Error: {str(e)}"
\ No newline at end of file
+        return f"Could not generate insights. Error: {str(e)}"
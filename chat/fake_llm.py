@@ -0,0 +1,47 @@
+import time
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+class FakeLLM:
+    """
+    Offline stand-in for the Groq chat model (LLM_BACKEND=fake).
+
+    Answers are canned: the next entry of `responses` if given, otherwise an
+    echo of the last prompt. `latency` simulates time to the first token,
+    `token_latency` the time per streamed word, and `calls` counts model
+    invocations, which is what the response cache should save.
+    """
+
+    def __init__(self, responses=None, latency=0.0, token_latency=0.0, model_name='fake-llm'):
+        self.responses = list(responses or [])
+        self.latency = latency
+        self.token_latency = token_latency
+        self.model_name = model_name
+        self.calls = 0
+
+    def _answer(self, messages):
+        self.calls += 1
+        if self.responses:
+            return self.responses[(self.calls - 1) % len(self.responses)]
+        if isinstance(messages, str):
+            prompt = messages
+        else:
+            last = messages[-1]
+            prompt = last[1] if isinstance(last, tuple) else getattr(last, 'content', str(last))
+        return f"[fake answer] {' '.join(str(prompt).split())[:200]}"
+
+    def invoke(self, messages):
+        answer = self._answer(messages)
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=answer)
+
+    def stream(self, messages):
+        """Yields the answer word by word, like a streaming chat model."""
+        answer = self._answer(messages)
+        if self.latency:
+            time.sleep(self.latency)
+        words = answer.split(' ')
+        for i, word in enumerate(words):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield AIMessageChunk(content=word if i == len(words) - 1 else word + ' ')
@@ -0,0 +1,198 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+
+# --- Configuration ---
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('data', 'processed', 'llm_cache.db'))
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000))
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') != '0'
+
+# Pending last-used updates written in one go once this many pile up
+_TOUCH_FLUSH = 100
+
+def normalize_prompt(prompt):
+    """Case and whitespace don't change the question."""
+    return " ".join(str(prompt).split()).casefold()
+
+def response_key(context, prompt, model):
+    """
+    Cache key for one LLM call: a hash of the data the answer is grounded
+    on (e.g. the dataset summary), the normalized prompt and the model name.
+    """
+    context_hash = hashlib.blake2b(str(context).encode('utf-8'), digest_size=16).hexdigest()
+    raw = json.dumps([context_hash, normalize_prompt(prompt), model])
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ResponseCache:
+    """
+    Disk-backed map of response key -> LLM answer.
+
+    Entries expire `ttl` seconds after they were stored; past `max_entries`
+    the least recently used tenth is evicted. Hits don't write: their
+    last-used times are remembered in memory and written in one batch with
+    the next put or once _TOUCH_FLUSH are pending. Concurrent misses on the
+    same key are coalesced: one caller runs the model, the others wait for it.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # key -> last-used time not yet written
+        self._touched = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created REAL NOT NULL, used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Returns the cached response, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._touched.pop(key, None)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= _TOUCH_FLUSH:
+                self._flush_touched()
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._flush_touched()
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, response, created, used) VALUES (?, ?, ?, ?)",
+                               (key, response, now, now))
+            self._conn.commit()
+            self._evict(now)
+
+    def count_lookup(self, hit):
+        """Counts a lookup made with get() outside get_or_compute (e.g. streamed answers)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached response for key, or runs compute() once and
+        caches its result. Exceptions from compute() reach every waiting
+        caller and are not cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _flush_touched(self):
+        """Writes pending last-used times (the caller commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET used = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            # Evict down to 90% so we don't pay for eviction on every insert
+            excess = count - int(self.max_entries * 0.9)
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used ASC LIMIT ?)", (excess,))
+            self.evictions += excess
+        self._conn.commit()
+
+    def stats(self):
+        """Returns hit/miss/coalesced counters and the current entry count."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._touched.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Returns the process-wide cache, or None if disabled or unavailable."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache()
+            except Exception as e:
+                print(f"LLM response cache unavailable: {e}")
+                return None
+        return _cache
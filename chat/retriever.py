@@ -1,10 +1,27 @@
-import pandas as pd
+import os
 import io
+import numpy as np
+import pandas as pd
+
+from analyzers.sentiment_model import find_date_column, find_text_column, parse_dates
+from pipeline.store import (PROCESSED_FOLDER, DerivedCache, load_processed_rows,
+                            save_npz, load_npz, save_json, load_json, stored_text_column)
+from pipeline.metrics import timed
+
+# --- LLM Summary Configuration ---
+# Rough size limit for the data summary sent with every chat message
+LLM_SUMMARY_TOKENS = int(os.getenv('LLM_SUMMARY_TOKENS', 1500))
+# Average for English text with the Llama tokenizer; close enough for budgeting
+CHARS_PER_TOKEN = 4
+_MAX_LINE_CHARS = 200
+# Bump when summary_sections changes, so persisted summaries are rebuilt
+SUMMARY_FORMAT = 3
 
+@timed('summary.build')
 def get_summary(df, filename, for_llm=False):
     """
     Generates a comprehensive summary of the DataFrame.
-    
+
     Args:
         df (pd.DataFrame): The DataFrame to summarize.
         filename (str): The name of the file.
@@ -13,19 +30,27 @@ def get_summary(df, filename, for_llm=False):
     Returns:
         dict or str: A dictionary of summary stats, or a text blob if for_llm=True.
     """
-    
+
+    # The LLM gets a compact, budgeted summary (see build_llm_summary)
+    if for_llm:
+        try:
+            return build_llm_summary(df, filename)
+        except Exception as e:
+            print(f"Error generating summary: {e}")
+            return "Error generating data summary."
+
     try:
         # Get column details (types, nulls)
         buffer = io.StringIO()
         df.info(buf=buffer)
         col_details = buffer.getvalue()
-        
+
         # Get numerical summary
         numeric_df = df.select_dtypes(include=['number'])
         num_summary = "No numerical data."
         if not numeric_df.empty:
             num_summary = numeric_df.describe().to_string()
-            
+
         # Get categorical summary
         cat_df = df.select_dtypes(include=['object', 'category'])
         cat_summary = "No categorical data."
@@ -33,36 +58,282 @@ def get_summary(df, filename, for_llm=False):
             cat_summary = cat_df.describe().to_string()
 
         # Format for display (dict)
-        if not for_llm:
-            return {
-                'Total Rows': df.shape[0],
-                'Total Columns': df.shape[1],
-                'File Name': filename.replace('data\\', '').replace('data/', ''),
-                'Column Details': col_details,
-                'Numerical Data Summary': num_summary,
-                'Categorical Data Summary': cat_summary
-            }
-        
-        # Format for LLM (text blob)
+        return {
+            'Total Rows': df.shape[0],
+            'Total Columns': df.shape[1],
+            'File Name': filename.replace('data\\', '').replace('data/', ''),
+            'Column Details': col_details,
+            'Numerical Data Summary': num_summary,
+            'Categorical Data Summary': cat_summary
+        }
+
+    except Exception as e:
+        print(f"Error generating summary: {e}")
+        return {"Error": str(e)}
+
+# --- LLM Summary ---
+def _clip(text, limit=_MAX_LINE_CHARS):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+def _fmt(value):
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+def summary_sections(df, filename):
+    """
+    The facts an LLM can use to answer questions about df, as
+    (title, lines) sections in priority order: what the data is and how
+    people feel first, then the schema, categories and numeric ranges.
+    """
+    name = filename.replace('data\\', '').replace('data/', '')
+    sections = [('FILE INFO', [f"File: {name}", f"Rows: {len(df)}", f"Columns: {df.shape[1]}"])]
+
+    if 'sentiment' in df.columns:
+        counts = df['sentiment'].value_counts()
+        total = int(counts.sum())
+        lines = [f"{label}: {int(n)} ({n / total:.1%})" for label, n in counts.items()] if total else []
+        if 'sentiment_score' in df.columns:
+            scores = pd.to_numeric(df['sentiment_score'], errors='coerce')
+            lines.append(f"Mean sentiment score: {scores.mean():.3f} (range -1 to 1)")
+        sections.append(('SENTIMENT', lines))
+
+    date_col = find_date_column(df)
+    if date_col is not None:
+        dates = parse_dates(df[date_col]).dropna()
+        if not dates.empty:
+            sections.append(('TIME RANGE', [f"{date_col}: {dates.min()} to {dates.max()}"]))
+
+    sections.append(('COLUMNS (name, type, non-null)',
+                     [f"{col}: {dtype}, {int(n)} non-null"
+                      for col, dtype, n in zip(df.columns, df.dtypes, df.notna().sum())]))
+
+    # Low-cardinality columns say the most per line; free text says little here
+    text_col = find_text_column(df)
+    categorical = [col for col in df.select_dtypes(include=['object', 'category', 'string']).columns
+                   if col not in (text_col, 'sentiment', date_col)]
+    cat_lines = []
+    for col in sorted(categorical, key=lambda c: df[c].nunique()):
+        top = df[col].value_counts().head(3)
+        values = ", ".join(f"{_clip(v, 40)} ({int(n)})" for v, n in top.items())
+        cat_lines.append(f"{col}: {df[col].nunique()} unique; most common: {values}")
+    if cat_lines:
+        sections.append(('CATEGORICAL COLUMNS', cat_lines))
+
+    numeric = df.select_dtypes(include=['number'])
+    if not numeric.empty:
+        stats = numeric.describe().T
+        sections.append(('NUMERICAL COLUMNS (mean, std, min, median, max)',
+                         [f"{col}: {_fmt(row['mean'])}, {_fmt(row['std'])}, {_fmt(row['min'])}, "
+                          f"{_fmt(row['50%'])}, {_fmt(row['max'])}"
+                          for col, row in stats.iterrows()]))
+    return sections
+
+def compact_summary(sections, budget_tokens=None):
+    """
+    Joins sections into prompt text of at most `budget_tokens` (estimated),
+    keeping earlier sections whole before later ones get any space.
+    """
+    budget = (budget_tokens or LLM_SUMMARY_TOKENS) * CHARS_PER_TOKEN
+    out = []
+    used = 0
+    for title, lines in sections:
+        header = f"--- {title} ---"
+        if not lines or used + len(header) + len(_clip(lines[0])) + 2 > budget:
+            continue
+        out.append(header)
+        used += len(header) + 1
+        for i, line in enumerate(lines):
+            line = _clip(line)
+            if used + len(line) + 1 > budget:
+                note = f"({len(lines) - i} more not shown)"
+                if used + len(note) + 1 <= budget:
+                    out.append(note)
+                    used += len(note) + 1
+                break
+            out.append(line)
+            used += len(line) + 1
+    return "\n".join(out)
+
+@timed('summary.build_llm')
+def build_llm_summary(df, filename, budget_tokens=None):
+    return compact_summary(summary_sections(df, filename), budget_tokens)
+
+# Summaries of recently used datasets stay loaded, so chat messages skip the disk
+llm_summaries = DerivedCache('llm_summary', '.llm_summary.json', SUMMARY_FORMAT,
+                             build=lambda df, filename, folder, budget: build_llm_summary(df, filename, budget),
+                             save=save_json, load=load_json, max_loaded=32)
+
+def get_llm_summary(filename, folder=PROCESSED_FOLDER, df=None, budget_tokens=None):
+    """
+    The LLM summary for the current version of a processed dataset, built
+    once per version and budget and persisted next to the artifact.
+    Returns None if there is no processed data.
+    """
+    return llm_summaries.get(filename, folder, df, params=(budget_tokens or LLM_SUMMARY_TOKENS,))
+
+# --- Comment Retrieval ---
+# TF-IDF search over the text column, so chat answers can quote what people
+# actually said about the topic of the question.
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', 8))
+RETRIEVAL_MAX_CHARS = int(os.getenv('RETRIEVAL_MAX_CHARS', 3000))
+RETRIEVAL_MAX_FEATURES = int(os.getenv('RETRIEVAL_MAX_FEATURES', 100000))
+_COMMENT_CHARS = 300
+# Bump when CommentIndex.build changes so stored indexes are rebuilt
+COMMENT_INDEX_FORMAT = 2
+
+def _tfidf_analyzer():
+    # scikit-learn is only needed once a dataset is indexed or queried
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words='english', sublinear_tf=True).build_analyzer()
+
+class CommentIndex:
+    """
+    TF-IDF vectors of the distinct texts of a dataset.
+
+    The matrix is stored term-major (CSR over terms), so scoring a query
+    only touches the postings of its own terms rather than every document.
+    Each document keeps the first row it appears in and how many rows
+    repeat it.
+    """
+
+    def __init__(self, text_col, vocab, idf, indptr, docs, weights, first_rows, counts):
+        self.text_col = text_col
+        self.vocab = vocab
+        self.idf = idf
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        self.first_rows = first_rows
+        self.counts = counts
+        self._ids = {term: i for i, term in enumerate(vocab)}
+        self._analyzer = None
+
+    @classmethod
+    @timed('comment_index.build')
+    def build(cls, df, text_col=None):
+        """
+        Indexes `text_col` of df (default: the column find_text_column
+        picks), or returns None if there is none.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        text_col = text_col or find_text_column(df)
+        if not text_col or text_col not in df.columns:
+            return None
+        texts = df[text_col].reset_index(drop=True)
+        texts = texts[texts.notna()].astype(str)
+        codes, uniques = pd.factorize(texts)
+        if len(uniques) == 0:
+            return None
+
+        vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True,
+                                     max_features=RETRIEVAL_MAX_FEATURES, dtype=np.float32)
+        try:
+            matrix = vectorizer.fit_transform(uniques)
+        except ValueError:
+            # Nothing but stopwords / punctuation
+            return None
+        by_term = matrix.T.tocsr()
+
+        rows = texts.index.to_numpy()
+        first_rows = np.full(len(uniques), -1, dtype=np.int64)
+        # Reverse so the earliest row of each text is written last
+        first_rows[codes[::-1]] = rows[::-1]
+        counts = np.bincount(codes, minlength=len(uniques))
+        vocab = vectorizer.get_feature_names_out().tolist()
+        return cls(text_col, vocab, vectorizer.idf_.astype(np.float32), by_term.indptr.astype(np.int64),
+                   by_term.indices.astype(np.int32), by_term.data, first_rows, counts)
+
+    def query_vector(self, query):
+        """(term ids, weights) of the query, weighted and normalized like the documents."""
+        if self._analyzer is None:
+            self._analyzer = _tfidf_analyzer()
+        terms = pd.Series([self._ids.get(t) for t in self._analyzer(str(query))], dtype=object).dropna()
+        if terms.empty:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        tf = terms.astype(np.int64).value_counts()
+        term_ids = tf.index.to_numpy()
+        weights = (1 + np.log(tf.to_numpy(dtype=np.float32))) * self.idf[term_ids]
+        return term_ids, weights / np.linalg.norm(weights)
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """Top-k (row, score, count) matches by cosine similarity, best first."""
+        term_ids, q = self.query_vector(query)
+        if len(term_ids) == 0:
+            return []
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        if len(positions) == 0:
+            return []
+        # Sum weight products per document over the query's postings
+        contrib = self.weights[positions] * np.repeat(q, ends - starts)
+        if len(positions) * 4 > len(self.first_rows):
+            # Common terms: a dense accumulator beats sorting the postings
+            scores = np.bincount(self.docs[positions], weights=contrib, minlength=len(self.first_rows))
+            docs = np.flatnonzero(scores)
+            scores = scores[docs]
         else:
-            llm_summary = f"""
-            Here is a summary of the data from the file '{filename}':
+            docs, inverse = np.unique(self.docs[positions], return_inverse=True)
+            scores = np.bincount(inverse, weights=contrib)
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.lexsort((docs[top], -scores[top]))]
+        return [(int(self.first_rows[docs[i]]), float(scores[i]), int(self.counts[docs[i]])) for i in top]
+
+    def save(self, path, stamp):
+        # scikit-learn terms are \w\w+ so a newline-joined string round-trips without pickling
+        save_npz(path, stamp, {'text_col': self.text_col},
+                 {'vocab': np.array("\n".join(self.vocab)), 'idf': self.idf, 'indptr': self.indptr,
+                  'docs': self.docs, 'weights': self.weights, 'first_rows': self.first_rows,
+                  'counts': self.counts})
 
-            --- FILE INFO ---
-            Total Rows: {df.shape[0]}
-            Total Columns: {df.shape[1]}
+    @classmethod
+    def load(cls, path):
+        """(stamp, index) of a saved index."""
+        stamp, header, arrays = load_npz(path)
+        vocab = str(arrays['vocab'])
+        return stamp, cls(header['text_col'], vocab.split("\n") if vocab else [], arrays['idf'],
+                          arrays['indptr'], arrays['docs'], arrays['weights'], arrays['first_rows'],
+                          arrays['counts'])
 
-            --- COLUMN DETAILS (Name, Type, Nulls) ---
-            {col_details}
+# Recently used indexes stay loaded, so chat messages don't touch the disk
+comment_indexes = DerivedCache('comment_index', '.tfidf.npz', COMMENT_INDEX_FORMAT,
+                               build=lambda df, filename, folder: CommentIndex.build(df, stored_text_column(filename, folder)),
+                               save=CommentIndex.save, load=CommentIndex.load, max_loaded=4)
 
-            --- NUMERICAL DATA SUMMARY ---
-            {num_summary}
+def get_comment_index(filename, folder=PROCESSED_FOLDER, df=None):
+    """
+    Returns the TF-IDF index for the current artifact version, loading or
+    (re)building and persisting it as needed. None if nothing to index.
+    """
+    return comment_indexes.get(filename, folder, df)
 
-            --- CATEGORICAL DATA SUMMARY ---
-            {cat_summary}
-            """
-            return llm_summary
+@timed('chat.retrieve')
+def retrieve_comments(filename, query, folder=PROCESSED_FOLDER, k=None, max_chars=None):
+    """
+    The comments most relevant to a question, formatted for the prompt and
+    capped at `max_chars`. Returns "" when nothing matches.
+    """
+    index = get_comment_index(filename, folder)
+    if index is None:
+        return ""
+    matches = index.search(query, k or RETRIEVAL_TOP_K)
+    if not matches:
+        return ""
 
-    except Exception as e:
-        print(f"Error generating summary: {e}")
-        return "Error generating data summary." if for_llm else {"Error": str(e)}
\ No newline at end of file
+    # Only the matched rows are read from the mapped artifact
+    rows = load_processed_rows(filename, folder, [row for row, _, _ in matches],
+                               columns=[index.text_col, 'sentiment'])
+    if rows is None:
+        return ""
+    budget = max_chars or RETRIEVAL_MAX_CHARS
+    lines = []
+    used = 0
+    for (_, _, count), text, sentiment in zip(matches, rows[index.text_col], rows.get('sentiment', [None] * len(rows))):
+        label = f"[{sentiment}] " if isinstance(sentiment, str) else ""
+        repeats = f" (x{count})" if count > 1 else ""
+        line = f"- {label}{_clip(text, _COMMENT_CHARS)}{repeats}"
+        if used + len(line) + 1 > budget:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
@@ -1,19 +1,192 @@
-import nltk
 import os
+import json
+import threading
 
+# --- Configuration ---
 # Download to a local directory within the project
-nltk_data_dir = os.path.join(os.getcwd(), 'nltk_data')
-if not os.path.exists(nltk_data_dir):
-    os.makedirs(nltk_data_dir)
+NLTK_DATA_DIR = os.getenv('NLTK_DATA_DIR', os.path.join(os.getcwd(), 'nltk_data'))
+# Off by default: corpora are installed with `python nltk_setup.py` at
+# build time, and the app never reaches the network for them
+NLTK_AUTO_DOWNLOAD = os.getenv('NLTK_AUTO_DOWNLOAD', '0') == '1'
 
-print(f"Downloading NLTK data to {nltk_data_dir}...")
+# Resource name -> path nltk.data.find() resolves it by
+NLTK_RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+}
 
-nltk.data.path.append(nltk_data_dir)
+# Files a usable copy of a resource must hold, with a minimum size in
+# bytes, so a truncated download is never recorded as verified. Resources
+# not listed only need to hold some non-empty file.
+REQUIRED_FILES = {
+    'stopwords': {'english': 500},
+}
 
-try:
-    nltk.download('stopwords', download_dir=nltk_data_dir)
-    nltk.download('punkt', download_dir=nltk_data_dir)
-    nltk.download('punkt_tab', download_dir=nltk_data_dir)
-    print("NLTK data downloaded successfully.")
-except Exception as e:
-    print(f"Error downloading NLTK data: {e}")
+# Where each resource was found and the size and hash of every file in it,
+# so later startups verify it from disk instead of importing nltk (~1.5s)
+# and searching its data path. A resource that wasn't found is recorded
+# too, with the directories searched, so it is only looked up again once
+# one of them changes.
+MANIFEST_PATH = os.path.join(NLTK_DATA_DIR, 'verified.json')
+
+_lock = threading.Lock()
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(manifest):
+    try:
+        os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+        tmp = f"{MANIFEST_PATH}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, MANIFEST_PATH)
+    except OSError as e:
+        print(f"Could not write NLTK manifest: {e}")
+
+def _resource_files(path):
+    """relative path -> absolute path of the files of an unpacked resource (or its zip)."""
+    if os.path.isdir(path):
+        return {os.path.relpath(os.path.join(root, f), path).replace(os.sep, '/'): os.path.join(root, f)
+                for root, _, files in os.walk(path) for f in files}
+    if '.zip' in path:
+        archive = path.split('.zip', 1)[0] + '.zip'
+        return {os.path.basename(archive): archive}
+    return {}
+
+def _digest(path):
+    """{relative path: [size, hash]} for the files of a resource."""
+    from pipeline.fingerprint import hash_file
+    return {rel: [os.path.getsize(full), hash_file(full)] for rel, full in sorted(_resource_files(path).items())}
+
+def _usable(name, path):
+    """Required files are present and not truncated (unpacked resources only)."""
+    files = _resource_files(path)
+    if not any(os.path.getsize(full) > 0 for full in files.values()):
+        print(f"NLTK '{name}' at {path} is empty")
+        return False
+    if not os.path.isdir(path):
+        return True
+    for rel, min_size in REQUIRED_FILES.get(name, {}).items():
+        full = os.path.join(path, rel)
+        if not os.path.isfile(full) or os.path.getsize(full) < min_size:
+            print(f"NLTK '{name}' at {path} is incomplete: {rel} is missing or truncated")
+            return False
+    return True
+
+def _verified(name, entry):
+    """True if a manifest entry still matches the files on disk."""
+    if not isinstance(entry, dict) or not entry.get('files'):
+        return False
+    path = entry.get('path')
+    try:
+        if path and _digest(path) == entry['files']:
+            return True
+    except OSError:
+        pass
+    print(f"NLTK '{name}' at {path} changed since it was verified; checking again")
+    return False
+
+def _search_stamp(name, dirs):
+    """{directory: mtimes} of where a resource would be installed under each data directory."""
+    resource = NLTK_RESOURCES[name]
+    stamp = {}
+    for d in dirs:
+        mtimes = []
+        for rel in (os.path.dirname(resource), resource):
+            try:
+                mtimes.append(os.stat(os.path.join(d, rel)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        stamp[d] = mtimes
+    return stamp
+
+def _still_missing(name, entry):
+    """True if none of the directories a missing resource was searched in changed since."""
+    searched = entry.get('missing')
+    return (isinstance(searched, dict) and entry.get('nltk_data') == os.getenv('NLTK_DATA')
+            and _search_stamp(name, searched) == searched)
+
+def _locate(name, download):
+    """Finds a resource with nltk, downloading it if allowed. Returns its path or None."""
+    import nltk
+
+    if os.path.isdir(NLTK_DATA_DIR) and NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.append(NLTK_DATA_DIR)
+    try:
+        path = str(nltk.data.find(NLTK_RESOURCES[name]))
+        if _usable(name, path):
+            return path
+    except LookupError:
+        pass
+    if not download:
+        return None
+
+    print(f"Downloading NLTK '{name}' to {NLTK_DATA_DIR}...")
+    try:
+        os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+        if NLTK_DATA_DIR not in nltk.data.path:
+            nltk.data.path.append(NLTK_DATA_DIR)
+        nltk.download(name, download_dir=NLTK_DATA_DIR, quiet=True)
+        path = str(nltk.data.find(NLTK_RESOURCES[name]))
+        return path if _usable(name, path) else None
+    except Exception as e:
+        print(f"Error downloading NLTK '{name}': {e}")
+        return None
+
+def ensure_resource(name, download=None):
+    """
+    Returns the local path of an NLTK resource, or None if it is missing,
+    incomplete and can't be downloaded. Only the first lookup per install
+    touches nltk; after that the manifest answers from disk, as long as
+    the sizes and hashes of the resource's files still match it or, for a
+    missing resource, nothing changed where nltk would look for it.
+    """
+    download = NLTK_AUTO_DOWNLOAD if download is None else download
+    with _lock:
+        manifest = _read_manifest()
+        entry = manifest.get(name)
+        if isinstance(entry, dict) and 'missing' in entry:
+            if not download and _still_missing(name, entry):
+                return None
+        elif entry is not None and _verified(name, entry):
+            return entry['path']
+
+        path = _locate(name, download)
+        if path:
+            manifest[name] = {'path': path, 'files': _digest(path)}
+        else:
+            import nltk
+            # The data directory is searched once it exists, even if it didn't yet
+            dirs = list(dict.fromkeys([*nltk.data.path, NLTK_DATA_DIR]))
+            manifest[name] = {'missing': _search_stamp(name, dirs), 'nltk_data': os.getenv('NLTK_DATA')}
+        _write_manifest(manifest)
+        return path
+
+def load_stopwords(language='english'):
+    """
+    Returns the NLTK stopword list for a language, or None if the corpus
+    isn't available. Reads the corpus file directly when it is unpacked.
+    """
+    path = ensure_resource('stopwords')
+    if path is None:
+        return None
+    words_file = os.path.join(path, language)
+    if os.path.isfile(words_file):
+        with open(words_file, encoding='utf-8') as f:
+            return [w.strip() for w in f if w.strip()]
+
+    # Zipped corpus: let nltk's reader deal with it
+    from nltk.corpus import stopwords
+    return stopwords.words(language)
+
+if __name__ == '__main__':
+    print(f"Downloading NLTK data to {NLTK_DATA_DIR}...")
+    missing = [name for name in NLTK_RESOURCES if ensure_resource(name, download=True) is None]
+    if missing:
+        print(f"Error downloading NLTK data: missing {', '.join(missing)}")
+    else:
+        print("NLTK data downloaded successfully.")
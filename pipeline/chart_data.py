@@ -0,0 +1,71 @@
+import os
+import json
+import math
+import numpy as np
+
+# --- Configuration ---
+HISTOGRAM_BINS = int(os.getenv('CHART_HISTOGRAM_BINS', 20))
+# Time series longer than this are rolled up into coarser buckets
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 400))
+# Significant digits kept for floats in chart JSON
+CHART_FLOAT_DIGITS = 4
+
+# --- Aggregation ---
+# Charts are built from these summaries, never from per-row data, so the
+# payload size depends on the number of bins / points, not on the rows.
+
+def histogram_bins(values, bins=None, value_range=(-1.0, 1.0)):
+    """
+    Counts values into equal-width bins.
+
+    Returns:
+        tuple: (bin centers, counts, bin width).
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins or HISTOGRAM_BINS, range=value_range)
+    return (edges[:-1] + edges[1:]) / 2, counts, edges[1] - edges[0]
+
+def rollup(x, series, max_points=None):
+    """
+    Sums runs of consecutive buckets so at most `max_points` remain. Each
+    rolled-up bucket is labelled with the x of its first bucket.
+
+    Args:
+        x (list): Bucket labels, in order.
+        series (dict): name -> per-bucket counts, aligned with x.
+
+    Returns:
+        tuple: (x, series) with the same keys.
+    """
+    max_points = max_points or CHART_MAX_POINTS
+    n = len(x)
+    if n <= max_points:
+        return list(x), {name: np.asarray(values) for name, values in series.items()}
+    starts = np.arange(0, n, math.ceil(n / max_points))
+    return ([x[i] for i in starts],
+            {name: np.add.reduceat(np.asarray(values, dtype=float), starts) for name, values in series.items()})
+
+# --- Serialization ---
+
+def _round(value, digits):
+    if value == 0 or not math.isfinite(value):
+        return value if math.isfinite(value) else None
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+def _compact(obj, digits):
+    if isinstance(obj, dict):
+        return {k: _compact(v, digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_compact(v, digits) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _compact(obj.tolist(), digits)
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float):
+        return _round(obj, digits)
+    return obj
+
+def compact_json(obj, digits=CHART_FLOAT_DIGITS):
+    """JSON without whitespace, numpy values converted and floats cut to `digits` significant digits."""
+    return json.dumps(_compact(obj, digits), separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,343 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import threading
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+from analyzers.sentiment_model import find_text_column, find_date_column, parse_dates
+from analyzers.tokenizer import get_stop_words
+from pipeline.store import (PROCESSED_FOLDER, ARTIFACT_EXT, artifact_version, load_processed_df,
+                            load_artifact_meta)
+from pipeline.token_index import get_token_index
+from pipeline.metrics import stage, timed
+
+# --- Configuration ---
+CONSOLIDATED_FOLDER = os.getenv('CONSOLIDATED_FOLDER', os.path.join(PROCESSED_FOLDER, 'consolidated'))
+# Keyword counts kept per source for cross-dataset keyword queries
+KEYWORDS_PER_SOURCE = int(os.getenv('CONSOLIDATED_KEYWORDS', 200))
+
+# --- Consolidated Store ---
+# Every processed dataset is also written, in one fixed schema, to a
+# Hive-partitioned Arrow dataset:
+#
+#   consolidated/source=<filename>/data.arrow
+#   consolidated/_manifest.json    per source: artifact version, video id,
+#                                  rows, date range, sentiment counts and
+#                                  top keyword counts
+#
+# Cross-dataset queries open only the partitions of the sources asked for
+# and only the columns they need.
+
+SCHEMA = pa.schema([
+    ('video_id', pa.string()),
+    ('text', pa.large_string()),
+    ('sentiment', pa.dictionary(pa.int8(), pa.string())),
+    ('sentiment_score', pa.float64()),
+    ('date', pa.timestamp('ns')),
+])
+PARTITIONING = ds.partitioning(pa.schema([('source', pa.string())]), flavor='hive')
+
+DATA_EXTENSIONS = ('.csv', '.json', '.xls', '.xlsx')
+SENTIMENTS = ('Positive', 'Neutral', 'Negative')
+# Period frequencies; buckets are labelled by their start (weeks start on Monday)
+GRANULARITIES = {'hour': 'h', 'day': 'D', 'week': 'W-SUN', 'month': 'M'}
+
+# YT_<title>_<id>.csv (scraper.py) and youtube_<id>_<unix time>.csv
+_VIDEO_FILE_RE = re.compile(r"^(?:YT_[^_]*_(?P<a>[\w-]{11})|youtube_(?P<b>[\w-]{11})_\d+)\.\w+$")
+
+def video_id_from_filename(filename):
+    """The YouTube video id a scraped file was named after, or None."""
+    match = _VIDEO_FILE_RE.match(filename)
+    return (match.group('a') or match.group('b')) if match else None
+
+def partition_table(df, filename, text_col=None):
+    """Projects a processed frame onto SCHEMA."""
+    n = len(df)
+    text_col = text_col or find_text_column(df)
+    date_col = find_date_column(df)
+    if 'video_id' in df.columns:
+        video_ids = df['video_id'].astype('string')
+    else:
+        video_ids = pd.Series([video_id_from_filename(filename)] * n, dtype='string')
+
+    def column(name, default):
+        return df[name] if name and name in df.columns else pd.Series([default] * n, dtype=object)
+
+    return pa.table({
+        'video_id': pa.array(video_ids, type=pa.string(), from_pandas=True),
+        'text': pa.array(column(text_col, None).astype('string'), type=pa.large_string(), from_pandas=True),
+        'sentiment': pa.array(column('sentiment', None).astype('string'), type=pa.string(),
+                              from_pandas=True).dictionary_encode().cast(SCHEMA.field('sentiment').type),
+        'sentiment_score': pa.array(pd.to_numeric(column('sentiment_score', None), errors='coerce'),
+                                    type=pa.float64(), from_pandas=True),
+        'date': pa.array(parse_dates(column(date_col, None)), type=pa.timestamp('ns'), from_pandas=True),
+    }, schema=SCHEMA)
+
+def _to_bound(value):
+    """A range bound as a naive UTC Timestamp, comparable with the `date` column."""
+    ts = pd.Timestamp(value)
+    if ts is pd.NaT:
+        raise ValueError(f"Invalid date: {value}")
+    if ts.tz is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    try:
+        return ts.as_unit('ns')
+    except (OverflowError, ValueError):
+        raise ValueError(f"Date out of range: {value}")
+
+def _top_keywords(filename, folder, df):
+    index = get_token_index(filename, folder, df)
+    if index is None:
+        return []
+    counts = index.term_counts(min_len=3, exclude=get_stop_words())
+    top = counts.nlargest(KEYWORDS_PER_SOURCE, 'count', keep='first')
+    return [[word, *map(int, row)] for word, row in zip(top.index, top.to_numpy())]
+
+class ConsolidatedStore:
+    def __init__(self, root=CONSOLIDATED_FOLDER):
+        self.root = root
+        # Guards the manifest and the two fields below
+        self._lock = threading.Lock()
+        # One lock per source, held while its partition is written or removed
+        self._source_locks = {}
+        self._sync_thread = None
+
+    def _source_lock(self, source):
+        with self._lock:
+            return self._source_locks.setdefault(source, threading.Lock())
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, '_manifest.json')
+
+    def partition_dir(self, source):
+        # Same encoding pyarrow decodes Hive segments with
+        return os.path.join(self.root, f"source={quote(source, safe='')}")
+
+    def manifest(self):
+        """source -> partition info. Empty if nothing was consolidated yet."""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    # --- Writes ---
+    @timed('consolidated.update')
+    def update(self, filename, folder=PROCESSED_FOLDER, df=None):
+        """
+        Writes (or rewrites) the partition of one processed dataset if its
+        artifact changed since it was last consolidated. Returns True if written.
+        """
+        with self._source_lock(filename):
+            version = artifact_version(filename, folder)
+            if version is None:
+                return False
+            if self.manifest().get(filename, {}).get('version') == list(version):
+                return False
+            if df is None:
+                df = load_processed_df(filename, folder)
+                if df is None:
+                    return False
+            return self._write_partition(filename, folder, df, version)
+
+    def _write_partition(self, filename, folder, df, version):
+        meta = load_artifact_meta(filename, folder) or {}
+        table = partition_table(df, filename, meta.get('text_col'))
+        part_dir = self.partition_dir(filename)
+        os.makedirs(part_dir, exist_ok=True)
+        # Dot-prefixed, so dataset discovery never sees a half-written file
+        fd, tmp = tempfile.mkstemp(prefix='.data.', suffix='.arrow.tmp', dir=part_dir)
+        os.close(fd)
+        try:
+            feather.write_feather(table, tmp, compression='uncompressed')
+            os.replace(tmp, os.path.join(part_dir, 'data.arrow'))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        dates = table.column('date').drop_null()
+        counts = pd.Series(table.column('sentiment').to_pandas()).value_counts()
+        video_ids = table.column('video_id').unique().drop_null().to_pylist()
+        entry = {
+            'version': list(version),
+            'video_id': video_ids[0] if len(video_ids) == 1 else None,
+            'video_ids': video_ids[:100],
+            'rows': table.num_rows,
+            'date_min': str(pc.min(dates)) if len(dates) else None,
+            'date_max': str(pc.max(dates)) if len(dates) else None,
+            'sentiment': {s: int(counts.get(s, 0)) for s in SENTIMENTS},
+            # [keyword, count, positive, negative, neutral]
+            'keywords': _top_keywords(filename, folder, df),
+        }
+        with self._lock:
+            manifest = self.manifest()
+            manifest[filename] = entry
+            self._save_manifest(manifest)
+        print(f"--- Consolidated {filename}: {table.num_rows} rows ---")
+        return True
+
+    def remove(self, source):
+        with self._source_lock(source):
+            with self._lock:
+                manifest = self.manifest()
+                manifest.pop(source, None)
+                self._save_manifest(manifest)
+            shutil.rmtree(self.partition_dir(source), ignore_errors=True)
+
+    def sync(self, folder=PROCESSED_FOLDER):
+        """
+        Brings the store in line with the processed folder: adds or rewrites
+        stale partitions, drops those whose dataset is gone.
+        """
+        if not os.path.isdir(folder):
+            return
+        artifacts = set()
+        for name in os.listdir(folder):
+            for ext in (ARTIFACT_EXT, '.json', '.jsonl'):
+                # Sidecars (x.csv.meta.json ...) don't end in a data extension once stripped
+                if name.endswith(ext) and name[:-len(ext)].lower().endswith(DATA_EXTENSIONS):
+                    artifacts.add(name[:-len(ext)])
+        manifest = self.manifest()
+        stale = [f for f in sorted(artifacts)
+                 if manifest.get(f, {}).get('version') != list(artifact_version(f, folder) or [])]
+        for filename in stale:
+            try:
+                self.update(filename, folder)
+            except Exception as e:
+                print(f"Error consolidating {filename}: {e}")
+        for source in set(manifest) - artifacts:
+            self.remove(source)
+
+    def start_sync(self, folder=PROCESSED_FOLDER):
+        """
+        Runs sync() on a background thread unless one is already running.
+        Processing jobs keep their own partitions current, so this only
+        catches up on datasets processed before the store existed (or
+        removed since).
+        """
+        with self._lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return self._sync_thread
+            self._sync_thread = threading.Thread(target=self.sync, args=(folder,), daemon=True,
+                                                 name='consolidated-sync')
+            self._sync_thread.start()
+            return self._sync_thread
+
+    # --- Queries ---
+    def select_sources(self, sources=None, video_ids=None):
+        """Sources present in the store matching the given names and/or video ids (default: all)."""
+        manifest = self.manifest()
+        selected = [s for s in manifest if not sources or s in sources]
+        if video_ids:
+            selected = [s for s in selected if set(manifest[s].get('video_ids') or []) & set(video_ids)]
+        return selected
+
+    def scan(self, columns, sources, start=None, end=None):
+        """
+        Reads `columns` (plus source) for the given sources, optionally
+        limited to dates in [start, end). Only those partitions are opened.
+        Zoned bounds are converted to UTC; ValueError if a bound is not a date.
+        """
+        if not sources:
+            return pd.DataFrame(columns=['source', *columns])
+        paths = [os.path.join(self.partition_dir(s), 'data.arrow') for s in sources]
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            return pd.DataFrame(columns=['source', *columns])
+        dataset = ds.dataset(paths, schema=SCHEMA.append(pa.field('source', pa.string())), format='ipc',
+                             partitioning=PARTITIONING, partition_base_dir=self.root)
+        expr = None
+        if start is not None:
+            expr = ds.field('date') >= _to_bound(start)
+        if end is not None:
+            until = ds.field('date') < _to_bound(end)
+            expr = until if expr is None else expr & until
+        with stage('consolidated.scan') as s:
+            df = dataset.to_table(columns=['source', *columns], filter=expr).to_pandas()
+            s.set_rows(len(df))
+        return df
+
+    def sentiment_share(self, sources, start=None, end=None):
+        """Per source: counts and share of each sentiment, and the mean score."""
+        if start is None and end is None:
+            # Whole-dataset counts are in the manifest; only the mean needs the data
+            df = self.scan(['sentiment_score'], sources)
+            manifest = self.manifest()
+            counts = {s: manifest.get(s, {}).get('sentiment', {}) for s in sources}
+        else:
+            df = self.scan(['sentiment', 'sentiment_score'], sources, start, end)
+            grouped = df.groupby(['source', 'sentiment'], observed=True).size()
+            counts = {s: {k: int(v) for k, v in grouped[s].items()} if s in grouped.index.get_level_values(0) else {}
+                      for s in sources}
+        means = df.groupby('source')['sentiment_score'].mean()
+
+        result = {}
+        for source in sources:
+            c = {s: int(counts[source].get(s, 0)) for s in SENTIMENTS}
+            total = sum(c.values())
+            result[source] = {
+                'rows': total,
+                'counts': c,
+                'share': {s: round(v / total, 4) if total else 0 for s, v in c.items()},
+                'avg_score': round(float(means[source]), 4) if source in means.index and pd.notna(means[source]) else None,
+            }
+        return result
+
+    def sentiment_trend(self, sources, granularity='day', start=None, end=None):
+        """Per source: sentiment counts and mean score per time bucket."""
+        freq = GRANULARITIES[granularity]
+        df = self.scan(['sentiment', 'sentiment_score', 'date'], sources, start, end).dropna(subset=['date'])
+        result = {}
+        for source, part in df.groupby('source'):
+            bucket = part['date'].dt.to_period(freq).dt.start_time
+            counts = pd.crosstab(bucket, part['sentiment'].astype(str)).reindex(columns=list(SENTIMENTS), fill_value=0)
+            scores = part.groupby(bucket)['sentiment_score'].mean()
+            fmt = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+            result[source] = {
+                'dates': counts.index.strftime(fmt).tolist(),
+                **{s: counts[s].astype(int).tolist() for s in SENTIMENTS},
+                'avg_score': np.round(scores.reindex(counts.index).to_numpy(), 4).tolist(),
+            }
+        return result
+
+    def top_keywords(self, sources, top_n=10):
+        """
+        Per source, and over all of them: the most mentioned keywords with
+        their sentiment breakdown. Served from the per-source counts in the
+        manifest (the top KEYWORDS_PER_SOURCE of each source).
+        """
+        manifest = self.manifest()
+        per_source, overall = {}, {}
+        for source in sources:
+            rows = manifest.get(source, {}).get('keywords', [])
+            per_source[source] = [dict(zip(('keyword', 'count', 'positive', 'negative', 'neutral'), r))
+                                  for r in rows[:top_n]]
+            for word, *counts in rows:
+                total = overall.setdefault(word, [0, 0, 0, 0])
+                for i, c in enumerate(counts):
+                    total[i] += c
+        top = sorted(overall.items(), key=lambda kv: kv[1][0], reverse=True)[:top_n]
+        return {
+            'per_source': per_source,
+            'overall': [dict(zip(('keyword', 'count', 'positive', 'negative', 'neutral'), [w, *c])) for w, c in top],
+        }
+
+consolidated_store = ConsolidatedStore()
@@ -0,0 +1,166 @@
+import os
+import json
+import numpy as np
+
+from analyzers.sentiment_model import get_sentiment_trends
+from analyzers.market_analyzer import analyze_market_sentiment, get_trending_topics, detect_emerging_issues
+from analyzers.issue_matcher import taxonomy_version
+from chat.retriever import get_summary
+from pipeline.store import PROCESSED_FOLDER, processed_path, artifact_version, load_processed_df
+from pipeline.token_index import get_token_index
+from pipeline.rollups import get_rollups
+from pipeline.metrics import metrics, stage, timed
+from pipeline.chart_data import histogram_bins, rollup, compact_json
+
+# --- Charts ---
+# Figures are plain plotly.js {data, layout} dicts built from aggregates
+# (value counts, NumPy histogram bins, rolled-up trend buckets), so their
+# size doesn't grow with the row count. The few plotly_dark settings the
+# page relies on are inlined instead of shipping the whole template.
+
+SENTIMENT_COLORS = {'Positive': '#10b981', 'Neutral': '#6b7280', 'Negative': '#ef4444'}
+
+_AXIS = {'gridcolor': '#283442', 'linecolor': '#506784', 'zerolinecolor': '#283442'}
+
+def _figure(data, title, x_title=None, y_title=None):
+    layout = {
+        'title': {'text': title},
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgb(17,17,17)',
+        'font': {'color': '#f2f5fa'},
+        'xaxis': dict(_AXIS, title={'text': x_title}) if x_title else dict(_AXIS),
+        'yaxis': dict(_AXIS, title={'text': y_title}) if y_title else dict(_AXIS),
+    }
+    with stage('dashboard.chart_json'):
+        return compact_json({'data': data, 'layout': layout})
+
+def sentiment_trend_series(trend_data, max_points=None):
+    """Splits get_sentiment_trends output into (dates, {label: counts}), rolled up to max_points."""
+    dates = trend_data.get('date_str', [])
+    series = {label: trend_data[label] for label in SENTIMENT_COLORS if label in trend_data}
+    series.update({k: v for k, v in trend_data.items() if k != 'date_str' and k not in series})
+    return rollup(dates, series, max_points)
+
+@timed('dashboard.charts')
+def generate_advanced_charts(df, index=None, rollups=None):
+    charts = {}
+    if 'sentiment' in df.columns:
+        counts = df['sentiment'].value_counts()
+        charts['sentiment_pie'] = _figure([{
+            'type': 'pie', 'labels': counts.index.tolist(), 'values': counts.to_numpy(), 'hole': 0.4,
+            'marker': {'colors': [SENTIMENT_COLORS.get(s, '#888') for s in counts.index]},
+        }], "Sentiment Distribution")
+
+    trend_data = get_sentiment_trends(df, rollups)
+    if trend_data:
+        try:
+            dates, series = sentiment_trend_series(trend_data)
+            charts['sentiment_trend'] = _figure([
+                {'type': 'scatter', 'mode': 'lines', 'name': label, 'x': dates, 'y': counts,
+                 'line': {'color': SENTIMENT_COLORS.get(label, '#888')}}
+                for label, counts in series.items()
+            ], "Sentiment Trends Over Time", "Date", "Comments")
+        except Exception as e:
+            print(f"Error building trend chart: {e}")
+
+    # Sentiment Histogram
+    if 'sentiment_score' in df.columns:
+        centers, counts, width = histogram_bins(df['sentiment_score'].to_numpy())
+        charts['sentiment_histogram'] = _figure([{
+            'type': 'bar', 'x': centers, 'y': counts, 'width': width, 'marker': {'color': '#6366f1'},
+        }], "Sentiment Score Distribution", "Sentiment Score (-1 to 1)", "Count")
+
+    # Keywords Bar Chart
+    trending_topics = get_trending_topics(df, top_n=10, index=index)
+    if trending_topics:
+        keywords = list(trending_topics.keys())
+        counts = [data['mentions'] for data in trending_topics.values()]
+        charts['keywords'] = _figure([{
+            'type': 'bar', 'x': keywords, 'y': counts, 'marker': {'color': '#10b981'},
+        }], "Top Trending Keywords", "Keyword", "Mentions")
+
+    return charts
+
+# --- Dashboard Bundle ---
+# The dashboard payload (summary, chart JSON, market insights, trending
+# topics, issues) is computed once per artifact version and stored next to
+# the artifact as <name>.dashboard.json. Issues also depend on the issue
+# taxonomy, so the stored bundle records which taxonomy it was tagged with.
+
+# Bump when the bundle gains or changes keys, or its contents are computed
+# differently (e.g. tokenization), so stored bundles are rebuilt
+BUNDLE_FORMAT = 5
+
+def bundle_path(filename, folder=PROCESSED_FOLDER):
+    return processed_path(filename, folder, '.dashboard.json')
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+@timed('dashboard.build')
+def build_dashboard_bundle(df, filename, index=None, rollups=None):
+    """Computes everything the dashboard template renders."""
+    return {
+        'summary': get_summary(df, filename),
+        'charts': generate_advanced_charts(df, index, rollups),
+        'market_insights': analyze_market_sentiment(df),
+        'trending': get_trending_topics(df, index=index),
+        'issues': detect_emerging_issues(df),
+    }
+
+def refresh_dashboard_bundle(filename, folder=PROCESSED_FOLDER, df=None):
+    """Builds and stores the bundle for the current artifact. Returns it, or None."""
+    version = artifact_version(filename, folder)
+    if version is None:
+        return None
+    if df is None:
+        df = load_processed_df(filename, folder)
+        if df is None:
+            return None
+
+    # Read before building: a taxonomy edited meanwhile leaves the bundle stale, not wrongly current
+    taxonomy = taxonomy_version()
+    # Builds (and persists) the token index and rollups on first use for this version
+    index = get_token_index(filename, folder, df)
+    rollups = get_rollups(filename, folder, df)
+    bundle = build_dashboard_bundle(df, filename, index, rollups)
+    path = bundle_path(filename, folder)
+    try:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'format': BUNDLE_FORMAT, 'version': list(version), 'taxonomy': taxonomy, 'bundle': bundle},
+                      f, default=_json_default)
+        os.replace(path + '.tmp', path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Error saving dashboard bundle: {e}")
+    return bundle
+
+def get_dashboard_bundle(filename, folder=PROCESSED_FOLDER, allow_stale=False):
+    """
+    Returns the stored bundle if it matches the current artifact version
+    and issue taxonomy, otherwise rebuilds it. Returns None if there is no
+    artifact.
+
+    allow_stale=True serves a stored bundle of an older artifact version
+    as is: a file a scrape is still writing changes with every batch, and
+    its analysis passes refresh the bundle as it grows.
+    """
+    version = artifact_version(filename, folder)
+    if version is None:
+        return None
+
+    path = bundle_path(filename, folder)
+    if os.path.exists(path):
+        try:
+            with stage('dashboard.bundle_load'), open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if (stored.get('format') == BUNDLE_FORMAT and stored.get('taxonomy') == taxonomy_version()
+                    and (allow_stale or stored.get('version') == list(version))):
+                metrics.inc('cache_hits_total', cache='dashboard_bundle')
+                return stored['bundle']
+        except (OSError, ValueError) as e:
+            print(f"Error reading dashboard bundle: {e}")
+
+    metrics.inc('cache_misses_total', cache='dashboard_bundle')
+    return refresh_dashboard_bundle(filename, folder)
@@ -0,0 +1,65 @@
+import os
+import hashlib
+
+_READ_BLOCK = 1024 * 1024
+
+def hash_file(filepath, limit=None):
+    """blake2b of the file contents, or of its first `limit` bytes."""
+    h = hashlib.blake2b(digest_size=20)
+    remaining = limit
+    with open(filepath, 'rb') as f:
+        while remaining is None or remaining > 0:
+            block = f.read(_READ_BLOCK if remaining is None else min(_READ_BLOCK, remaining))
+            if not block:
+                break
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return h.hexdigest()
+
+def _ends_with_newline(filepath, size):
+    if size == 0:
+        return True
+    with open(filepath, 'rb') as f:
+        f.seek(size - 1)
+        return f.read(1) == b'\n'
+
+def file_fingerprint(filepath, size=None):
+    """
+    Returns size, mtime and content hash of a source file, or of its first
+    `size` bytes when only that much of it was read.
+    """
+    st = os.stat(filepath)
+    size = st.st_size if size is None else min(size, st.st_size)
+    return {
+        'size': size,
+        'mtime': st.st_mtime,
+        'hash': hash_file(filepath, limit=size),
+        'ends_with_newline': _ends_with_newline(filepath, size),
+    }
+
+def compare_fingerprint(filepath, fingerprint, size=None, full=False):
+    """
+    Compares a source file (or its first `size` bytes) with the fingerprint
+    stored at processing time. With full=True the contents are always
+    hashed, even if size and mtime match.
+
+    Returns:
+        str: 'unchanged', 'appended' (the old contents are an exact prefix
+        ending on a line boundary) or 'changed'.
+    """
+    if not fingerprint:
+        return 'changed'
+    st = os.stat(filepath)
+    size = st.st_size if size is None else min(size, st.st_size)
+    old_size = fingerprint.get('size')
+
+    # Cheap path: same size and mtime means we don't need to read the file
+    if not full and size == st.st_size == old_size and st.st_mtime == fingerprint.get('mtime'):
+        return 'unchanged'
+    if size == old_size:
+        return 'unchanged' if hash_file(filepath, limit=size) == fingerprint.get('hash') else 'changed'
+    if (size > old_size and fingerprint.get('ends_with_newline')
+            and hash_file(filepath, limit=old_size) == fingerprint.get('hash')):
+        return 'appended'
+    return 'changed'
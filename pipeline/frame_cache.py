@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+FRAME_CACHE_MAX_BYTES = int(os.getenv('FRAME_CACHE_MB', 512)) * 1024 * 1024
+
+class FrameCache:
+    """
+    LRU cache of loaded processed DataFrames, bounded by total bytes.
+
+    Keys are (folder, filename, artifact version, columns); a new artifact
+    version simply misses, and invalidate() drops every entry for a file
+    when it is rewritten. Hits return a copy that callers may modify
+    freely (columns or values in place) without touching the cached frame;
+    with copy-on-write it shares the cached data until modified.
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, *keys):
+        """
+        Returns (key, frame) for the first of `keys` that is cached, or None.
+        Counts as a single hit or miss.
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, _copy(entry[0])
+            self.misses += 1
+            return None
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (_copy(df), size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, folder, filename):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == folder and k[1] == filename]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+def _copy(df):
+    """
+    A copy callers may modify in place without touching the cached frame.
+    Under copy-on-write (always on from pandas 3, opted into by app.py
+    before) a shallow copy is enough: an in-place edit copies the data it
+    touches. Without it, only a deep copy is safe.
+    """
+    if int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True:
+        return df.copy(deep=False)
+    return df.copy(deep=True)
+
+frame_cache = FrameCache()
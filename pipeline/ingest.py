@@ -0,0 +1,154 @@
+import io
+import os
+import json
+from contextlib import nullcontext
+import pandas as pd
+from pipeline.metrics import timed
+
+# --- Streaming Configuration ---
+# Largest upload accepted (app.py hands it to Flask as MAX_CONTENT_LENGTH)
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', 50))
+# Files at or above this size are read in bounded chunks instead of whole.
+# Defaults to half the upload cap, so large uploads take the chunked path too.
+STREAMING_THRESHOLD_BYTES = int(float(os.getenv('STREAMING_THRESHOLD_MB', MAX_UPLOAD_MB / 2)) * 1024 * 1024)
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', 100000))
+
+def clean_and_normalize_data(df, drop_empty_columns=True):
+    """
+    Auto-clean data logic.
+
+    When cleaning one chunk of a larger file, pass drop_empty_columns=False
+    so every chunk keeps the same columns.
+    """
+    df.dropna(how='all', axis=0, inplace=True)
+    if drop_empty_columns:
+        df.dropna(how='all', axis=1, inplace=True)
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    for col in df.columns:
+        if any(x in col for x in ['date', 'time', 'created', 'timestamp']):
+            try: df[col] = pd.to_datetime(df[col], errors='coerce')
+            except: pass
+    return df
+
+class _ByteRange(io.RawIOBase):
+    """Reads a file from `start` up to (not including) byte `end`."""
+
+    def __init__(self, filepath, start=0, end=None):
+        self._f = open(filepath, 'rb')
+        self._f.seek(start)
+        self._remaining = None if end is None else max(end - start, 0)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        view = memoryview(b)
+        if self._remaining is not None:
+            view = view[:self._remaining]
+        n = self._f.readinto(view)
+        if self._remaining is not None:
+            self._remaining -= n
+        return n
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+def open_bytes(filepath, start=0, end=None):
+    """
+    Binary file object over bytes [start, end) of a file. Bytes written past
+    `end` while it is being read (e.g. by a running scrape) are not seen.
+    """
+    return io.BufferedReader(_ByteRange(filepath, start, end))
+
+def _read_csv(filepath, size=None, **kwargs):
+    if size is None:
+        return pd.read_csv(filepath, **kwargs)
+    with open_bytes(filepath, end=size) as f:
+        return pd.read_csv(f, **kwargs)
+
+@timed('ingest.load')
+def load_dataframe(filepath, size=None):
+    """
+    Loads dataframe with robust encoding handling. For CSVs, `size` limits
+    reading to the first `size` bytes.
+    """
+    try:
+        if filepath.endswith('.csv'):
+            try: df = _read_csv(filepath, size, encoding='utf-8')
+            except UnicodeDecodeError: df = _read_csv(filepath, size, encoding='latin1')
+        elif filepath.endswith('.json'): df = pd.read_json(filepath)
+        elif filepath.endswith(('.xls', '.xlsx')): df = pd.read_excel(filepath)
+        else: return None
+        return clean_and_normalize_data(df) if df is not None else None
+    except Exception as e:
+        print(f"Error loading file: {e}")
+        return None
+
+def should_stream(filepath):
+    """True if the file is large enough to warrant chunked processing."""
+    try:
+        return os.path.getsize(filepath) >= STREAMING_THRESHOLD_BYTES
+    except OSError:
+        return False
+
+def _is_json_lines(filepath):
+    """Sniffs whether a .json file holds one record per line."""
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        first = f.readline().strip()
+        second = f.readline().strip()
+    if not first.startswith('{') or not second:
+        return False
+    try:
+        return isinstance(json.loads(first), dict)
+    except ValueError:
+        return False
+
+def iter_dataframe_chunks(filepath, chunk_rows=None, encoding='utf-8', size=None):
+    """
+    Yields cleaned DataFrame chunks of at most `chunk_rows` rows.
+
+    CSV and JSON-lines files are read incrementally; for CSVs, `size` limits
+    reading to the first `size` bytes. JSON arrays and Excel workbooks
+    cannot be parsed incrementally, so they are loaded whole and then sliced.
+    """
+    chunk_rows = chunk_rows or INGEST_CHUNK_ROWS
+
+    if filepath.endswith('.csv'):
+        with open_bytes(filepath, end=size) if size is not None else nullcontext(filepath) as source:
+            yield from _clean_chunks(pd.read_csv(source, encoding=encoding, chunksize=chunk_rows))
+    elif filepath.endswith('.json') and _is_json_lines(filepath):
+        yield from _clean_chunks(pd.read_json(filepath, lines=True, chunksize=chunk_rows))
+    else:
+        df = load_dataframe(filepath)
+        if df is None:
+            return
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].copy()
+
+def _clean_chunks(reader):
+    with reader:
+        for chunk in reader:
+            chunk = clean_and_normalize_data(chunk, drop_empty_columns=False)
+            if not chunk.empty:
+                yield chunk
+
+def read_csv_header(filepath):
+    """Returns the raw (un-normalized) column names of a CSV file."""
+    for encoding in ('utf-8', 'latin1'):
+        try:
+            return list(pd.read_csv(filepath, encoding=encoding, nrows=0).columns)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def iter_csv_tail(filepath, offset, raw_columns, chunk_rows=None, encoding='utf-8', end=None):
+    """
+    Yields cleaned chunks of the rows between byte `offset` and `end` (or
+    the end of the file), i.e. the rows appended to a CSV since it was
+    last processed.
+    """
+    chunk_rows = chunk_rows or INGEST_CHUNK_ROWS
+    with open_bytes(filepath, offset, end) as f:
+        yield from _clean_chunks(pd.read_csv(f, header=None, names=raw_columns, encoding=encoding,
+                                             chunksize=chunk_rows))
@@ -0,0 +1,187 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.process import process_file
+from pipeline.store import PROCESSED_FOLDER
+from pipeline.metrics import trace_stages
+
+# --- Configuration ---
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 2))
+# Finished jobs kept around for status polling
+MAX_FINISHED_JOBS = 100
+
+_READ_BLOCK = 1024 * 1024
+
+def estimate_rows(filepath):
+    """Rough row count for ETA purposes (newlines in a CSV), or None."""
+    if not filepath.endswith('.csv'):
+        return None
+    lines = 0
+    try:
+        with open(filepath, 'rb') as f:
+            while True:
+                block = f.read(_READ_BLOCK)
+                if not block:
+                    break
+                lines += block.count(b'\n')
+    except OSError:
+        return None
+    # Header line
+    return max(lines - 1, 0)
+
+class AnalysisJob:
+    """State of one load -> clean -> score -> save run."""
+
+    def __init__(self, filepath, filename, folder, size=None, verify=False, live=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.filepath = filepath
+        self.filename = filename
+        self.folder = folder
+        # Passed to process_file: read up to this byte / hash the whole source /
+        # the file is still being scraped
+        self.size = size
+        self.verify = verify
+        self.live = live
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.rows_processed = 0
+        self.rows_total = None
+        self.result_rows = None
+        self.error = None
+        # Set when the file is submitted again mid-run: it may have changed after it was read
+        self.rerun = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._finished = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the job is done or failed. Returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    def update(self, stage, rows=None):
+        """Progress callback handed to process_file."""
+        self.stage = stage
+        if rows is not None:
+            self.rows_processed = rows
+
+    def eta_seconds(self):
+        if self.status != 'running' or not self.rows_total or not self.rows_processed:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.rows_total - self.rows_processed, 0)
+        return round(elapsed / self.rows_processed * remaining, 1)
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': self.stage,
+            'rows_processed': self.rows_processed,
+            'rows_total': self.rows_total,
+            'eta_seconds': self.eta_seconds(),
+            'elapsed_seconds': round(end - self.started_at, 1) if self.started_at else 0,
+            'error': self.error,
+        }
+
+class JobManager:
+    """
+    Runs analysis jobs on a bounded thread pool.
+
+    Jobs live in this process's memory, so with several gunicorn workers a
+    status poll must reach the worker that accepted the job (use one
+    worker with threads, or sticky sessions).
+    """
+
+    def __init__(self, max_workers=ANALYSIS_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, filepath, filename, folder=PROCESSED_FOLDER, size=None, verify=False, live=False):
+        """
+        Queues a job and returns it. A file that already has a queued job
+        returns that job; one with a running job returns it too, but the job
+        makes one more pass once done, so contents written since it read the
+        file (e.g. a re-upload under the same name) get analyzed. The latest
+        `size` and `live`, and any `verify`, apply to the passes still to come.
+        """
+        with self._lock:
+            active = self._active.get((folder, filename))
+            if active is not None:
+                if active.status == 'running':
+                    active.rerun = True
+                active.size = size
+                active.verify = active.verify or verify
+                active.live = live
+                return active
+            job = AnalysisJob(filepath, filename, folder, size, verify, live)
+            self._jobs[job.id] = job
+            self._active[(folder, filename)] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, filename, folder=PROCESSED_FOLDER):
+        """The queued or running job for a file, if any."""
+        with self._lock:
+            return self._active.get((folder, filename))
+
+    def _run(self, job):
+        with self._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+        try:
+            while True:
+                with self._lock:
+                    size, verify, live = job.size, job.verify, job.live
+                job.rows_total = estimate_rows(job.filepath)
+                with trace_stages(f"Analysis job {job.id} ({job.filename})"):
+                    job.result_rows = process_file(job.filepath, job.filename, job.folder, progress=job.update,
+                                                   size=size, verify=verify, live=live)
+                # Leave the active set in the same step as the rerun check, so
+                # a submit either sets rerun before it or starts a new job after it
+                with self._lock:
+                    if not job.rerun:
+                        self._release(job)
+                        break
+                    job.rerun = False
+            if job.result_rows:
+                job.status = 'done'
+                job.stage = 'done'
+                job.rows_processed = job.rows_total = job.result_rows
+            else:
+                job.status = 'failed'
+                job.error = 'File corrupted or unreadable.'
+        except Exception as e:
+            print(f"Analysis job {job.id} failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._release(job)
+            job._finished.set()
+
+    def _release(self, job):
+        key = (job.folder, job.filename)
+        if self._active.get(key) is job:
+            del self._active[key]
+
+    def _prune(self):
+        finished = [jid for jid, j in self._jobs.items() if j.status in ('done', 'failed')]
+        for jid in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[jid]
+
+analysis_jobs = JobManager()
@@ -0,0 +1,232 @@
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from bisect import bisect_left
+
+# --- Configuration ---
+# METRICS=0 turns instrumentation into no-ops and disables /metrics
+METRICS_ENABLED = os.getenv('METRICS', '1') != '0'
+# Print a per-request / per-job stage breakdown
+METRICS_DEBUG = os.getenv('METRICS_DEBUG', '0') == '1'
+METRICS_PREFIX = 'app_'
+
+# Seconds; covers cached lookups through full 1M-row rebuilds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HELP = {
+    'stage_duration_seconds': ('histogram', "Time spent in a pipeline stage."),
+    'stage_rows_total': ('counter', "Rows handled by a pipeline stage."),
+    'http_request_duration_seconds': ('histogram', "Time to respond to a request (until headers for streams)."),
+    'chat_ttft_seconds': ('histogram', "Time to the first token of a chat answer."),
+    'chat_latency_seconds': ('histogram', "Time to the complete chat answer."),
+    'cache_hits_total': ('counter', "Lookups answered from a cache."),
+    'cache_misses_total': ('counter', "Lookups a cache could not answer."),
+    'cache_hit_ratio': ('gauge', "Hits over lookups since start."),
+    'cache_entries': ('gauge', "Entries currently held by a cache."),
+}
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms keyed by name and labels, rendered in
+    the Prometheus text format. Collectors add values that live elsewhere
+    (e.g. cache counters) when /metrics is read.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, collect):
+        """collect() yields (name, labels, value) samples when metrics are rendered."""
+        self._collectors.append(collect)
+
+    def render(self):
+        samples = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append((labels, value))
+            histograms = [(name, labels, list(h.counts), h.sum, h.count, h.buckets)
+                          for (name, labels), h in self._histograms.items()]
+        for collect in self._collectors:
+            try:
+                for name, labels, value in collect():
+                    samples.setdefault(name, []).append((_label_key(labels), value))
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+
+        lines = []
+        for name in sorted(set(samples) | {h[0] for h in histograms}):
+            kind, text = HELP.get(name, ('untyped', name))
+            full = METRICS_PREFIX + name
+            lines.append(f"# HELP {full} {text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in sorted(samples.get(name, [])):
+                lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+            for _, labels, counts, total, count, buckets in sorted(h for h in histograms if h[0] == name):
+                cumulative = 0
+                for bound, n in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += n
+                    lines.append(f"{full}_bucket{_format_labels(labels, {'le': bound})} {cumulative}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{full}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# --- Stage Timing ---
+# Stages record into the registry and, if the current thread is tracing
+# (a request or an analysis job), into its breakdown.
+
+_local = threading.local()
+
+class _Stage:
+    __slots__ = ('name', 'rows', 'start', 'entry')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.entry = None
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        trace = getattr(_local, 'trace', None)
+        if trace is not None:
+            # Listed in start order, indented by nesting depth
+            self.entry = [self.name, _local.depth, None, None]
+            trace.append(self.entry)
+            _local.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        metrics.observe('stage_duration_seconds', elapsed, stage=self.name)
+        if self.rows:
+            metrics.inc('stage_rows_total', self.rows, stage=self.name)
+        if self.entry is not None:
+            self.entry[2:] = [elapsed, self.rows]
+            _local.depth -= 1
+        return False
+
+class _NoopStage:
+    __slots__ = ()
+
+    def set_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopStage()
+
+def stage(name, rows=None):
+    """Context manager timing one stage; call .set_rows(n) once the row count is known."""
+    return _Stage(name, rows) if metrics.enabled else _NOOP
+
+def _rows_of(result, args):
+    for value in (result, *args[:2]):
+        if hasattr(value, 'shape') and hasattr(value, 'columns'):
+            return len(value)
+    return None
+
+def timed(name):
+    """
+    Decorator timing every call as a stage. Rows are taken from the
+    returned DataFrame, or else from a DataFrame among the first two arguments.
+    """
+    def decorate(fn):
+        if not metrics.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as s:
+                result = fn(*args, **kwargs)
+                s.set_rows(_rows_of(result, args))
+                return result
+        return wrapper
+    return decorate
+
+def start_trace():
+    _local.trace = []
+    _local.depth = 0
+
+def end_trace():
+    """Stops tracing this thread and returns the stages seen as (name, depth, seconds, rows)."""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    return trace or []
+
+def format_trace(label, total, stages):
+    lines = [f"--- {label} in {total * 1000:.1f} ms ---"]
+    for name, depth, seconds, rows in stages:
+        if seconds is None:
+            continue
+        rows_text = f"  ({rows:,} rows)" if rows else ""
+        lines.append(f"    {'  ' * depth}{name:<{34 - 2 * depth}} {seconds * 1000:9.1f} ms{rows_text}")
+    return "\n".join(lines)
+
+@contextmanager
+def trace_stages(label):
+    """Traces the stages run inside the block and prints them if METRICS_DEBUG is set."""
+    if not METRICS_DEBUG:
+        yield
+        return
+    start_trace()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(format_trace(label, time.perf_counter() - start, end_trace()))
@@ -0,0 +1,215 @@
+import os
+import pandas as pd
+from analyzers.sentiment_model import analyze_sentiment, find_text_column
+from pipeline.ingest import load_dataframe, iter_dataframe_chunks, iter_csv_tail, read_csv_header, should_stream
+from pipeline.fingerprint import file_fingerprint, compare_fingerprint
+from pipeline.store import (PROCESSED_FOLDER, save_processed_df, append_processed_df, ProcessedWriter,
+                            load_artifact_meta, save_artifact_meta)
+from pipeline.dashboard import refresh_dashboard_bundle
+from chat.retriever import get_llm_summary, get_comment_index
+from pipeline.metrics import timed
+from pipeline.consolidated import consolidated_store
+
+# --- Configuration ---
+# A running scrape's file is re-analyzed after every committed batch. The
+# derived data (dashboard bundle, chat summary, comment index, consolidated
+# partition) is rebuilt from the whole dataset, so on those live passes it is
+# only rebuilt once the dataset has grown by this fraction since the last
+# rebuild. Total rebuild work then stays linear in the final size rather than
+# quadratic; the final pass of a scrape always rebuilds.
+LIVE_REBUILD_GROWTH = float(os.getenv('LIVE_REBUILD_GROWTH', 0.25))
+
+def _no_progress(stage, rows=None):
+    pass
+
+@timed('process.file')
+def process_file(filepath, filename, folder=PROCESSED_FOLDER, stream=None, force=False, progress=None,
+                 size=None, verify=False, live=False):
+    """
+    Runs load -> clean -> sentiment -> save for one raw file.
+
+    If the stored artifact was built from the same source contents it is
+    reused as-is; if a CSV only gained rows at the end, just those rows are
+    processed and merged. Large files (see should_stream) go through the
+    chunked pipeline. After a (re)build the dashboard bundle, the chat
+    summary and the comment search index are precomputed.
+
+    Only the bytes present when the run starts (or the first `size` bytes)
+    are read, and the stored fingerprint describes exactly those, so rows
+    appended during the run are picked up by the next one. verify=True
+    hashes the source even if its size and mtime match the artifact.
+
+    live=True marks a pass over a file a scrape is still writing: merged
+    rows only trigger the precompute once LIVE_REBUILD_GROWTH is reached.
+    A later pass without it brings everything up to date.
+
+    `progress(stage, rows=None)` is called as stages start and, in the
+    chunked pipeline, after every chunk with the rows processed so far.
+
+    Returns:
+        int: Rows in the artifact, or None if the file could not be read.
+    """
+    progress = progress or _no_progress
+    size = _snapshot_size(filepath, size)
+    if not force:
+        progress('checking')
+        meta = load_artifact_meta(filename, folder)
+        state = compare_fingerprint(filepath, meta.get('source'), size=size, full=verify) if meta else 'changed'
+        if state == 'unchanged':
+            print(f"--- {filename} unchanged, reusing processed artifact ---")
+            # Live passes may have merged rows without rebuilding
+            if not live and meta.get('derived_rows', meta['rows']) != meta['rows']:
+                _refresh_derived(filename, folder, meta, progress)
+            return meta['rows']
+        if state == 'appended' and filepath.endswith('.csv') and meta.get('raw_columns'):
+            rows = process_appended_rows(filepath, filename, meta, folder, progress, size=size)
+            if rows is not None:
+                if not live or rows >= meta.get('derived_rows', 0) * (1 + LIVE_REBUILD_GROWTH):
+                    _refresh_derived(filename, folder, meta, progress)
+                return rows
+
+    if stream is None:
+        stream = should_stream(filepath)
+    if stream:
+        rows = process_file_streaming(filepath, filename, folder, progress=progress, size=size)
+        if rows:
+            progress('dashboard', rows)
+            _precompute_dashboard(filename, folder)
+        return rows
+
+    progress('loading')
+    df = load_dataframe(filepath, size)
+    if df is None or df.empty:
+        return None
+    progress('scoring')
+    text_col = find_text_column(df)
+    df = analyze_sentiment(df, text_col=text_col)
+    progress('saving', len(df))
+    save_processed_df(df, filename, folder, meta=_build_meta(filepath, df, text_col, size=size))
+    progress('dashboard', len(df))
+    _precompute_dashboard(filename, folder, df)
+    return len(df)
+
+def _refresh_derived(filename, folder, meta, progress):
+    """Precomputes from the stored artifact and records how many rows that covered."""
+    progress('dashboard', meta['rows'])
+    _precompute_dashboard(filename, folder)
+    meta['derived_rows'] = meta['rows']
+    save_artifact_meta(meta, filename, folder)
+
+def _precompute_dashboard(filename, folder, df=None):
+    # All of these are rebuilt on demand if missing, so a failure here isn't
+    # fatal. The chat summary goes first: some dashboard panels add helper
+    # columns to df.
+    try:
+        get_llm_summary(filename, folder, df)
+        get_comment_index(filename, folder, df)
+        refresh_dashboard_bundle(filename, folder, df)
+        consolidated_store.update(filename, folder, df)
+    except Exception as e:
+        print(f"Error precomputing dashboard: {e}")
+
+def _snapshot_size(filepath, size=None):
+    try:
+        current = os.path.getsize(filepath)
+    except OSError:
+        return size
+    return current if size is None else min(size, current)
+
+def _build_meta(filepath, df, text_col, rows=None, size=None):
+    return {
+        # What was read, not what the file holds by now
+        'source': file_fingerprint(filepath, size),
+        'rows': len(df) if rows is None else rows,
+        # Rows the precomputed data covers; full builds precompute right after saving
+        'derived_rows': len(df) if rows is None else rows,
+        'columns': list(df.columns),
+        'raw_columns': read_csv_header(filepath) if filepath.endswith('.csv') else None,
+        'text_col': text_col or None,
+    }
+
+def process_appended_rows(filepath, filename, meta, folder=PROCESSED_FOLDER, progress=None, size=None):
+    """
+    Scores only the rows appended to a CSV since its artifact was built and
+    merges them into the artifact. Reads up to byte `size` (default: the
+    current end of the file).
+
+    Returns:
+        int: Rows in the artifact, or None if the tail could not be merged
+        (the caller then falls back to a full run).
+    """
+    progress = progress or _no_progress
+    progress('loading', meta['rows'])
+    offset = meta['source']['size']
+    size = _snapshot_size(filepath, size)
+    for encoding in ('utf-8', 'latin1'):
+        try:
+            parts = list(iter_csv_tail(filepath, offset, meta['raw_columns'], encoding=encoding, end=size))
+            break
+        except UnicodeDecodeError:
+            continue
+        except Exception as e:
+            print(f"Error reading appended rows: {e}")
+            return None
+    else:
+        return None
+
+    new_rows = 0
+    if parts:
+        tail = pd.concat(parts, ignore_index=True)
+        progress('scoring', meta['rows'])
+        if meta.get('text_col'):
+            tail = analyze_sentiment(tail, text_col=meta['text_col'])
+        tail = tail.reindex(columns=meta['columns'])
+        if not append_processed_df(tail, filename, folder):
+            return None
+        new_rows = len(tail)
+
+    print(f"--- {filename}: merged {new_rows} appended rows ---")
+    meta['rows'] += new_rows
+    meta['source'] = file_fingerprint(filepath, size)
+    save_artifact_meta(meta, filename, folder)
+    return meta['rows']
+
+def process_file_streaming(filepath, filename, folder=PROCESSED_FOLDER, chunk_rows=None, progress=None, size=None):
+    """
+    Chunked pipeline: each chunk is cleaned, scored and appended to the
+    processed store, so peak memory is bounded by the chunk size. CSVs are
+    read up to byte `size` if given.
+    """
+    for encoding in ('utf-8', 'latin1'):
+        try:
+            return _stream_chunks(filepath, filename, folder, chunk_rows, encoding, progress or _no_progress, size)
+        except UnicodeDecodeError:
+            print(f"--- {filename} is not valid {encoding}, retrying ---")
+        except Exception as e:
+            print(f"Error streaming file: {e}")
+            return None
+    return None
+
+def _stream_chunks(filepath, filename, folder, chunk_rows, encoding, progress, size=None):
+    progress('scoring', 0)
+    writer = ProcessedWriter(filename, folder)
+    text_col = None
+    columns = None
+    try:
+        for i, chunk in enumerate(iter_dataframe_chunks(filepath, chunk_rows, encoding=encoding, size=size)):
+            # Pin the text column on the first chunk so every chunk is scored the same way
+            if text_col is None:
+                text_col = find_text_column(chunk) or False
+            if text_col:
+                chunk = analyze_sentiment(chunk, text_col=text_col)
+            columns = columns or list(chunk.columns)
+            writer.append(chunk)
+            print(f"--- Chunk {i + 1}: {writer.rows} rows processed ---")
+            progress('scoring', writer.rows)
+    except BaseException:
+        writer.abort()
+        raise
+
+    if writer.rows == 0:
+        writer.abort()
+        return None
+    writer.commit(meta=_build_meta(filepath, pd.DataFrame(columns=columns), text_col, rows=writer.rows,
+                                   size=size))
+    return writer.rows
@@ -0,0 +1,252 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from analyzers.sentiment_model import find_date_column, parse_dates
+from pipeline.store import PROCESSED_FOLDER, DerivedCache, save_npz, load_npz
+from pipeline.metrics import timed
+
+# --- Configuration ---
+# Upper bound on the buckets one trend query may return (e.g. hours over a year)
+TREND_MAX_BUCKETS = int(os.getenv('TREND_MAX_BUCKETS', 10000))
+# Bump when date parsing or bucketing changes so stored rollups are rebuilt
+ROLLUPS_FORMAT = 2
+
+# --- Sentiment Rollups ---
+# When a dataset is processed, its dates are parsed once and sentiment
+# counts and score sums are summed into hourly buckets; day, week and
+# month buckets are summed from the hourly ones. Trend queries then slice
+# the sorted bucket arrays (binary search for the range) and never touch
+# the rows, so their cost depends on the buckets returned, not the rows.
+
+SENTIMENTS = ('Positive', 'Neutral', 'Negative')
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+_HOUR = 3600 * 10**9
+_DAY = 24 * _HOUR
+# Fixed bucket widths in ns; months are handled as datetime64[M]
+_STEPS = {'hour': _HOUR, 'day': _DAY, 'week': 7 * _DAY}
+
+def _floor(ns, granularity):
+    """Bucket start (ns since epoch) for each timestamp. Weeks start on Monday."""
+    if granularity == 'hour':
+        return ns - ns % _HOUR
+    if granularity == 'day':
+        return ns - ns % _DAY
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday, so Mondays are days -3, 4, 11, ...
+        days = ns // _DAY
+        return ((days + 3) // 7 * 7 - 3) * _DAY
+    return ns.view('datetime64[ns]').astype('datetime64[M]').astype('datetime64[ns]').view(np.int64)
+
+def _bucket_range(granularity, first, last, before=0):
+    """Every bucket start from `before` buckets ahead of `first` through `last`."""
+    if granularity == 'month':
+        months = np.array([first, last], dtype=np.int64).view('datetime64[ns]').astype('datetime64[M]')
+        return np.arange(months[0] - before, months[1] + 1).astype('datetime64[ns]').view(np.int64)
+    step = _STEPS[granularity]
+    first = int(first) - before * step
+    # Counted in integers: np.arange's float length drops the last bucket at ns magnitudes
+    return first + step * np.arange((int(last) - first) // step + 1, dtype=np.int64)
+
+def _to_ns(value):
+    """A range bound as ns since epoch (naive UTC)."""
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    try:
+        return ts.as_unit('ns').value
+    except (OverflowError, ValueError):
+        raise ValueError(f"Date out of range: {value}")
+
+class SentimentRollups:
+    """
+    Per granularity, sorted arrays over the non-empty buckets:
+    starts (ns), counts (bucket x SENTIMENTS), total rows, score_sum and
+    scored (rows with a score).
+    """
+
+    FIELDS = ('starts', 'counts', 'total', 'score_sum', 'scored')
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    @property
+    def empty(self):
+        return len(self.levels['hour']['starts']) == 0
+
+    def span(self):
+        """(first, last) hourly bucket as Timestamps, or None if empty."""
+        starts = self.levels['hour']['starts']
+        if not len(starts):
+            return None
+        return pd.Timestamp(starts[0]), pd.Timestamp(starts[-1])
+
+    @classmethod
+    @timed('rollups.build')
+    def build(cls, df):
+        """Sums df into hour / day / week / month buckets. Rows without a date are left out."""
+        date_col = find_date_column(df)
+        if date_col:
+            ns = parse_dates(df[date_col]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            ns = np.zeros(0, dtype=np.int64)
+        valid = ns != np.iinfo(np.int64).min
+        ns = ns[valid]
+
+        codes = np.full(len(ns), -1, dtype=np.int8)
+        if 'sentiment' in df.columns:
+            labels = df['sentiment'].to_numpy()[valid]
+            for code, label in enumerate(SENTIMENTS):
+                codes[labels == label] = code
+        if 'sentiment_score' in df.columns:
+            scores = pd.to_numeric(df['sentiment_score'], errors='coerce').to_numpy(dtype=float)[valid]
+        else:
+            scores = np.full(len(ns), np.nan)
+        has_score = np.isfinite(scores)
+
+        starts, inverse = np.unique(_floor(ns, 'hour'), return_inverse=True)
+        n = len(starts)
+        counts = np.zeros((n, len(SENTIMENTS)), dtype=np.int64)
+        labelled = codes >= 0
+        np.add.at(counts, (inverse[labelled], codes[labelled]), 1)
+        levels = {'hour': {
+            'starts': starts,
+            'counts': counts,
+            'total': np.bincount(inverse, minlength=n).astype(np.int64),
+            'score_sum': np.bincount(inverse[has_score], weights=scores[has_score], minlength=n),
+            'scored': np.bincount(inverse[has_score], minlength=n).astype(np.int64),
+        }}
+
+        # Coarser buckets of sorted hours are contiguous runs
+        hour = levels['hour']
+        for granularity in GRANULARITIES[1:]:
+            coarse = _floor(hour['starts'], granularity)
+            bucket_starts, first = np.unique(coarse, return_index=True)
+            if not len(first):
+                levels[granularity] = {k: v[:0] for k, v in hour.items()}
+                continue
+            levels[granularity] = {'starts': bucket_starts,
+                                   **{k: np.add.reduceat(hour[k], first, axis=0)
+                                      for k in ('counts', 'total', 'score_sum', 'scored')}}
+        return cls(levels)
+
+    # --- Queries ---
+    def query(self, granularity='day', start=None, end=None, window=None, fill=True):
+        """
+        Sentiment counts and mean score per bucket for the buckets starting
+        in [floor(start), end). `end` is exclusive, as in the consolidated
+        store's range queries; buckets are never split, so the first and
+        last may hold rows just outside the range.
+
+        Args:
+            granularity (str): One of GRANULARITIES.
+            start, end: Range bounds (anything pd.Timestamp accepts), or None
+                for the first / through the last bucket with data.
+            window (int): If set, also returns rolling values over the last
+                `window` buckets, including buckets before `start`.
+            fill (bool): Include empty buckets, so buckets are evenly spaced.
+
+        Returns:
+            dict: granularity, dates, one count list per sentiment, total,
+            avg_score and, with a window, rolling_avg_score,
+            rolling_positive_share and rolling_total (mean per bucket).
+        """
+        if granularity not in self.levels:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        level = self.levels[granularity]
+        starts = level['starts']
+        window = max(int(window), 1) if window else None
+        result = {'granularity': granularity, 'dates': [], **{s: [] for s in SENTIMENTS},
+                  'total': [], 'avg_score': []}
+        if window:
+            result.update({'rolling_avg_score': [], 'rolling_positive_share': [], 'rolling_total': []})
+        if not len(starts):
+            return result
+
+        first = _floor(np.array([_to_ns(start)]), granularity)[0] if start is not None else starts[0]
+        # Exclusive upper bound on bucket starts
+        last = _to_ns(end) if end is not None else starts[-1] + 1
+        if last <= first:
+            return result
+        lead = (window - 1) if window else 0
+
+        if fill:
+            # Refuse huge ranges before allocating them (31-day months undercount, the exact check follows)
+            if (last - 1 - first) // _STEPS.get(granularity, 31 * _DAY) > TREND_MAX_BUCKETS:
+                _too_many_buckets(granularity)
+            buckets = _bucket_range(granularity, first, _floor(np.array([last - 1]), granularity)[0], before=lead)
+            if len(buckets) - lead > TREND_MAX_BUCKETS:
+                _too_many_buckets(granularity)
+            lo = np.searchsorted(starts, buckets[0], 'left')
+            hi = np.searchsorted(starts, last, 'left')
+            positions = np.searchsorted(buckets, starts[lo:hi])
+            values = {}
+            for key in ('counts', 'total', 'score_sum', 'scored'):
+                column = level[key]
+                values[key] = np.zeros((len(buckets),) + column.shape[1:], dtype=column.dtype)
+                values[key][positions] = column[lo:hi]
+        else:
+            lo = np.searchsorted(starts, first, 'left')
+            hi = np.searchsorted(starts, last, 'left')
+            # Sparse buckets: the window reaches back over stored buckets only
+            lead = min(lead, lo)
+            buckets = starts[lo - lead:hi]
+            values = {key: level[key][lo - lead:hi] for key in ('counts', 'total', 'score_sum', 'scored')}
+            if len(buckets) - lead > TREND_MAX_BUCKETS:
+                _too_many_buckets(granularity)
+
+        counts, total = values['counts'], values['total']
+        shown = slice(lead, None)
+        fmt = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+        result['dates'] = pd.DatetimeIndex(buckets[shown].view('datetime64[ns]')).strftime(fmt).tolist()
+        for i, label in enumerate(SENTIMENTS):
+            result[label] = counts[shown, i].tolist()
+        result['total'] = total[shown].tolist()
+        result['avg_score'] = _ratio(values['score_sum'], values['scored'])[shown]
+
+        if window:
+            def rolling(x):
+                # Window sums from prefix sums: one subtraction per bucket
+                csum = np.concatenate([[0], np.cumsum(x)])
+                idx = np.arange(1, len(x) + 1)
+                return csum[idx] - csum[np.maximum(idx - window, 0)]
+            # Buckets before the first comment don't count towards the mean
+            sizes = rolling(buckets >= starts[0])
+            result['rolling_avg_score'] = _ratio(rolling(values['score_sum']), rolling(values['scored']))[shown]
+            result['rolling_positive_share'] = _ratio(rolling(counts[:, 0]), rolling(counts.sum(axis=1)))[shown]
+            result['rolling_total'] = _ratio(rolling(total), sizes)[shown]
+        return result
+
+    # --- Persistence ---
+    def save(self, path, stamp):
+        save_npz(path, stamp, {}, {f"{g}_{k}": self.levels[g][k] for g in GRANULARITIES for k in self.FIELDS})
+
+    @classmethod
+    def load(cls, path):
+        """(stamp, rollups) of saved rollups."""
+        stamp, _, arrays = load_npz(path)
+        return stamp, cls({g: {k: arrays[f"{g}_{k}"] for k in cls.FIELDS} for g in GRANULARITIES})
+
+def _too_many_buckets(granularity):
+    raise ValueError(f"Range spans more than {TREND_MAX_BUCKETS} {granularity} buckets; "
+                     f"use a coarser granularity or a shorter range")
+
+def _ratio(numerator, denominator):
+    """Element-wise ratio rounded to 4 places, None where the denominator is 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.round(np.asarray(numerator, dtype=float) / denominator, 4)
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+# Recently used rollups stay loaded, so trend queries don't touch the disk
+rollups_cache = DerivedCache('rollups', '.rollups.npz', ROLLUPS_FORMAT,
+                             build=lambda df, filename, folder: SentimentRollups.build(df),
+                             save=SentimentRollups.save, load=SentimentRollups.load)
+
+def get_rollups(filename, folder=PROCESSED_FOLDER, df=None):
+    """
+    Returns the rollups for the current artifact version, loading or
+    (re)building and persisting them as needed. None if there is no artifact.
+    """
+    return rollups_cache.get(filename, folder, df)
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import time
+
+# --- Configuration ---
+CHECKPOINT_PATH = os.getenv('SCRAPE_CHECKPOINT_PATH', os.path.join('data', 'scrape_checkpoints.db'))
+
+class CheckpointStore:
+    """
+    Per-video scrape progress: the comment ids already written, the output
+    file they went to, and whether the last run reached the end of the
+    comments. Used by scraper.py from its own process, one run per video.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos (video_id TEXT PRIMARY KEY, output_file TEXT NOT NULL, "
+            "complete INTEGER NOT NULL DEFAULT 0, comments INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (video_id TEXT NOT NULL, comment_id TEXT NOT NULL, "
+            "PRIMARY KEY (video_id, comment_id)) WITHOUT ROWID")
+        self._conn.commit()
+
+    def get_video(self, video_id):
+        """Returns {'output_file', 'complete', 'comments'} or None if never scraped."""
+        row = self._conn.execute(
+            "SELECT output_file, complete, comments FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            return None
+        return {'output_file': row[0], 'complete': bool(row[1]), 'comments': row[2]}
+
+    def seen_ids(self, video_id):
+        rows = self._conn.execute("SELECT comment_id FROM seen WHERE video_id = ?", (video_id,))
+        return {r[0] for r in rows}
+
+    def start(self, video_id, output_file):
+        """Records a run writing to output_file; the run counts as incomplete until finish()."""
+        self._conn.execute(
+            "INSERT INTO videos (video_id, output_file, complete, updated) VALUES (?, ?, 0, ?) "
+            "ON CONFLICT(video_id) DO UPDATE SET output_file = excluded.output_file, complete = 0, "
+            "updated = excluded.updated", (video_id, output_file, time.time()))
+        self._conn.commit()
+
+    def mark_seen(self, video_id, comment_ids, written):
+        """Checkpoints a batch once its rows are on disk."""
+        self._conn.executemany("INSERT OR IGNORE INTO seen (video_id, comment_id) VALUES (?, ?)",
+                               [(video_id, cid) for cid in comment_ids])
+        self._conn.execute("UPDATE videos SET comments = comments + ?, updated = ? WHERE video_id = ?",
+                           (written, time.time(), video_id))
+        self._conn.commit()
+
+    def finish(self, video_id):
+        self._conn.execute("UPDATE videos SET complete = 1, updated = ? WHERE video_id = ?",
+                           (time.time(), video_id))
+        self._conn.commit()
+
+    def reset(self, video_id):
+        """Forgets a video, e.g. when its output file was deleted."""
+        self._conn.execute("DELETE FROM seen WHERE video_id = ?", (video_id,))
+        self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
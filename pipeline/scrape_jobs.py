@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import uuid
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.jobs import analysis_jobs
+from pipeline.store import PROCESSED_FOLDER
+
+# --- Configuration ---
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', 3))
+# Lines of output kept per job
+SCRAPE_LOG_LINES = int(os.getenv('SCRAPE_LOG_LINES', 1000))
+# Seconds between incremental analyses of a running scrape's output
+SCRAPE_ANALYSIS_INTERVAL = float(os.getenv('SCRAPE_ANALYSIS_INTERVAL', 5))
+# Finished jobs kept around for status polling
+MAX_FINISHED_SCRAPES = 200
+
+SCRAPER_SCRIPT = 'scraper.py'
+# Must match scraper.OUTPUT_MARKER (not imported: that would pull in yt-dlp)
+OUTPUT_MARKER = "--- Writing to: "
+COMMITTED_MARKER = "--- Committed bytes: "
+ACTIVE_STATES = ('queued', 'running')
+
+class LogBuffer:
+    """
+    Fixed-capacity ring buffer of log lines addressed by absolute offset.
+
+    Line n is the n-th line ever appended; once more than `capacity` lines
+    have been written the oldest are overwritten. Reading the lines after an
+    offset costs only the lines returned, however long the log has grown.
+    """
+
+    def __init__(self, capacity=SCRAPE_LOG_LINES):
+        self.capacity = capacity
+        self._lines = [None] * capacity
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def total(self):
+        return self._total
+
+    def append(self, line):
+        with self._cond:
+            self._lines[self._total % self.capacity] = line
+            self._total += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """Marks the log complete and wakes any waiting readers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def read(self, after=0, limit=None):
+        """
+        Lines from offset `after` on.
+
+        Returns:
+            tuple: (lines, next_offset, dropped) where dropped is how many
+            requested lines were already overwritten.
+        """
+        with self._cond:
+            first = max(self._total - self.capacity, 0)
+            start = max(after, first)
+            end = self._total if limit is None else min(self._total, start + limit)
+            # A cursor past the end just waits for more lines
+            end = max(end, start)
+            lines = [self._lines[i % self.capacity] for i in range(start, end)]
+            return lines, end, max(first - after, 0)
+
+    def wait(self, after, timeout=None):
+        """Blocks until there are lines past `after` or the log is closed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._total > after or self._closed, timeout)
+
+class ScrapeJob:
+    """One scraper.py run for one URL, with its own log and cancel switch."""
+
+    def __init__(self, url, filter_keywords='', min_length=10, max_comments=0, sort='new', full=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.filter_keywords = filter_keywords or ''
+        self.min_length = int(min_length)
+        self.max_comments = int(max_comments or 0)
+        self.sort = sort
+        self.full = full
+        self.status = 'queued'
+        self.returncode = None
+        self.log = LogBuffer()
+        self.process = None
+        self.output_file = None
+        # Size of the output file after the last complete batch
+        self.committed_size = None
+        self.cancel_requested = False
+        self._ended = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def command(self):
+        cmd = [sys.executable, SCRAPER_SCRIPT, self.url,
+               '--filter_keywords', self.filter_keywords,
+               '--min_length', str(self.min_length),
+               '--max_comments', str(self.max_comments),
+               '--sort', self.sort]
+        if self.full:
+            cmd.append('--full')
+        return cmd
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'returncode': self.returncode,
+            'output_file': os.path.basename(self.output_file) if self.output_file else None,
+            'elapsed_seconds': round(end - self.started_at, 1) if self.started_at else 0,
+            'log_lines': self.log.total,
+        }
+
+class ScrapeScheduler:
+    """
+    Runs scrape jobs as subprocesses, at most `max_concurrent` at a time;
+    the rest wait in submission order.
+    """
+
+    def __init__(self, max_concurrent=SCRAPE_CONCURRENCY, processed_folder=PROCESSED_FOLDER):
+        self.processed_folder = processed_folder
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='scrape')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, urls, filter_keywords='', min_length=10, max_comments=0, sort='new', full=False):
+        """Queues one job per URL and returns the jobs."""
+        jobs = [ScrapeJob(url, filter_keywords, min_length, max_comments, sort, full) for url in urls]
+        with self._lock:
+            for job in jobs:
+                self._jobs[job.id] = job
+            self._prune()
+        for job in jobs:
+            self._executor.submit(self._run, job)
+        return jobs
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def is_busy(self):
+        return any(job.status in ACTIVE_STATES for job in self.list_jobs())
+
+    def is_writing(self, filename):
+        """True while a running scrape is still appending to this data file."""
+        return any(job.status == 'running' and job.output_file
+                   and os.path.basename(job.output_file) == filename
+                   for job in self.list_jobs())
+
+    def cancel(self, job_id):
+        """Cancels a queued job or kills a running one. Returns False for unknown / finished jobs."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+            job.cancel_requested = True
+            if job.status == 'queued':
+                # Never started: it ends here, and _run skips it when its turn comes
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                job.log.append("--- Cancelled ---\n")
+                job.log.close()
+                job._ended.set()
+                return True
+            process = job.process
+        if process is not None and process.poll() is None:
+            process.kill()
+        return True
+
+    def cancel_all(self):
+        return sum(self.cancel(job.id) for job in self.list_jobs())
+
+    def _run(self, job):
+        with self._lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            job.log.append(f"--- Starting Scraper for {job.url} ---\n")
+            try:
+                job.process = subprocess.Popen(job.command(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                               text=True, encoding='utf-8', errors='replace', bufsize=1)
+            except Exception as e:
+                job.log.append(f"!!! Could not start scraper: {e}\n")
+                job.status = 'failed'
+                job.finished_at = time.time()
+                job.log.close()
+                return
+
+        try:
+            for line in iter(job.process.stdout.readline, ''):
+                job.log.append(line)
+                if job.output_file is None and line.startswith(OUTPUT_MARKER):
+                    job.output_file = line[len(OUTPUT_MARKER):].rsplit(' ---', 1)[0].strip()
+                    threading.Thread(target=self._analyze_output, args=(job,), daemon=True).start()
+                elif line.startswith(COMMITTED_MARKER):
+                    try:
+                        job.committed_size = int(line[len(COMMITTED_MARKER):].rsplit(' ---', 1)[0])
+                    except ValueError:
+                        pass
+            job.returncode = job.process.wait()
+        except Exception as e:
+            print(f"Scrape job {job.id} failed: {e}")
+        finally:
+            # Whatever stopped the read, don't leave the scraper running or unreaped
+            if job.returncode is None:
+                job.process.kill()
+                job.returncode = job.process.wait()
+            job.process.stdout.close()
+
+        if job.cancel_requested:
+            job.status = 'cancelled'
+            job.log.append("--- Cancelled ---\n")
+        else:
+            job.status = 'finished' if job.returncode == 0 else 'failed'
+        job.finished_at = time.time()
+        job.log.close()
+        job._ended.set()
+
+    def _analyze_output(self, job):
+        """
+        Re-analyzes the scrape's output file whenever a batch is committed, so
+        the dashboard fills in while comments are still arriving. Each pass
+        reads only up to the last committed batch and scores just the rows
+        added since the previous one; a batch still being written is left
+        for the next pass. Derived data is rebuilt only every so often on
+        these passes (see LIVE_REBUILD_GROWTH) and fully on the final one.
+        """
+        filename = os.path.basename(job.output_file)
+        analyzed = None
+        while True:
+            ended = job._ended.is_set()
+            committed = job.committed_size
+            if not ended and committed is not None and committed != analyzed:
+                # If a pass is already running it runs again up to this size before returning
+                analysis_jobs.submit(job.output_file, filename, self.processed_folder, size=committed,
+                                     live=True).wait()
+                analyzed = committed
+                continue
+            if ended:
+                # Final pass over the whole file, hashing it rather than trusting size and mtime
+                analysis_jobs.submit(job.output_file, filename, self.processed_folder, verify=True).wait()
+                return
+            job._ended.wait(SCRAPE_ANALYSIS_INTERVAL)
+
+    def _prune(self):
+        finished = [jid for jid, j in self._jobs.items() if j.status not in ACTIVE_STATES]
+        for jid in finished[:max(len(finished) - MAX_FINISHED_SCRAPES, 0)]:
+            del self._jobs[jid]
+
+scrape_scheduler = ScrapeScheduler()
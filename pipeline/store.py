@@ -0,0 +1,417 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pipeline.frame_cache import frame_cache
+from pipeline.metrics import metrics, timed
+
+PROCESSED_FOLDER = os.path.join('data', 'processed')
+
+# Processed datasets are stored as uncompressed Arrow IPC (Feather v2)
+# files, which can be memory-mapped and read column by column. Older
+# split-orient JSON / JSON-lines artifacts are migrated on first read.
+ARTIFACT_EXT = '.arrow'
+_LEGACY_FORMATS = ('.json', '.jsonl')
+_FORMATS = (ARTIFACT_EXT,) + _LEGACY_FORMATS
+
+def processed_path(filename, folder=PROCESSED_FOLDER, ext=ARTIFACT_EXT):
+    return os.path.join(folder, f"{filename}{ext}")
+
+def find_processed_path(filename, folder=PROCESSED_FOLDER):
+    """Returns the path of the stored artifact for filename, or None."""
+    for ext in _FORMATS:
+        path = processed_path(filename, folder, ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+def artifact_version(filename, folder=PROCESSED_FOLDER):
+    """Changes whenever the artifact is rewritten: (mtime_ns, size), or None."""
+    filepath = find_processed_path(filename, folder)
+    if filepath is None:
+        return None
+    st = os.stat(filepath)
+    return (st.st_mtime_ns, st.st_size)
+
+def _remove_other_formats(filename, folder, keep):
+    for ext in _FORMATS:
+        path = processed_path(filename, folder, ext)
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+def meta_path(filename, folder=PROCESSED_FOLDER):
+    return processed_path(filename, folder, '.meta.json')
+
+def load_artifact_meta(filename, folder=PROCESSED_FOLDER):
+    """
+    Returns the metadata stored next to an artifact (source fingerprint,
+    row count, columns), or None if the artifact has none.
+    """
+    path = meta_path(filename, folder)
+    if not os.path.exists(path) or find_processed_path(filename, folder) is None:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading artifact metadata: {e}")
+        return None
+
+def stored_text_column(filename, folder=PROCESSED_FOLDER):
+    """The text column sentiment was scored on when the artifact was built, or None."""
+    return (load_artifact_meta(filename, folder) or {}).get('text_col')
+
+def save_artifact_meta(meta, filename, folder=PROCESSED_FOLDER):
+    path = meta_path(filename, folder)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(path + '.tmp', path)
+
+def _drop_meta(filename, folder):
+    path = meta_path(filename, folder)
+    if os.path.exists(path):
+        os.remove(path)
+
+# --- Arrow Conversion ---
+def _stringify(series):
+    """Object columns with mixed types can't be typed by Arrow; store them as text."""
+    return series.where(series.isna(), series.astype(str))
+
+def frame_to_table(df):
+    """Converts a DataFrame to an Arrow table, falling back to text for mixed columns."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        df = df.copy()
+        for col in df.columns:
+            try: pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError): df[col] = _stringify(df[col])
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    # All-null columns have no type yet; store them as text
+    fields = [f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+def conform_table(table, schema):
+    """Casts a table to `schema` so chunks inferred separately can share one file."""
+    if table.schema.equals(schema, check_metadata=False):
+        return table
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), field.type))
+            continue
+        col = table.column(field.name)
+        try:
+            columns.append(col.cast(field.type, safe=False))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            if not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+                raise
+            text = _stringify(col.to_pandas())
+            columns.append(pa.array(text, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def _write_table(table, filepath):
+    tmp_path = filepath + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, filepath)
+
+# --- Artifact I/O ---
+@timed('store.save')
+def save_processed_df(df, filename, folder=PROCESSED_FOLDER, meta=None):
+    """
+    Saves the processed dataframe to the processed folder.
+
+    Without `meta`, any stored metadata is dropped since it no longer
+    describes the artifact.
+    """
+    _drop_meta(filename, folder)
+    filepath = processed_path(filename, folder)
+    _write_table(frame_to_table(df), filepath)
+    _remove_other_formats(filename, folder, filepath)
+    frame_cache.invalidate(folder, filename)
+    if meta is not None:
+        save_artifact_meta(meta, filename, folder)
+
+@timed('store.append')
+def append_processed_df(df, filename, folder=PROCESSED_FOLDER):
+    """Appends rows to an existing artifact. Returns False if there is none."""
+    filepath = _ensure_columnar(filename, folder)
+    if filepath is None:
+        return False
+
+    # IPC files can't be extended in place: stream the mapped batches plus
+    # the new rows into a replacement file.
+    source = pa.memory_map(filepath, 'r')
+    try:
+        reader = pa.ipc.open_file(source)
+        new_rows = conform_table(frame_to_table(df), reader.schema)
+        tmp_path = filepath + '.tmp'
+        with pa.ipc.new_file(tmp_path, reader.schema) as writer:
+            for i in range(reader.num_record_batches):
+                writer.write_batch(reader.get_batch(i))
+            writer.write_table(new_rows)
+    finally:
+        source.close()
+    os.replace(tmp_path, filepath)
+    frame_cache.invalidate(folder, filename)
+    return True
+
+def _load_legacy(filepath):
+    if filepath.endswith('.jsonl'):
+        return pd.read_json(filepath, orient='records', lines=True)
+    return pd.read_json(filepath, orient='split')
+
+def _ensure_columnar(filename, folder):
+    """Returns the Arrow artifact path, migrating a legacy JSON artifact first."""
+    filepath = find_processed_path(filename, folder)
+    if filepath is None or filepath.endswith(ARTIFACT_EXT):
+        return filepath
+
+    print(f"--- Migrating {os.path.basename(filepath)} to {ARTIFACT_EXT} ---")
+    df = _load_legacy(filepath)
+    columnar_path = processed_path(filename, folder)
+    _write_table(frame_to_table(df), columnar_path)
+    _remove_other_formats(filename, folder, columnar_path)
+    return columnar_path
+
+@timed('store.load')
+def load_processed_df(filename, folder=PROCESSED_FOLDER, columns=None):
+    """
+    Loads a stored artifact, or returns None.
+
+    Frames are served from the in-process frame cache when the artifact
+    is unchanged; otherwise the file is memory-mapped and only `columns`
+    (default: all) are read.
+    """
+    filepath = _ensure_columnar(filename, folder)
+    if filepath is None:
+        return None
+    if columns is not None:
+        available = set(load_processed_columns(filename, folder))
+        columns = [c for c in columns if c in available]
+
+    # A cached full frame can serve any projection
+    version = artifact_version(filename, folder)
+    full_key = (folder, filename, version, None)
+    key = full_key if columns is None else (folder, filename, version, tuple(columns))
+    hit = frame_cache.get(full_key, key)
+    if hit is not None:
+        cached_key, df = hit
+        return df[columns] if cached_key != key else df
+
+    df = feather.read_table(filepath, columns=columns, memory_map=True).to_pandas()
+    frame_cache.put(key, df)
+    return df
+
+@timed('store.load_rows')
+def load_processed_rows(filename, folder=PROCESSED_FOLDER, rows=(), columns=None):
+    """
+    Loads the rows at positions `rows` (in that order) of a stored
+    artifact, or returns None.
+
+    The file is memory-mapped and only the requested rows of `columns`
+    are converted, so picking a handful of rows doesn't read whole columns.
+    A cached frame holding the columns is used instead when there is one.
+    """
+    filepath = _ensure_columnar(filename, folder)
+    if filepath is None:
+        return None
+    names = load_processed_columns(filename, folder)
+    columns = names if columns is None else [c for c in columns if c in names]
+    rows = [int(row) for row in rows]
+
+    version = artifact_version(filename, folder)
+    hit = frame_cache.get((folder, filename, version, None), (folder, filename, version, tuple(columns)))
+    if hit is not None:
+        return hit[1][columns].iloc[rows].reset_index(drop=True)
+
+    with pa.memory_map(filepath, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        batches = [reader.get_batch(i).select(columns) for i in range(reader.num_record_batches)]
+        schema = reader.schema.empty_table().select(columns).schema
+        # Batches are zero-copy views of the map; find each row's batch by offset
+        offsets = np.cumsum([0] + [batch.num_rows for batch in batches])
+        picked = []
+        for row in rows:
+            if not 0 <= row < offsets[-1]:
+                raise IndexError(f"row {row} out of range for {filename}")
+            i = int(np.searchsorted(offsets, row, side='right')) - 1
+            picked.append(batches[i].slice(row - offsets[i], 1))
+        table = pa.Table.from_batches(picked, schema=schema)
+        return table.to_pandas()
+
+def load_processed_columns(filename, folder=PROCESSED_FOLDER):
+    """Returns the column names of an artifact without reading any data."""
+    filepath = _ensure_columnar(filename, folder)
+    if filepath is None:
+        return []
+    with pa.memory_map(filepath, 'r') as source:
+        return pa.ipc.open_file(source).schema.names
+
+class ProcessedWriter:
+    """
+    Appends processed chunks to an Arrow artifact.
+
+    The schema is fixed by the first chunk and later chunks are cast to it.
+    Chunks go to a temporary file that replaces the artifact on commit(),
+    so readers never see a half-written dataset.
+    """
+
+    def __init__(self, filename, folder=PROCESSED_FOLDER):
+        _drop_meta(filename, folder)
+        self.filename = filename
+        self.folder = folder
+        self.path = processed_path(filename, folder)
+        self.tmp_path = self.path + '.tmp'
+        self.rows = 0
+        self.schema = None
+        self._writer = None
+
+    def append(self, df):
+        if df.empty:
+            return
+        table = frame_to_table(df)
+        if self._writer is None:
+            self.schema = table.schema
+            self._writer = pa.ipc.new_file(self.tmp_path, self.schema)
+        else:
+            table = conform_table(table, self.schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def commit(self, meta=None):
+        self._close()
+        os.replace(self.tmp_path, self.path)
+        _remove_other_formats(self.filename, self.folder, self.path)
+        frame_cache.invalidate(self.folder, self.filename)
+        if meta is not None:
+            save_artifact_meta(meta, self.filename, self.folder)
+
+    def abort(self):
+        self._close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+# --- Derived Artifacts ---
+# Indexes, rollups and summaries computed from a processed dataset are
+# persisted next to it, stamped with what they were built from.
+
+def save_npz(path, stamp, header, arrays):
+    """Writes arrays plus a JSON header (and the stamp) as one .npz, atomically."""
+    header = json.dumps({**header, 'stamp': stamp})
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, header=np.array(header), **arrays)
+    os.replace(path + '.tmp', path)
+
+def load_npz(path):
+    """(stamp, header, arrays) of a file written by save_npz."""
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data['header']))
+        arrays = {name: data[name] for name in data.files if name != 'header'}
+    return header.pop('stamp', None), header, arrays
+
+def save_json(value, path, stamp):
+    """Writes a JSON-serializable value and its stamp, atomically."""
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'stamp': stamp, 'value': value}, f)
+    os.replace(path + '.tmp', path)
+
+def load_json(path):
+    """(stamp, value) of a file written by save_json."""
+    with open(path, 'r', encoding='utf-8') as f:
+        stored = json.load(f)
+    return stored.get('stamp'), stored.get('value')
+
+class DerivedCache:
+    """
+    Values derived from processed datasets, one per dataset, persisted
+    next to the artifact as `filename + ext` and kept in memory for the
+    `max_loaded` most recently used datasets.
+
+    A value is stamped with its format number `fmt`, the artifact version
+    and the extra `params` it was built with; one whose stamp doesn't
+    match the current one (artifact rewritten, format bumped) is rebuilt.
+    Bump `fmt` whenever `build` changes what it computes.
+
+    Args:
+        name (str): Used in metrics and error messages.
+        build: build(df, filename, folder, *params) -> value, or None if
+            there is nothing to derive.
+        save: save(value, path, stamp).
+        load: load(path) -> (stamp, value).
+    """
+
+    def __init__(self, name, ext, fmt, build, save, load, max_loaded=8):
+        self.name = name
+        self.ext = ext
+        self.fmt = fmt
+        self.build = build
+        self.save = save
+        self.load = load
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, filename, folder=PROCESSED_FOLDER):
+        return processed_path(filename, folder, self.ext)
+
+    def get(self, filename, folder=PROCESSED_FOLDER, df=None, params=()):
+        """
+        Returns the value for the current artifact version, loading or
+        (re)building and persisting it as needed. `df` (the processed
+        frame) saves reading it when a build is needed. None if there is
+        no artifact or nothing to derive.
+        """
+        version = artifact_version(filename, folder)
+        if version is None:
+            return None
+        stamp = [self.fmt, list(version), *params]
+        key = (folder, filename)
+
+        with self._lock:
+            cached = self._loaded.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._loaded.move_to_end(key)
+                metrics.inc('cache_hits_total', cache=self.name)
+                return cached[1]
+        metrics.inc('cache_misses_total', cache=self.name)
+
+        value = None
+        path = self.path(filename, folder)
+        if os.path.exists(path):
+            try:
+                stored, value = self.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error reading {self.name}: {e}")
+                stored = None
+            if stored != stamp:
+                value = None
+
+        if value is None:
+            if df is None:
+                df = load_processed_df(filename, folder)
+            if df is None:
+                return None
+            value = self.build(df, filename, folder, *params)
+            if value is None:
+                return None
+            try:
+                self.save(value, path, stamp)
+            except OSError as e:
+                print(f"Error saving {self.name}: {e}")
+
+        with self._lock:
+            self._loaded[key] = (stamp, value)
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return value
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from analyzers.sentiment_model import find_text_column
+from analyzers.tokenizer import explode_tokens, tokenize
+from pipeline.store import PROCESSED_FOLDER, DerivedCache, save_npz, load_npz, stored_text_column
+from pipeline.metrics import timed
+
+SENTIMENT_CODES = {'positive': 0, 'negative': 1, 'neutral': 2}
+# Bump when tokenization or the column choice changes so stored indexes are rebuilt
+INDEX_FORMAT = 4
+
+class TokenIndex:
+    """
+    Inverted index of a processed dataset: token -> row positions.
+
+    Postings are stored CSR-style: the rows holding token i are
+    rows[offsets[i]:offsets[i + 1]] (ascending), with the number of
+    occurrences per row in freqs. Tokens are kept in first-appearance order
+    so count ties break the same way as a scan of the text column.
+    """
+
+    def __init__(self, text_col, vocab, offsets, rows, freqs, sentiments):
+        self.text_col = text_col
+        self.vocab = vocab
+        self.offsets = offsets
+        self.rows = rows
+        self.freqs = freqs
+        self.sentiments = sentiments
+        self.n_rows = len(sentiments)
+        self._ids = {token: i for i, token in enumerate(vocab)}
+
+    @classmethod
+    @timed('token_index.build')
+    def build(cls, df, text_col=None):
+        """
+        Indexes `text_col` of df (default: the column find_text_column
+        picks), or returns None if there is none.
+        """
+        text_col = text_col or find_text_column(df)
+        if not text_col or text_col not in df.columns:
+            return None
+
+        n = len(df)
+        if 'sentiment' in df.columns:
+            labels = df['sentiment'].astype(str).str.lower().map(SENTIMENT_CODES)
+            sentiments = labels.fillna(-1).to_numpy(dtype=np.int8)
+        else:
+            sentiments = np.full(n, SENTIMENT_CODES['neutral'], dtype=np.int8)
+
+        tokens = explode_tokens(df[text_col])
+        if tokens.empty:
+            empty = np.zeros(0, dtype=np.int32)
+            return cls(text_col, [], np.zeros(1, dtype=np.int64), empty, empty, sentiments)
+
+        token_ids, vocab = pd.factorize(tokens.to_numpy())
+        # One key per (token, row) pair; unique() sorts by token, then row
+        keys = token_ids.astype(np.int64) * n + tokens.index.to_numpy(dtype=np.int64)
+        keys, freqs = np.unique(keys, return_counts=True)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(keys // n, minlength=len(vocab)))
+        return cls(text_col, list(vocab), offsets, (keys % n).astype(np.int32),
+                   freqs.astype(np.int32), sentiments)
+
+    # --- Queries ---
+    def postings(self, token):
+        """Rows containing token (ascending)."""
+        i = self._ids.get(token)
+        if i is None:
+            return np.zeros(0, dtype=np.int32)
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def search(self, query):
+        """Rows containing every token of the query."""
+        tokens = tokenize(str(query).lower())
+        if not tokens:
+            return np.zeros(0, dtype=np.int32)
+        # Intersect from the rarest token up
+        lists = sorted((self.postings(t) for t in set(tokens)), key=len)
+        result = lists[0]
+        for rows in lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def sentiment_counts(self, rows):
+        """Positive / Negative / Neutral breakdown for a set of rows."""
+        codes = np.bincount(self.sentiments[rows][self.sentiments[rows] >= 0], minlength=3)
+        return {'Positive': int(codes[0]), 'Negative': int(codes[1]), 'Neutral': int(codes[2])}
+
+    def term_counts(self, min_len=0, exclude=()):
+        """
+        Occurrence counts per token, overall and by row sentiment.
+
+        Returns:
+            pd.DataFrame: Indexed by token in first-appearance order, with
+            columns count, positive, negative and neutral.
+        """
+        columns = ['count', 'positive', 'negative', 'neutral']
+        if not self.vocab:
+            return pd.DataFrame(columns=columns, dtype=np.int64)
+
+        token_ids = np.repeat(np.arange(len(self.vocab)), np.diff(self.offsets))
+        row_sentiments = self.sentiments[self.rows]
+        stats = {'count': np.bincount(token_ids, weights=self.freqs, minlength=len(self.vocab))}
+        for name, code in SENTIMENT_CODES.items():
+            mask = row_sentiments == code
+            stats[name] = np.bincount(token_ids[mask], weights=self.freqs[mask], minlength=len(self.vocab))
+
+        counts = pd.DataFrame(stats, index=self.vocab, columns=columns).astype(np.int64)
+        vocab = counts.index.to_series()
+        keep = (vocab.str.len() > min_len) & ~vocab.isin(exclude)
+        return counts[keep.to_numpy()]
+
+    # --- Persistence ---
+    def save(self, path, stamp):
+        # Tokens are [a-z]+ so a newline-joined string round-trips without pickling
+        save_npz(path, stamp, {'text_col': self.text_col},
+                 {'vocab': np.array("\n".join(self.vocab)), 'offsets': self.offsets, 'rows': self.rows,
+                  'freqs': self.freqs, 'sentiments': self.sentiments})
+
+    @classmethod
+    def load(cls, path):
+        """(stamp, index) of a saved index."""
+        stamp, header, arrays = load_npz(path)
+        vocab = str(arrays['vocab'])
+        return stamp, cls(header['text_col'], vocab.split("\n") if vocab else [], arrays['offsets'],
+                          arrays['rows'], arrays['freqs'], arrays['sentiments'])
+
+# Recently used indexes stay loaded, so term queries don't touch the disk
+token_indexes = DerivedCache('token_index', '.index.npz', INDEX_FORMAT,
+                             build=lambda df, filename, folder: TokenIndex.build(df, stored_text_column(filename, folder)),
+                             save=TokenIndex.save, load=TokenIndex.load)
+
+def get_token_index(filename, folder=PROCESSED_FOLDER, df=None):
+    """
+    Returns the index for the current artifact version, loading or
+    (re)building and persisting it as needed. None if nothing to index.
+    """
+    return token_indexes.get(filename, folder, df)
@@ -1,10 +1,14 @@
-import sys
 import os
 import argparse
 import pandas as pd
 import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+from pipeline.scrape_checkpoints import CheckpointStore
 import tempfile
+import time
+import inspect
 import base64
+from datetime import datetime, timezone
 import os as _os
 
 def parse_number(text):
@@ -19,8 +23,90 @@ def parse_number(text):
     except: pass
     return 0
 
-def run_scraper(video_url, filter_keywords, min_length, cookies_path="", cookies_from_browser=False):
-    print(f"--- Initializing yt-dlp Scraper ---", flush=True)
+# --- Streaming Output ---
+# Comments are appended to the output CSV in batches as yt-dlp pages through
+# them, so the app can analyze a scrape while it is still running.
+SCRAPE_FLUSH_COMMENTS = int(_os.getenv('SCRAPE_FLUSH_COMMENTS', 500))
+SCRAPE_FLUSH_SECONDS = float(_os.getenv('SCRAPE_FLUSH_SECONDS', 2))
+# Printed once the output file exists; the app's scrape scheduler watches for it
+OUTPUT_MARKER = "--- Writing to: "
+# Printed after every batch with the file size: everything before that byte
+# is complete rows, so the app analyzes only up to it while the scrape runs
+COMMITTED_MARKER = "--- Committed bytes: "
+
+def extract_with_comment_stream(ydl, video_url):
+    """
+    Returns (info, comments): the video metadata and an iterator that yields
+    comments as they are fetched, instead of after the last page.
+    """
+    info = ydl.extract_info(video_url, download=False, process=False)
+    while info.get('_type') in ('url', 'url_transparent'):
+        info = ydl.extract_info(info['url'], download=False, process=False)
+
+    post_extractor = info.pop('__post_extractor', None)
+    if post_extractor is None:
+        return info, iter(info.get('comments') or [])
+    # yt-dlp only exposes the comment generator through this closure; if its
+    # internals change, fall back to collecting all comments first
+    try:
+        generator = inspect.getclosurevars(post_extractor).nonlocals.get('generator')
+    except TypeError:
+        generator = None
+    if generator is None:
+        return info, iter((post_extractor() or {}).get('comments') or [])
+    return info, _until_disabled(generator)
+
+def _until_disabled(generator):
+    try:
+        yield from generator
+    except InfoExtractor.CommentsDisabled:
+        return
+
+# With newest-first sorting, this many already-seen comments in a row means
+# everything after them was fetched by an earlier run
+KNOWN_STREAK_STOP = 50
+
+def filter_comments(df, filter_keywords, min_length):
+    df = df[df['comment'].str.len() >= min_length]
+    if filter_keywords:
+        kws = [k.strip().lower() for k in filter_keywords.split(',')]
+        mask = df['comment'].str.lower().apply(lambda x: any(k in x for k in kws))
+        df = df[~mask]
+    return df
+
+def append_comments(path, df, header):
+    """
+    Appends a batch and returns the file size after it. A reader may see
+    part of a batch while it is being written; only the returned size marks
+    a row boundary.
+    """
+    data = df.to_csv(index=False, header=header)
+    with open(path, 'w' if header else 'a', encoding='utf-8', newline='') as f:
+        f.write(data)
+    return os.path.getsize(path)
+
+def output_path(video_title, vid_id):
+    if not os.path.exists('data'): os.makedirs('data')
+    # Safe filename
+    safe_title = "".join([c for c in video_title if c.isalnum() or c in (' ','-')])[:20]
+    return f"data/YT_{safe_title}_{vid_id}.csv"
+
+def format_timestamp(ts):
+    if not ts: return ''
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def run_scraper(video_url, filter_keywords, min_length, cookies_path="", cookies_from_browser=False,
+                max_comments=0, sort='new', full=False):
+    """
+    Scrapes a video's comments into data/YT_<title>_<id>.csv.
+
+    Comment ids are checkpointed per video, so a rerun appends only comments
+    not written before: an interrupted run picks up where it stopped, and
+    with sort='new' a rerun of a finished scrape stops as soon as it reaches
+    comments it already has. `max_comments` caps the new comments fetched
+    (0 = no cap); `full` discards the checkpoint and starts over.
+    """
+    print("--- Initializing yt-dlp Scraper ---", flush=True)
     print(f"--- Target URL: {video_url} ---", flush=True)
 
     # yt-dlp options to get comments without downloading video
@@ -30,6 +116,7 @@ def run_scraper(video_url, filter_keywords, min_length, cookies_path="", cookies
         'getcomments': True,  # Fetch comments
         'quiet': True,        # Less noise
         'no_warnings': True,
+        'extractor_args': {'youtube': {'comment_sort': [sort]}},
         # 'playlist_items': '1', # Only one video if it's a playlist
     }
 
@@ -43,39 +130,111 @@ def run_scraper(video_url, filter_keywords, min_length, cookies_path="", cookies
         # in many environments). If unsupported, yt-dlp will raise an error.
         ydl_opts['cookiesfrombrowser'] = 'chrome'
 
-    comments_data = []
-    video_title = "Unknown Video"
-    video_likes = 0
+    store = CheckpointStore()
+    filename = None
+    columns = None
+    announced = False
+    raw_count = 0
+    saved = 0
+
+    def flush(batch, batch_ids):
+        nonlocal filename, columns, announced, saved
+        df = filter_comments(pd.DataFrame(batch), filter_keywords, min_length) if batch else pd.DataFrame()
+        committed = None
+        if filename is None:
+            if df.empty:
+                return
+            filename = output_path(video_title, vid_id)
+            store.start(vid_id, filename)
+            committed = append_comments(filename, df, header=True)
+            columns = list(df.columns)
+        elif not df.empty:
+            # Keep the layout of the file being appended to
+            committed = append_comments(filename, df.reindex(columns=columns), header=False)
+        # Checkpoint only after the rows are on disk
+        store.mark_seen(vid_id, batch_ids, len(df))
+        if not announced:
+            print(f"{OUTPUT_MARKER}{filename} ---", flush=True)
+            announced = True
+        if committed is not None:
+            print(f"{COMMITTED_MARKER}{committed} ---", flush=True)
+        saved += len(df)
+        print(f"--- Saved {saved} new comments ({raw_count} fetched) ---", flush=True)
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             print("--- Fetching Video Metadata & Comments... (This may take a moment) ---", flush=True)
-            info = ydl.extract_info(video_url, download=False)
+            info, raw_comments = extract_with_comment_stream(ydl, video_url)
             
             video_title = info.get('title', 'Unknown Video')
             video_likes = info.get('like_count', 0)
+            vid_id = info.get('id') or 'video'
             
             print(f"--- Video Found: {video_title[:50]}... ---", flush=True)
             print(f"--- Likes: {video_likes} ---", flush=True)
 
-            # Extract comments
-            raw_comments = info.get('comments', [])
-            print(f"--- Found {len(raw_comments)} raw comments. Processing... ---", flush=True)
-
-            if not raw_comments:
-                print("!!! No comments found. Comments might be disabled or not loaded. !!!", flush=True)
+            checkpoint = store.get_video(vid_id)
+            if checkpoint and (full or not os.path.exists(checkpoint['output_file'])):
+                print("--- Discarding previous checkpoint, starting over ---", flush=True)
+                store.reset(vid_id)
+                checkpoint = None
+            seen = set()
+            stop_on_known = False
+            if checkpoint:
+                filename = checkpoint['output_file']
+                columns = list(pd.read_csv(filename, nrows=0).columns)
+                seen = store.seen_ids(vid_id)
+                stop_on_known = checkpoint['complete'] and sort == 'new'
+                store.start(vid_id, filename)
+                state = 'complete' if checkpoint['complete'] else 'interrupted'
+                print(f"--- Resuming from checkpoint: {len(seen)} comments known, last run {state} ---", flush=True)
 
+            batch, batch_ids = [], []
+            known_streak = 0
+            exhausted = True
+            last_flush = time.monotonic()
             for c in raw_comments:
+                cid = c.get('id')
+                if cid and cid in seen:
+                    known_streak += 1
+                    if stop_on_known and known_streak >= KNOWN_STREAK_STOP:
+                        print("--- Reached comments from the last run. ---", flush=True)
+                        break
+                    continue
+                known_streak = 0
+                raw_count += 1
+                if cid:
+                    seen.add(cid)
+                    batch_ids.append(cid)
+
                 txt = c.get('text', '')
                 auth = c.get('author', 'Anonymous')
                 
                 if txt:
-                    comments_data.append({
+                    batch.append({
                         "video_title": video_title,
                         "author": auth,
                         "comment": txt,
-                        "video_likes": video_likes
+                        "video_likes": video_likes,
+                        "comment_id": cid,
+                        "timestamp": format_timestamp(c.get('timestamp')),
                     })
+                if (batch or batch_ids) and (max(len(batch), len(batch_ids)) >= SCRAPE_FLUSH_COMMENTS or time.monotonic() - last_flush >= SCRAPE_FLUSH_SECONDS):
+                    flush(batch, batch_ids)
+                    batch, batch_ids = [], []
+                    last_flush = time.monotonic()
+                if max_comments and raw_count >= max_comments:
+                    print(f"--- Reached the limit of {max_comments} new comments. ---", flush=True)
+                    exhausted = False
+                    break
+            if batch or batch_ids:
+                flush(batch, batch_ids)
+            # Capped runs stay resumable; the next run continues past them
+            if exhausted and filename:
+                store.finish(vid_id)
+
+            if not raw_count and not seen:
+                print("!!! No comments found. Comments might be disabled or not loaded. !!!", flush=True)
 
     except Exception as e:
         err = str(e)
@@ -85,37 +244,18 @@ def run_scraper(video_url, filter_keywords, min_length, cookies_path="", cookies
             print("--- Hint: YouTube is blocking access. Provide cookies with `--cookies PATH`", flush=True)
             print("or enable `--cookies_from_browser` and ensure the deployment has access to browser cookie extraction.", flush=True)
             print("See: https://github.com/yt-dlp/yt-dlp/wiki/FAQ#how-do-i-pass-cookies-to-yt-dlp", flush=True)
+        if filename:
+            print(f"--- Kept {saved} comments saved before the error in: {filename} (rerun to resume) ---", flush=True)
         return
+    finally:
+        store.close()
 
-    if not comments_data:
-        print("!!! No data collected. Exiting. ---", flush=True)
+    if not saved:
+        print("--- No new comments to save. ---" if filename else "!!! No data collected. Exiting. ---", flush=True)
         return
 
-    # --- Save Data ---
-    df = pd.DataFrame(comments_data)
-    
-    # Filter
-    df = df[df['comment'].str.len() >= min_length]
-    if filter_keywords:
-        kws = [k.strip().lower() for k in filter_keywords.split(',')]
-        mask = df['comment'].str.lower().apply(lambda x: any(k in x for k in kws))
-        df = df[~mask]
-        
-    print(f"--- Captured {len(df)} valid comments. ---", flush=True)
-
-    if len(df) > 0:
-        if not os.path.exists('data'): os.makedirs('data')
-        # Safe filename
-        safe_title = "".join([c for c in video_title if c.isalnum() or c in (' ','-')])[:20]
-        # Extract ID safely
-        try:
-            vid_id = info.get('id', 'video')
-        except:
-            vid_id = 'video'
-            
-        filename = f"data/YT_{safe_title}_{vid_id}.csv"
-        df.to_csv(filename, index=False, encoding='utf-8')
-        print(f"--- Saved to: {filename} ---", flush=True)
+    print(f"--- Captured {saved} valid comments. ---", flush=True)
+    print(f"--- Saved to: {filename} ---", flush=True)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -124,6 +264,9 @@ if __name__ == "__main__":
     parser.add_argument("--min_length", type=int, default=10)
     parser.add_argument("--cookies", type=str, default="", help="Path to a cookies.txt file exported from your browser")
     parser.add_argument("--cookies_from_browser", action="store_true", help="Try to extract cookies from the default browser (e.g., Chrome) on the host")
+    parser.add_argument("--max_comments", type=int, default=0, help="Stop after this many new comments (0 = no limit)")
+    parser.add_argument("--sort", choices=["new", "top"], default="new", help="Comment order; 'new' lets reruns stop at already-scraped comments")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and scrape the video from scratch")
     args = parser.parse_args()
     # Environment-variable support for Render/cloud deployments:
     # - YTDLP_COOKIES_PATH: a path on disk (if you mounted a secret or persistent disk)
@@ -154,11 +297,12 @@ if __name__ == "__main__":
         elif env_cookies_path:
             print(f"--- Using cookies from env path: {env_cookies_path} ---", flush=True)
         elif temp_cookie_path:
-            print(f"--- Using temporary cookies file written from YTDLP_COOKIES_B64 ---", flush=True)
+            print("--- Using temporary cookies file written from YTDLP_COOKIES_B64 ---", flush=True)
         elif args.cookies_from_browser:
-            print(f"--- Attempting to use browser cookies on host (cookies_from_browser=True) ---", flush=True)
+            print("--- Attempting to use browser cookies on host (cookies_from_browser=True) ---", flush=True)
 
-        run_scraper(args.url, args.filter_keywords, args.min_length, cookies_path=chosen_cookies_path, cookies_from_browser=args.cookies_from_browser)
+        run_scraper(args.url, args.filter_keywords, args.min_length, cookies_path=chosen_cookies_path, cookies_from_browser=args.cookies_from_browser,
+                    max_comments=args.max_comments, sort=args.sort, full=args.full)
     finally:
         # cleanup temporary file if created
         if temp_cookie_path:
@@ -0,0 +1,54 @@
+"""
+Reports how long `import app` takes in a fresh interpreter and which
+imports dominate it, using Python's -X importtime. Run it after touching
+imports to catch cold-start regressions:
+
+    python startup_report.py [--top 15] [--max-ms 1500]
+
+Exits with status 1 if the total exceeds --max-ms.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+def measure(module='app'):
+    """
+    Imports `module` in a new process. Returns (total_us, rows), rows being
+    (cumulative_us, self_us, name) for every module imported.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=here, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    total = next((cum for cum, _, name in rows if name.strip() == module), 0)
+    return total, rows
+
+def top_level(rows):
+    """Modules imported directly by the measured one or by the interpreter."""
+    depth = min(len(name) - len(name.lstrip()) for _, _, name in rows)
+    return [r for r in rows if len(r[2]) - len(r[2].lstrip()) <= depth + 2]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cold-start import time of the app.")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--max-ms', type=float, default=0, help="Fail if the import takes longer")
+    args = parser.parse_args()
+
+    total, rows = measure(args.module)
+    print(f"--- import {args.module}: {total / 1000:.0f} ms ---")
+    for cumulative, own, name in sorted(top_level(rows), reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:9.1f} ms  {own / 1000:8.1f} ms self  {name.strip()}")
+
+    if args.max_ms and total / 1000 > args.max_ms:
+        print(f"Startup regression: {total / 1000:.0f} ms > {args.max_ms:.0f} ms budget")
+        sys.exit(1)
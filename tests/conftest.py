@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The app keeps its data under relative paths ('data/processed/...'), so
+# run the suite from a scratch directory and never touch the real data
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix='sentiment-tests-'))
+
+os.environ.setdefault('LLM_BACKEND', 'fake')
+os.environ.setdefault('NLTK_AUTO_DOWNLOAD', '0')
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import app as app_module
+from chat import chatbot
+from chat.fake_llm import FakeLLM
+from chat.llm_cache import ResponseCache
+
+ANSWER = "sentiment is mostly positive"
+
+def parse_events(body):
+    """SSE body -> [(event, data)], event being 'message' when unnamed."""
+    events = []
+    for block in body.split('\n\n'):
+        if not block.strip():
+            continue
+        event, data = 'message', []
+        for line in block.split('\n'):
+            field, _, value = line.partition(': ')
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+        events.append((event, json.loads('\n'.join(data))))
+    return events
+
+class FailingLLM(FakeLLM):
+    """Streams one word, then fails like a dropped connection."""
+
+    def stream(self, messages):
+        for i, chunk in enumerate(super().stream(messages)):
+            if i == 1:
+                raise RuntimeError('connection lost')
+            yield chunk
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    fake = FakeLLM(responses=[ANSWER], latency=0.05, token_latency=0.01)
+    chatbot.set_llm(fake)
+    cache = ResponseCache(path=str(tmp_path / 'llm_cache.db'))
+    monkeypatch.setattr(chatbot, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(app_module, 'chat_context', lambda message: ("Rows: 3", ""))
+    yield fake
+    chatbot.set_llm(None)
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['current_filename'] = 'comments.csv'
+        yield client
+
+def stream(client, message="How do people feel?"):
+    response = client.post('/api/chat/stream', json={'message': message})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    return parse_events(response.get_data(as_text=True))
+
+def test_streams_tokens_then_done(llm, client):
+    answers_before = chatbot.chat_latency.stats()['answers']
+
+    events = stream(client)
+
+    tokens = [data['token'] for event, data in events if event == 'message']
+    assert len(tokens) == len(ANSWER.split())
+    assert ''.join(tokens) == ANSWER
+    assert [event for event, _ in events][-1] == 'done'
+    done = events[-1][1]
+    assert done['cached'] is False
+    # The fake model waits 50 ms before its first word, then 10 ms per word
+    assert 50 <= done['ttft_ms'] <= done['total_ms']
+    assert done['total_ms'] >= done['ttft_ms'] + 10 * (len(tokens) - 1)
+
+    stats = chatbot.chat_latency.stats()
+    assert stats['answers'] == answers_before + 1
+    assert stats['ttft_max_ms'] >= done['ttft_ms']
+
+def test_repeated_question_is_served_from_cache(llm, client):
+    stream(client)
+    events = stream(client, "  how do PEOPLE feel? ")
+
+    assert llm.calls == 1
+    assert events == [('message', {'token': ANSWER}), ('done', events[-1][1])]
+    assert events[-1][1]['cached'] is True
+
+def test_model_failure_ends_with_error_event(llm, client):
+    chatbot.set_llm(FailingLLM(responses=[ANSWER]))
+    answers_before = chatbot.chat_latency.stats()['answers']
+
+    events = stream(client)
+
+    assert events[0] == ('message', {'token': 'sentiment '})
+    assert events[-1] == ('error', {'error': 'AI Error: connection lost'})
+    assert 'done' not in [event for event, _ in events]
+    assert chatbot.chat_latency.stats()['answers'] == answers_before
+
+def test_rejects_requests_without_a_dataset_or_message(llm):
+    with app_module.app.test_client() as client:
+        assert client.post('/api/chat/stream', json={'message': 'hi'}).status_code == 400
+        with client.session_transaction() as sess:
+            sess['current_filename'] = 'comments.csv'
+        assert client.post('/api/chat/stream', json={'message': '  '}).status_code == 400
@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+import app as app_module
+from pipeline.consolidated import ConsolidatedStore
+from pipeline.store import save_processed_df
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    folder = str(tmp_path / 'processed')
+    df = pd.DataFrame({
+        'comment': ['great video', 'awful sound', 'fine I guess'],
+        'date': ['2019-12-31T23:30:00Z', '2020-01-01T00:30:00Z', '2020-01-02T12:00:00Z'],
+        'sentiment': ['Positive', 'Negative', 'Neutral'],
+        'sentiment_score': [0.8, -0.6, 0.0],
+    })
+    os.makedirs(folder)
+    save_processed_df(df, 'comments.csv', folder)
+    store = ConsolidatedStore(root=str(tmp_path / 'consolidated'))
+    assert store.update('comments.csv', folder)
+    monkeypatch.setattr(app_module, 'consolidated_store', store)
+    return store
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+def test_zoned_bounds_are_compared_in_utc(store, client):
+    response = client.get('/api/compare?include=sentiment,trend'
+                          '&start=2020-01-01T00:00:00Z&end=2020-01-02T02:00:00%2B02:00')
+    assert response.status_code == 200
+
+    result = response.get_json()
+    # 2020-01-02T02:00+02:00 is midnight UTC, so only the 00:30 comment is in range
+    assert result['sentiment']['comments.csv']['counts'] == {'Positive': 0, 'Neutral': 0, 'Negative': 1}
+    assert result['trend']['comments.csv']['dates'] == ['2020-01-01']
+
+def test_unusable_bounds_are_rejected(store, client):
+    assert client.get('/api/compare?start=not-a-date').status_code == 400
+    assert client.get('/api/compare?end=NaT').status_code == 400
+
+def test_top_n_is_clamped(store, client):
+    for top_n, expected in (('-1', 1), ('0', 1), ('1000', 6)):
+        keywords = client.get(f'/api/compare?include=keywords&top_n={top_n}').get_json()['keywords']
+        assert len(keywords['overall']) == expected
+        assert len(keywords['per_source']['comments.csv']) == expected
+
+def test_whole_range_share_reads_the_manifest_once(store, monkeypatch):
+    reads = []
+    manifest = store.manifest
+    monkeypatch.setattr(store, 'manifest', lambda: reads.append(1) or manifest())
+    share = store.sentiment_share(['comments.csv', 'other.csv', 'third.csv'])
+    assert share['comments.csv']['rows'] == 3
+    assert share['other.csv']['rows'] == 0
+    assert len(reads) == 1
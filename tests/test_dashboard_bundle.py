@@ -0,0 +1,60 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from analyzers import issue_matcher
+from pipeline import dashboard
+from pipeline.store import save_processed_df
+
+@pytest.fixture
+def taxonomy():
+    """Writes the taxonomy file at its default (cwd-relative) path."""
+    path = issue_matcher.ISSUE_TAXONOMY_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(categories):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(categories, f)
+
+    yield write
+    os.remove(path)
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = str(tmp_path)
+    save_processed_df(pd.DataFrame({
+        'comment': ['the app keeps crashing', 'way too expensive', 'crashed again, so slow'],
+        'sentiment': ['Negative', 'Negative', 'Negative'],
+        'sentiment_score': [-0.6, -0.4, -0.7],
+    }), 'comments.csv', folder)
+    return folder
+
+def issue_names(folder):
+    return [issue['issue'] for issue in dashboard.get_dashboard_bundle('comments.csv', folder)['issues']]
+
+def test_editing_the_taxonomy_rebuilds_stored_bundles(taxonomy, folder):
+    taxonomy({'stability': ['crash']})
+    assert issue_names(folder) == ['Stability']
+
+    taxonomy({'stability': ['crash'], 'pricing': ['expensive']})
+    assert issue_names(folder) == ['Stability', 'Pricing']
+
+def test_unchanged_taxonomy_serves_the_stored_bundle(taxonomy, folder, monkeypatch):
+    taxonomy({'performance': ['slow']})
+    assert issue_names(folder) == ['Performance']
+
+    monkeypatch.setattr(dashboard, 'build_dashboard_bundle',
+                        lambda *args: pytest.fail('bundle was rebuilt'))
+    assert issue_names(folder) == ['Performance']
+
+def test_edit_keeping_the_mtime_rebuilds_the_matcher(taxonomy, folder):
+    taxonomy({'stability': ['crash']})
+    assert issue_names(folder) == ['Stability']
+    stat = os.stat(issue_matcher.ISSUE_TAXONOMY_PATH)
+
+    # Same size and mtime, different contents
+    taxonomy({'stability': ['slow!']})
+    os.utime(issue_matcher.ISSUE_TAXONOMY_PATH, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert issue_matcher.get_issue_matcher().tag('so slow!') == {'stability'}
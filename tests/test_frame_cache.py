@@ -0,0 +1,43 @@
+import pandas as pd
+
+from pipeline.frame_cache import FrameCache
+
+KEY = ('data/processed', 'comments.csv', (1, 2), None)
+
+def cached_frame():
+    cache = FrameCache()
+    cache.put(KEY, pd.DataFrame({'sentiment_score': [0.5, -0.2, 0.0],
+                                 'sentiment': ['Positive', 'Negative', 'Neutral']}))
+    return cache
+
+def test_in_place_edits_of_a_hit_leave_the_cache_intact():
+    cache = cached_frame()
+
+    _, df = cache.get(KEY)
+    df.loc[0, 'sentiment_score'] = 9.0
+    df.iloc[1, 1] = 'Edited'
+    df['sentiment'] = df['sentiment'].str.lower()
+    df.drop(index=2, inplace=True)
+
+    _, again = cache.get(KEY)
+    assert again['sentiment_score'].tolist() == [0.5, -0.2, 0.0]
+    assert again['sentiment'].tolist() == ['Positive', 'Negative', 'Neutral']
+
+def test_edits_to_the_stored_frame_leave_the_cache_intact():
+    cache = FrameCache()
+    df = pd.DataFrame({'sentiment_score': [0.5, -0.2]})
+    cache.put(KEY, df)
+    df.loc[0, 'sentiment_score'] = 9.0
+
+    assert cache.get(KEY)[1]['sentiment_score'].tolist() == [0.5, -0.2]
+
+def test_lookups_count_once_and_evict_past_max_bytes():
+    cache = cached_frame()
+    assert cache.get(('other',), KEY)[0] == KEY
+    assert cache.get(('other',)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.max_bytes = cache.bytes
+    cache.put(('data/processed', 'other.csv', (1, 2), None), pd.DataFrame({'x': [1]}))
+    assert cache.get(KEY) is None
+    assert cache.evictions == 1
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from pipeline import process
+from pipeline.store import load_artifact_meta
+
+COMMENTS = ['great video', 'terrible audio', 'it was fine']
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    calls = []
+    monkeypatch.setattr(process, '_precompute_dashboard', lambda filename, folder, df=None: calls.append(filename))
+    return calls
+
+@pytest.fixture
+def scrape(tmp_path):
+    """A CSV being appended to, like a scrape's output file."""
+    path = tmp_path / 'comments.csv'
+    pd.DataFrame({'comment': []}).to_csv(path, index=False)
+
+    def add(n):
+        rows = pd.DataFrame({'comment': [COMMENTS[i % 3] for i in range(n)]})
+        rows.to_csv(path, mode='a', header=False, index=False)
+        return str(path)
+    return add
+
+def run(path, folder, live):
+    return process.process_file(path, 'comments.csv', str(folder), stream=False, live=live)
+
+def test_live_passes_rebuild_only_after_enough_growth(scrape, rebuilds, tmp_path):
+    folder = tmp_path / 'processed'
+    folder.mkdir()
+    assert run(scrape(100), folder, live=True) == 100
+    assert rebuilds == ['comments.csv']
+
+    assert run(scrape(10), folder, live=True) == 110
+    assert run(scrape(10), folder, live=True) == 120
+    assert len(rebuilds) == 1
+
+    assert run(scrape(10), folder, live=True) == 130
+    assert len(rebuilds) == 2
+    assert load_artifact_meta('comments.csv', str(folder))['derived_rows'] == 130
+
+def test_final_pass_catches_up_on_skipped_rebuilds(scrape, rebuilds, tmp_path):
+    folder = tmp_path / 'processed'
+    folder.mkdir()
+    run(scrape(100), folder, live=True)
+    path = scrape(5)
+    run(path, folder, live=True)
+    assert len(rebuilds) == 1
+
+    # Nothing new since the last live pass, but the rebuild it skipped is due
+    assert run(path, folder, live=False) == 105
+    assert len(rebuilds) == 2
+    assert run(path, folder, live=False) == 105
+    assert len(rebuilds) == 2
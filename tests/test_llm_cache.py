@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from chat import chatbot, llm_cache
+from chat.fake_llm import FakeLLM
+from chat.llm_cache import ResponseCache, normalize_prompt, response_key
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / 'llm_cache.db'))
+
+def test_key_is_stable_across_case_and_whitespace():
+    key = response_key("Rows: 3", "How do people  feel?", 'fake-llm')
+    assert key == response_key("Rows: 3", "  how do PEOPLE feel? ", 'fake-llm')
+    assert key == response_key("Rows: 3", "How do people\nfeel?", 'fake-llm')
+    assert normalize_prompt(" A\tb ") == "a b"
+
+def test_key_changes_with_context_prompt_and_model():
+    key = response_key("Rows: 3", "How do people feel?", 'fake-llm')
+    assert key != response_key("Rows: 4", "How do people feel?", 'fake-llm')
+    assert key != response_key("Rows: 3", "What do people like?", 'fake-llm')
+    assert key != response_key("Rows: 3", "How do people feel?", 'other-model')
+
+def test_counts_hits_and_misses(cache):
+    calls = []
+    compute = lambda: calls.append(1) or "answer"
+
+    assert cache.get_or_compute('k1', compute) == "answer"
+    assert cache.get_or_compute('k1', compute) == "answer"
+    assert cache.get_or_compute('k2', compute) == "answer"
+
+    stats = cache.stats()
+    assert len(calls) == 2
+    assert (stats['hits'], stats['misses'], stats['coalesced']) == (1, 2, 0)
+    assert stats['entries'] == 2
+    assert stats['hit_rate'] == round(1 / 3, 4)
+
+def test_expired_entries_are_misses(cache):
+    cache.put('k', "old")
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+def test_errors_are_not_cached(cache):
+    def fail():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', fail)
+    assert cache.get_or_compute('k', lambda: "answer") == "answer"
+    assert cache.stats()['misses'] == 2
+
+def test_evicts_least_recently_used_past_max_entries(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'llm_cache.db'), max_entries=10)
+    for i in range(10):
+        cache.put(f'k{i}', str(i))
+        time.sleep(0.001)
+    cache.get('k0')
+    cache.put('k10', "10")
+
+    assert cache.get('k0') == "0"
+    assert cache.get('k1') is None
+    assert cache.stats()['entries'] == 9
+
+def used_times(cache):
+    return dict(cache._conn.execute("SELECT key, used FROM responses").fetchall())
+
+def test_hits_do_not_write(cache):
+    cache.put('k', "answer")
+    seen = []
+    cache._conn.set_trace_callback(seen.append)
+
+    assert cache.get('k') == "answer"
+    assert cache.get('missing') is None
+    assert [s for s in seen if not s.lstrip().startswith('SELECT')] == []
+
+def test_pending_touches_are_flushed_in_batches(cache, monkeypatch):
+    monkeypatch.setattr(llm_cache, '_TOUCH_FLUSH', 2)
+    cache.put('a', "1")
+    cache.put('b', "2")
+    stored = used_times(cache)
+    time.sleep(0.001)
+
+    cache.get('a')
+    assert used_times(cache) == stored
+    cache.get('b')
+    touched = used_times(cache)
+    assert touched['a'] > stored['a'] and touched['b'] > stored['b']
+
+def test_concurrent_identical_calls_share_one_model_call(cache, monkeypatch):
+    llm = FakeLLM(latency=0.2)
+    chatbot.set_llm(llm)
+    monkeypatch.setattr(chatbot, 'get_response_cache', lambda: cache)
+    messages, context = chatbot.build_chat_messages("How do people feel?", "Rows: 3")
+    results = []
+    start = threading.Barrier(8)
+
+    def ask():
+        start.wait()
+        results.append(chatbot.cached_invoke(messages, context, "How do people feel?"))
+
+    try:
+        threads = [threading.Thread(target=ask) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        chatbot.set_llm(None)
+
+    assert llm.calls == 1
+    assert len(results) == 8 and len(set(results)) == 1
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] + stats['coalesced'] == 7
+
+def test_coalesced_callers_all_see_the_error(cache):
+    gate = threading.Event()
+    errors = []
+
+    def fail():
+        gate.wait()
+        raise RuntimeError("rate limited")
+
+    def ask():
+        try:
+            cache.get_or_compute('k', fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for t in threads:
+        t.start()
+    while cache.stats()['coalesced'] < 3:
+        time.sleep(0.001)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 4
+    assert cache.get('k') is None
+
+def test_fake_llm_echoes_prompt_or_cycles_responses():
+    echo = FakeLLM()
+    assert echo.invoke([("system", "ctx"), ("human", "How  do people\nfeel?")]).content \
+        == "[fake answer] How do people feel?"
+
+    canned = FakeLLM(responses=["one", "two"])
+    assert [canned.invoke("q").content for _ in range(3)] == ["one", "two", "one"]
+    assert canned.calls == 3
+
+def test_fake_llm_streams_the_answer_word_by_word():
+    llm = FakeLLM(responses=["sentiment is mostly positive"])
+    chunks = [chunk.content for chunk in llm.stream("q")]
+    assert chunks == ["sentiment ", "is ", "mostly ", "positive"]
+    assert llm.calls == 1
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import nltk_setup
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty NLTK data directory, with lookups counted instead of run by nltk."""
+    data_dir = str(tmp_path / 'nltk_data')
+    monkeypatch.setattr(nltk_setup, 'NLTK_DATA_DIR', data_dir)
+    monkeypatch.setattr(nltk_setup, 'MANIFEST_PATH', os.path.join(data_dir, 'verified.json'))
+    lookups = []
+
+    def locate(name, download):
+        lookups.append(name)
+        path = os.path.join(data_dir, nltk_setup.NLTK_RESOURCES[name])
+        return path if os.path.isdir(path) else None
+
+    monkeypatch.setattr(nltk_setup, '_locate', locate)
+    return data_dir, lookups
+
+def test_a_missing_corpus_is_looked_up_once(data_dir):
+    data_dir, lookups = data_dir
+    assert nltk_setup.load_stopwords() is None
+    assert nltk_setup.load_stopwords() is None
+    assert lookups == ['stopwords']
+
+def test_installing_the_corpus_ends_the_recorded_miss(data_dir):
+    data_dir, lookups = data_dir
+    assert nltk_setup.load_stopwords() is None
+
+    corpus = os.path.join(data_dir, 'corpora', 'stopwords')
+    os.makedirs(corpus)
+    with open(os.path.join(corpus, 'english'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(['the', 'and', 'of'] * 100))
+    assert nltk_setup.load_stopwords()[:3] == ['the', 'and', 'of']
+    assert nltk_setup.load_stopwords()[:3] == ['the', 'and', 'of']
+    assert lookups == ['stopwords', 'stopwords']
+
+def test_a_download_looks_again(data_dir):
+    data_dir, lookups = data_dir
+    nltk_setup.ensure_resource('stopwords')
+    nltk_setup.ensure_resource('stopwords', download=True)
+    assert lookups == ['stopwords', 'stopwords']
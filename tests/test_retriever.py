@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+from chat import retriever
+from chat.retriever import get_comment_index, get_llm_summary, retrieve_comments
+from pipeline.token_index import get_token_index
+from pipeline.store import save_processed_df
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = str(tmp_path)
+    save_processed_df(pd.DataFrame({
+        'comment': ['the app crashes', 'love the design', 'crashes every day'],
+        'created_at': ['2020-01-01T00:30:00+02:00', '2020-01-02 10:00', 'soon'],
+        'sentiment': ['Negative', 'Positive', 'Negative'],
+    }), 'comments.csv', folder)
+    return folder
+
+def test_summary_is_persisted_and_reloaded(folder, monkeypatch):
+    summary = get_llm_summary('comments.csv', folder)
+    assert 'created_at: 2019-12-31 22:30:00 to 2020-01-02 10:00:00' in summary
+    assert os.path.exists(retriever.llm_summaries.path('comments.csv', folder))
+
+    retriever.llm_summaries._loaded.clear()
+    monkeypatch.setattr(retriever.llm_summaries, 'build', lambda *args: pytest.fail('summary was rebuilt'))
+    assert get_llm_summary('comments.csv', folder) == summary
+
+def test_retrieval_quotes_the_best_matches(folder):
+    assert retrieve_comments('comments.csv', 'why does it keep crashes', folder) \
+        == "- [Negative] the app crashes\n- [Negative] crashes every day"
+
+def test_indexes_use_the_column_sentiment_was_scored_on(tmp_path):
+    folder = str(tmp_path)
+    # No conventional name: processing picked the longest text column
+    save_processed_df(pd.DataFrame({
+        'notes': ['the app crashes all the time', 'love the new design a lot'],
+        'tag': ['bug', 'ui'],
+        'sentiment': ['Negative', 'Positive'],
+    }), 'notes.csv', folder, meta={'text_col': 'notes'})
+
+    assert get_token_index('notes.csv', folder).text_col == 'notes'
+    assert get_comment_index('notes.csv', folder).text_col == 'notes'
+    assert retrieve_comments('notes.csv', 'design', folder) == "- [Positive] love the new design a lot"
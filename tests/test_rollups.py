@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from pipeline import rollups
+from pipeline.rollups import SentimentRollups, get_rollups
+from pipeline.store import save_processed_df
+
+def comments():
+    return pd.DataFrame({
+        'comment': ['love it', 'broke on day one', 'it is fine'],
+        'date': ['2020-01-01T10:00:00Z', '2020-01-01T11:30:00Z', '2020-01-03T09:00:00Z'],
+        'sentiment': ['Positive', 'Negative', 'Neutral'],
+        'sentiment_score': [0.5, -0.5, 0.0],
+    })
+
+@pytest.fixture
+def built():
+    return SentimentRollups.build(comments())
+
+def test_empty_buckets_are_filled(built):
+    result = built.query('day')
+    assert result['dates'] == ['2020-01-01', '2020-01-02', '2020-01-03']
+    assert result['total'] == [2, 0, 1]
+    assert (result['Positive'], result['Negative'], result['Neutral']) == ([1, 0, 0], [1, 0, 0], [0, 0, 1])
+    assert result['avg_score'] == [0.0, None, 0.0]
+
+    assert built.query('day', fill=False)['dates'] == ['2020-01-01', '2020-01-03']
+
+def test_window_reaches_back_before_start(built):
+    result = built.query('day', window=2)
+    # Buckets before the first comment don't count towards the mean
+    assert result['rolling_total'] == [2.0, 1.0, 0.5]
+    assert result['rolling_positive_share'] == [0.5, 0.5, 0.0]
+
+    result = built.query('day', start='2020-01-02', window=2)
+    assert result['dates'] == ['2020-01-02', '2020-01-03']
+    assert result['rolling_total'] == [1.0, 0.5]
+
+def test_range_is_floored_start_to_exclusive_end(built):
+    result = built.query('day', start='2020-01-01T12:00:00', end='2020-01-03')
+    assert result['dates'] == ['2020-01-01', '2020-01-02']
+
+    # Buckets are never split: the 11:00 bucket keeps its 11:30 comment
+    result = built.query('hour', start='2020-01-01T13:00:00+02:00', end='2020-01-01T11:30:00')
+    assert result['dates'] == ['2020-01-01 11:00']
+    assert result['Negative'] == [1]
+
+    assert built.query('day', start='2020-01-03', end='2020-01-02')['dates'] == []
+    with pytest.raises(ValueError):
+        built.query('year')
+
+def test_stored_rollups_are_rebuilt_after_a_format_bump(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    save_processed_df(comments(), 'comments.csv', folder)
+    builds = []
+    build = rollups.rollups_cache.build
+    monkeypatch.setattr(rollups.rollups_cache, 'build', lambda *args: builds.append(1) or build(*args))
+
+    def fresh_get():
+        rollups.rollups_cache._loaded.clear()
+        return get_rollups('comments.csv', folder)
+
+    assert fresh_get().query('day')['total'] == [2, 0, 1]
+    assert fresh_get().query('day')['total'] == [2, 0, 1]
+    assert len(builds) == 1
+
+    monkeypatch.setattr(rollups.rollups_cache, 'fmt', rollups.ROLLUPS_FORMAT + 1)
+    assert fresh_get().query('day')['total'] == [2, 0, 1]
+    assert len(builds) == 2
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from analyzers import score_cache
+from analyzers.score_cache import ScoreCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return ScoreCache(path=str(tmp_path / 'scores.db'), max_entries=10)
+
+def statements(cache):
+    seen = []
+    cache._conn.set_trace_callback(seen.append)
+    return seen
+
+def row_count(cache):
+    return cache._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+def test_reads_do_not_write(cache):
+    cache.put_many([('a', 0.5), ('b', -0.5)])
+    seen = statements(cache)
+
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 0.5, 'b': -0.5}
+    assert cache.stats()['entries'] == 2
+
+    assert [s for s in seen if not s.lstrip().startswith('SELECT')] == []
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_puts_do_not_count_rows(cache):
+    seen = statements(cache)
+    cache.put_many([('a', 0.5), ('b', -0.5)])
+    cache.put_many([('b', -0.5), ('c', 0.1)])
+
+    assert not [s for s in seen if 'COUNT' in s]
+    assert cache.stats()['entries'] == row_count(cache) == 3
+
+def test_pending_touches_are_flushed_in_batches(cache, monkeypatch):
+    monkeypatch.setattr(score_cache, '_TOUCH_FLUSH', 3)
+    cache.put_many([(k, 0.0) for k in 'abc'])
+    seen = statements(cache)
+
+    cache.get_many(['a', 'b'])
+    assert not [s for s in seen if s.startswith('UPDATE')]
+    cache.get_many(['c'])
+    assert len([s for s in seen if s.startswith('UPDATE')]) == 3
+    assert cache._touched == {}
+
+def test_eviction_keeps_recently_read_entries(cache):
+    cache.put_many([(f'k{i}', float(i)) for i in range(10)])
+    time.sleep(0.01)
+    cache.get_many(['k0', 'k1'])
+    cache.put_many([('new', 1.0)])
+
+    assert cache.evictions == 2
+    assert cache.stats()['entries'] == row_count(cache) == 9
+    assert set(cache.get_many(['k0', 'k1', 'new'])) == {'k0', 'k1', 'new'}
+    assert cache.get_many(['k2', 'k3']) == {}
+
+def test_count_survives_reopen_and_clear(cache):
+    cache.put_many([('a', 0.5), ('b', -0.5)])
+    reopened = ScoreCache(path=cache.path, max_entries=10)
+    assert reopened.stats()['entries'] == 2
+
+    reopened.clear()
+    assert reopened.stats()['entries'] == 0
+    reopened.put_many([('a', 0.5)])
+    assert reopened.stats()['entries'] == row_count(reopened) == 1
+
+def test_recounts_before_evicting_rows_another_process_removed(cache):
+    cache.put_many([(f'k{i}', float(i)) for i in range(10)])
+    other = ScoreCache(path=cache.path, max_entries=10)
+    other.clear()
+
+    cache.put_many([('new', 1.0)])
+    assert cache.evictions == 0
+    assert cache.stats()['entries'] == 1
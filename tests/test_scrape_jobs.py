@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+from pipeline import scrape_jobs
+from pipeline.scrape_jobs import LogBuffer, ScrapeJob, ScrapeScheduler
+
+@pytest.fixture
+def scheduler():
+    scheduler = ScrapeScheduler(max_concurrent=1)
+    yield scheduler
+    scheduler._executor.shutdown(wait=False)
+
+def add(scheduler, job):
+    """Registers a job without handing it to the executor, so tests run it themselves."""
+    with scheduler._lock:
+        scheduler._jobs[job.id] = job
+    return job
+
+def test_a_queued_job_is_cancelled_at_once(scheduler, monkeypatch):
+    job = add(scheduler, ScrapeJob('https://www.youtube.com/watch?v=abcdefghijk'))
+    assert scheduler.cancel(job.id)
+    assert job.status == 'cancelled'
+    assert job.log.closed
+    assert not scheduler.is_busy()
+    assert not scheduler.cancel(job.id)
+
+    monkeypatch.setattr(scrape_jobs.subprocess, 'Popen',
+                        lambda *args, **kwargs: pytest.fail('cancelled job was started'))
+    scheduler._run(job)
+    assert job.status == 'cancelled'
+
+class FailingLog(LogBuffer):
+    """Fails on the first line the scraper prints."""
+
+    def append(self, line):
+        if not line.startswith('--- Starting'):
+            raise OSError('log unavailable')
+        super().append(line)
+
+def test_a_failed_read_kills_the_scraper(scheduler, monkeypatch):
+    job = add(scheduler, ScrapeJob('https://www.youtube.com/watch?v=abcdefghijk'))
+    job.log = FailingLog()
+    monkeypatch.setattr(job, 'command', lambda: [sys.executable, '-c',
+                                                 "import time; print('hi', flush=True); time.sleep(60)"])
+    started = []
+    popen = subprocess.Popen
+
+    def start(*args, **kwargs):
+        started.append(popen(*args, **kwargs))
+        return started[-1]
+
+    monkeypatch.setattr(scrape_jobs.subprocess, 'Popen', start)
+
+    scheduler._run(job)
+    assert started[0].poll() is not None
+    assert job.returncode == started[0].returncode != 0
+    assert job.status == 'failed'
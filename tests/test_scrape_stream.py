@@ -0,0 +1,46 @@
+import pytest
+
+import app as app_module
+from pipeline.scrape_jobs import ScrapeJob
+
+@pytest.fixture
+def job(monkeypatch):
+    job = ScrapeJob('https://www.youtube.com/watch?v=abcdefghijk')
+    monkeypatch.setattr(app_module.scrape_scheduler, 'get', lambda job_id: job if job_id == job.id else None)
+    return job
+
+def read_stream(job, **headers):
+    with app_module.app.test_client() as client:
+        response = client.get(f'/api/scrape-jobs/{job.id}/stream', headers=headers)
+        assert response.mimetype == 'text/event-stream'
+        return response.get_data(as_text=True)
+
+def test_sse_data_splits_on_every_line_break():
+    assert app_module.sse_data("done\n") == "data: done\n"
+    assert app_module.sse_data("10%\r50%\r\n100%") == "data: 10%\ndata: 50%\ndata: 100%\n"
+    assert app_module.sse_data("") == "data: \n"
+
+def test_log_lines_with_carriage_returns_keep_events_intact(job):
+    job.log.append("--- Scraping ---\n")
+    job.log.append("Loaded 10 comments\rLoaded 20 comments\r")
+    job.log.append("Done\r\n")
+    job.status = 'completed'
+    job.log.close()
+
+    body = read_stream(job)
+
+    assert '\r' not in body
+    assert body.split('\n\n') == [
+        "id: 1\ndata: --- Scraping ---",
+        "id: 2\ndata: Loaded 10 comments\ndata: Loaded 20 comments",
+        "id: 3\ndata: Done",
+        "event: end\ndata: completed",
+        "",
+    ]
+
+def test_reconnect_resumes_after_last_event_id(job):
+    for i in range(3):
+        job.log.append(f"line {i}\n")
+    job.log.close()
+
+    assert read_stream(job, **{'Last-Event-ID': '2'}).startswith("id: 3\ndata: line 2\n\n")
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+import app as app_module
+from pipeline import store
+from pipeline.frame_cache import frame_cache
+from pipeline.store import save_processed_df
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    folder = str(tmp_path)
+    save_processed_df(pd.DataFrame({
+        'comment': [f"crash number {i}" for i in range(6)] + ['works fine'],
+        'sentiment': ['Negative'] * 6 + ['Positive'],
+        'sentiment_score': [-0.5] * 6 + [0.4],
+    }), 'comments.csv', folder)
+    monkeypatch.setitem(app_module.app.config, 'PROCESSED_FOLDER', folder)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['current_filename'] = 'comments.csv'
+        yield client
+
+def search(client, **args):
+    response = client.get('/api/search', query_string=args)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_limit_is_at_least_one(client):
+    result = search(client, q='crash', limit=-3)
+    assert result['total'] == 6
+    assert [r['text'] for r in result['results']] == ['crash number 0']
+
+def test_only_the_shown_rows_are_read(client, monkeypatch):
+    search(client, q='crash')  # builds the token index
+    frame_cache.invalidate(app_module.app.config['PROCESSED_FOLDER'], 'comments.csv')
+    monkeypatch.setattr(store.feather, 'read_table', lambda *args, **kwargs: pytest.fail('column was read'))
+    result = search(client, q='crash', limit=2)
+    assert result['sentiment_breakdown'] == {'Positive': 0, 'Negative': 6, 'Neutral': 0}
+    assert result['results'] == [
+        {'row': 0, 'text': 'crash number 0', 'sentiment': 'Negative', 'sentiment_score': -0.5},
+        {'row': 1, 'text': 'crash number 1', 'sentiment': 'Negative', 'sentiment_score': -0.5},
+    ]
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from pipeline import store
+from pipeline.frame_cache import frame_cache
+from pipeline.store import ProcessedWriter, load_processed_df, load_processed_rows
+
+@pytest.fixture
+def folder(tmp_path):
+    """An artifact written in three record batches."""
+    folder = str(tmp_path)
+    writer = ProcessedWriter('comments.csv', folder)
+    for batch in (range(0, 4), range(4, 6), range(6, 10)):
+        writer.append(pd.DataFrame({'comment': [f"comment {i}" for i in batch],
+                                    'sentiment': ['Neutral'] * len(batch)}))
+    writer.commit()
+    yield folder
+    frame_cache.invalidate(folder, 'comments.csv')
+
+def test_rows_come_back_in_the_requested_order(folder):
+    rows = load_processed_rows('comments.csv', folder, [7, 0, 5, 3], columns=['comment', 'missing'])
+    assert rows.columns.tolist() == ['comment']
+    assert rows['comment'].tolist() == ['comment 7', 'comment 0', 'comment 5', 'comment 3']
+
+    with pytest.raises(IndexError):
+        load_processed_rows('comments.csv', folder, [10])
+
+def test_rows_are_read_without_loading_whole_columns(folder, monkeypatch):
+    monkeypatch.setattr(store.feather, 'read_table', lambda *args, **kwargs: pytest.fail('column was read'))
+    assert load_processed_rows('comments.csv', folder, [2])['sentiment'].tolist() == ['Neutral']
+
+def test_a_cached_frame_serves_the_rows(folder):
+    load_processed_df('comments.csv', folder)
+    rows = load_processed_rows('comments.csv', folder, [6, 1])
+    assert rows.index.tolist() == [0, 1]
+    assert rows['comment'].tolist() == ['comment 6', 'comment 1']
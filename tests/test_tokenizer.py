@@ -0,0 +1,75 @@
+import random
+import re
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from analyzers.tokenizer import _ABBREVIATIONS, explode_keywords, explode_tokens, get_stop_words, tokenize
+
+word_tokenize = pytest.importorskip('nltk.tokenize').word_tokenize
+punkt = pytest.importorskip('nltk.tokenize.punkt')
+
+WORDS = ['well', 'service', 'terrible', 'gonna', 'gotta', 'wanna', 'cannot', 'gimme', 'lemme',
+         "don't", "it's", "we're", "they'll", 'more', 'tis', 'twas', 'can', 'not', 'ok', 'd', 'ye',
+         'mr', 'dr', 'b', 'i', 'e.g', 'it.it', 'great']
+GLUE = [' ', ' ', ' ', '—', '–', '‒', '―', '-', '--', ',', ':', '...', '!', '?', "'", "''", '"',
+        '(', ')', ';', '/', '…', '’', '‘', '“', '”', '*', '+', '&', '#', '@', '2', '\t', 'é',
+        '. ', '. ', '.', '.\n', '.) ', '." ']
+
+# punkt decides a sentence break from the chunk after the period too: a
+# further sentence end there ("dr. b.) ok") breaks after an abbreviation.
+# The tokenizer doesn't reproduce that, so such texts are left out.
+PUNKT_CONTEXT = re.compile(rf"(?:{'|'.join(_ABBREVIATIONS)}|(?<![a-z])[a-z])\.\S*\s+\S*[.?!]")
+
+def corpus(n=3000, seed=0):
+    rnd = random.Random(seed)
+    texts = ["service—terrible", "well–it's fine", "i'm gonna say it", "we cannot, we wanna",
+             "gotta go—gimme a sec", "lemme-see", "it's gonna-be ok", "wanna'", "more'n enough",
+             "it was great. really great.", "mr. smith is ok. fine", "e.g. this", "it.it works",
+             "plan b. then", "so am i. ok", "great... really", "ask dr."]
+    for _ in range(n):
+        texts.append(''.join(rnd.choice(WORDS) + rnd.choice(GLUE) for _ in range(rnd.randint(1, 8))))
+    return [text for text in texts if not PUNKT_CONTEXT.search(text)]
+
+def sentence_splitter():
+    """
+    punkt with the abbreviations the tokenizer knows. The trained English
+    model can't be assumed to be installed, so it isn't loaded.
+    """
+    params = punkt.PunktParameters()
+    params.abbrev_types = set(_ABBREVIATIONS)
+    return punkt.PunktSentenceTokenizer(params)
+
+SENTENCES = sentence_splitter()
+
+def nltk_words(text):
+    """The alphabetic tokens word_tokenize kept: punkt sentences, then Treebank per sentence."""
+    return [t for sentence in SENTENCES.tokenize(text) for t in word_tokenize(sentence, preserve_line=True)
+            if re.match(r'^[a-z]+$', t)]
+
+def test_tokens_match_word_tokenize():
+    mismatches = [(text, nltk_words(text), tokenize(text)) for text in corpus()
+                  if tokenize(text) != nltk_words(text)]
+    assert mismatches == []
+
+def test_dashes_and_contractions_split_like_word_tokenize():
+    assert tokenize('service—terrible') == ['service', 'terrible']
+    assert tokenize('we gonna, cannot') == ['we', 'gon', 'na', 'can', 'not']
+    assert tokenize('gonna-go') == ['gon', 'na']
+
+def test_periods_split_only_at_sentence_ends():
+    assert tokenize('it was great. really great.') == ['it', 'was', 'great', 'really', 'great']
+    assert tokenize('mr. smith is ok. fine') == ['smith', 'is', 'ok', 'fine']
+    assert tokenize('e.g. plan b. it.it works') == ['plan', 'works']
+    assert tokenize('ask dr.') == ['ask', 'dr']
+    assert tokenize("it's!b. ok 'mr. smith") == ['it', 'b', 'ok', 'mr', 'smith']
+
+def test_keyword_counts_match_word_tokenize():
+    texts = corpus(seed=1)
+    stop_words = get_stop_words()
+    expected = Counter(t for text in texts for t in nltk_words(text)
+                       if len(t) > 2 and t not in stop_words)
+
+    assert Counter(explode_keywords(pd.Series(texts), min_len=2)) == expected
+    assert explode_tokens(pd.Series(texts)).tolist() == [t for text in texts for t in nltk_words(text)]